@@ -0,0 +1,101 @@
+## bench_analytics.py
+## Compares the end of day reports (revenue per dish, per table and per hour, average ticket,
+## quantity percentiles) computed by looping over the orders in Python with OrderAnalytics:
+## the time to take the columnar snapshot, and the time of all the reports over it.
+## Requires NumPy. Run from the repository root:
+##   python -m benchmarks.bench_analytics [--lines 10000 100000 1000000] [--output results.json]
+
+import argparse
+import statistics
+import sys
+import time
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderAnalytics import OrderAnalytics, ANALYTICS_AVAILABLE
+from benchmarks.results import save_results
+
+DISHES_PER_ORDER = 5
+MENU_SIZE = 120
+TABLES_NUM = 50
+START_TIME = 1_700_000_000
+
+
+# Builds the orders holding lines_num dish lines, opened over a day, every other one closed.
+def build_orders(lines_num):
+    orders = []
+    for i in range(lines_num // DISHES_PER_ORDER):
+        order = Order(f"customer {i % 1000}", i % TABLES_NUM + 1)
+        order.id = i + 1
+        order.opened_at = START_TIME + i * 86_400 / (lines_num // DISHES_PER_ORDER)
+        for j in range(DISHES_PER_ORDER):
+            order.add_dish(Dish(f"dish {(i * 7 + j) % MENU_SIZE}", j % 4 + 1, 4.5 + (i + j) % 10))
+        if i % 2:
+           order.status = "Done"
+        orders.append(order)
+    return orders
+
+
+# The reports as they are computed without the analytics: one Python loop over the orders per report.
+def python_reports(orders):
+    by_dish, by_table, by_hour, quantities, tickets = {}, {}, {}, [], []
+    for order in orders:
+        total = 0
+        for dish in order.dishes:
+            price = dish.get_total_price()
+            by_dish[dish.name] = by_dish.get(dish.name, 0) + price
+            quantities.append(dish.quantity)
+            total += price
+        by_table[order.table_number] = by_table.get(order.table_number, 0) + total
+        hour = int(order.opened_at // 3600)
+        by_hour[hour] = by_hour.get(hour, 0) + total
+        if order.dishes_num:
+           tickets.append(total)
+    quantities.sort()
+    percentiles = [quantities[min(len(quantities) - 1, len(quantities) * p // 100)] for p in (50, 90, 99)]
+    return by_dish, by_table, by_hour, statistics.fmean(tickets), percentiles
+
+
+# All the reports over the snapshot.
+def numpy_reports(snapshot):
+    return (snapshot.revenue_by_dish(), snapshot.revenue_by_table(), snapshot.revenue_by_hour(),
+            snapshot.average_ticket(), snapshot.quantity_percentiles())
+
+
+# Returns the best time of rounds calls of function().
+def best_time(function, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="end of day reports: Python loops vs NumPy analytics")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="dish lines")
+    parser.add_argument("--rounds", type=int, default=3, help="runs of each measurement, the best one is kept")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+    if not ANALYTICS_AVAILABLE:
+       sys.exit("NumPy is not installed")
+
+    results = {}
+    print(f"{'lines':>10} {'python loop':>12} {'snapshot':>10} {'reports':>10} {'speedup':>8}")
+    for lines_num in args.lines:
+        orders = build_orders(lines_num)
+        loop = best_time(lambda: python_reports(orders), args.rounds)
+        snapshot = best_time(lambda: OrderAnalytics(orders), args.rounds)
+        analytics = OrderAnalytics(orders)
+        reports = best_time(lambda: numpy_reports(analytics), args.rounds)
+        results[str(lines_num)] = {"python_s": loop, "snapshot_s": snapshot, "reports_s": reports}
+        print(f"{lines_num:10,} {loop:11.3f}s {snapshot:9.3f}s {reports:9.3f}s {loop / reports:7.1f}x")
+    print("(the speedup compares the reports; the snapshot is taken once per version of the orders)")
+    if args.output:
+       save_results(args.output, "bench_analytics", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
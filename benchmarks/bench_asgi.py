@@ -0,0 +1,191 @@
+## bench_asgi.py
+## Compares the WSGI app (app.py, served like `flask run`: one thread per connection) with the ASGI
+## entry point (asgi.py, served by uvicorn on one event loop) under many long-lived connections:
+## idle kitchen displays following /events/dishes while waiters read and change the orders.
+## For every number of displays, a fresh server of each kind is started, the displays connect
+## (the ones that got their stream within the timeout are counted, with the server's threads and memory),
+## then the waiters send requests for a while (3 reads per dish status change, every change streamed
+## to all the displays) and the throughput and p50/p99 latency of their requests are reported.
+## Requires uvicorn. Run from the repository root:
+##   python -m benchmarks.bench_asgi [--displays 100 1000 2000] [--waiters 16] [--output results.json]
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.results import latency_stats, save_results
+
+HOST = "127.0.0.1"
+TABLES_NUM = 50
+
+
+# Serves the app of the kind on the port, until the process is killed.
+def serve(kind, port):
+    if kind == "wsgi":
+       from werkzeug.serving import run_simple
+       from src.app import app
+       run_simple(HOST, port, app, threaded=True)
+    else:
+       import uvicorn
+       uvicorn.run("src.asgi:application", host=HOST, port=port, log_level="warning")
+
+
+# Returns the threads and resident memory (MiB) of a process.
+def process_stats(pid):
+    stats = {}
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            stats[name] = value.split()[:1]
+    return int(stats["Threads"][0]), int(stats["VmRSS"][0]) / 1024
+
+
+# A keep-alive HTTP/1.1 connection, reconnecting when the server closes it.
+class Connection:
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+           self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        status = int((await self.reader.readline()).split()[1])
+        length, close = 0, False
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+               length = int(value)
+            elif name == b"connection" and value.strip().lower() == b"close":
+               close = True
+        await self.reader.readexactly(length)
+        if close:
+           self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+           self.writer.close()
+           self.reader = self.writer = None
+
+
+# A kitchen display: opens the event stream, then reads it until cancelled.
+async def display(port, opened, timeout):
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), timeout)
+        writer.write(f"GET /events/dishes HTTP/1.1\r\nHost: {HOST}\r\n\r\n".encode())
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return
+    if b" 200 " not in status_line:
+       return
+    opened.append(writer)
+    try:
+        while await reader.read(1 << 16):
+            pass
+    finally:
+        writer.close()
+
+
+# A waiter: reads its table and changes the status of its dish until the deadline, timing every request.
+async def waiter(port, table_number, deadline, latencies, errors):
+    connection = Connection(port)
+    statuses = ("Served", "Pending")
+    i = 0
+    while time.perf_counter() < deadline:
+        if i % 4 == 3:
+           request = ("PUT", f"/orders/{table_number}/dishes/Soup/update_status/{statuses[i // 4 % 2]}")
+        else:
+           request = ("GET", f"/orders/{table_number}/{('price', 'status', 'customer_name')[i % 4]}")
+        start = time.perf_counter()
+        try:
+            status = await connection.request(*request)
+        except (OSError, asyncio.IncompleteReadError, IndexError):
+            connection.close()
+            status = None
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+           errors.append(status)
+        i += 1
+    connection.close()
+
+
+# Starts a server, connects the displays, runs the waiters, returns the results.
+async def run(kind, port, displays_num, waiters_num, duration, timeout):
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_asgi", "--serve", kind, "--port", str(port)],
+                              stderr=subprocess.DEVNULL)
+    try:
+        setup = Connection(port)
+        for _ in range(100):
+            try:
+                await setup.request("GET", "/orders/active_count")
+                break
+            except OSError:
+                setup.close()
+                await asyncio.sleep(0.1)
+        for table_number in range(1, TABLES_NUM + 1):
+            await setup.request("POST", "/add_order", {"customer_name": "Ann", "table_number": table_number})
+            await setup.request("PUT", f"/orders/{table_number}/dishes/add", {"name": "Soup", "quantity": 1, "unit_price": 6.5})
+        setup.close()
+
+        opened = []
+        displays = [asyncio.ensure_future(display(port, opened, timeout)) for _ in range(displays_num)]
+        deadline = time.perf_counter() + timeout
+        while len(opened) < displays_num and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        threads, memory = process_stats(server.pid)
+
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(waiter(port, i % TABLES_NUM + 1, deadline, latencies, errors) for i in range(waiters_num)))
+        for task in displays:
+            task.cancel()
+        await asyncio.gather(*displays, return_exceptions=True)
+        return {"displays_connected": len(opened), "server_threads": threads, "server_rss_mib": memory,
+                "requests_per_s": len(latencies) / duration, "errors": len(errors), **latency_stats(latencies)}
+    finally:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WSGI vs ASGI under many long-lived connections")
+    parser.add_argument("--displays", type=int, nargs="+", default=[100, 1000, 2000], help="idle event streams")
+    parser.add_argument("--waiters", type=int, default=16, help="concurrent clients sending requests")
+    parser.add_argument("--duration", type=float, default=5, help="seconds the waiters send requests")
+    parser.add_argument("--timeout", type=float, default=20, help="seconds the displays have to connect")
+    parser.add_argument("--port", type=int, default=5077, help="port of the servers")
+    parser.add_argument("--serve", choices=["wsgi", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+    if args.serve:
+       serve(args.serve, args.port)
+       return
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        sys.exit("uvicorn is not installed")
+
+    results = {}
+    print(f"{'server':6} {'displays':>8} {'connected':>9} {'threads':>7} {'RSS MiB':>8} {'req/s':>7} "
+          f"{'p50 ms':>7} {'p99 ms':>8} {'errors':>6}")
+    for displays_num in args.displays:
+        for kind in ("wsgi", "asgi"):
+            result = asyncio.run(run(kind, args.port, displays_num, args.waiters, args.duration, args.timeout))
+            results[f"{kind} {displays_num}"] = result
+            print(f"{kind:6} {displays_num:8} {result['displays_connected']:9} {result['server_threads']:7} "
+                  f"{result['server_rss_mib']:8.1f} {result['requests_per_s']:7.0f} {result['p50_us'] / 1e3:7.2f} "
+                  f"{result['p99_us'] / 1e3:8.2f} {result['errors']:6}")
+    if args.output:
+       save_results(args.output, "bench_asgi", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+## bench_encoding.py
+## Compares encoding the largest responses with jsonify (the orders and dishes turned into dicts by
+## to_dict, then encoded by the json module) with the app's ResponseEncoder (orders and dishes written
+## directly, the rest by orjson or json): the summary of all the orders (GET /orders/summary) and
+## the pending dishes of all the orders (GET /dishes_by_status/Pending).
+## Every encoding is timed on new orders (cold: nothing cached yet) and again on the same orders
+## (warm: to_dict and to_json are cached until the orders change), and the bodies are checked to be identical.
+## Run from the repository root: python -m benchmarks.bench_encoding [--orders 10000] [--output results.json]
+
+import argparse
+import time
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.ResponseEncoder import ResponseEncoder, ENCODERS, orjson
+from benchmarks.results import save_results
+
+DISHES_PER_ORDER = 5
+START_TIME = 1_700_000_000.25
+
+
+# Returns a manager of orders_num orders (the same every time), with non-ASCII names here and there, every other one closed.
+def build_manager(orders_num):
+    manager = OrderManager()
+    for i in range(orders_num):
+        order = Order(f"customer {i}" if i % 10 else f"Zoë {i}", i + 1)
+        order.opened_at = START_TIME + i
+        for j in range(DISHES_PER_ORDER):
+            dish = Dish(f"dish {(i + j) % 40}", j + 1, 4.5 + (i + j) % 10)
+            dish.pending_since = START_TIME + i
+            order.add_dish(dish)
+        manager.add_order(order)
+        if i % 2:
+           manager.close_order(i + 1)
+    return manager
+
+
+# The payloads as the routes build them: with jsonify (dicts) and with the ResponseEncoder (objects).
+def jsonify_payloads(manager):
+    return {"summary": manager.to_dict(timestamps=True),
+            "dishes_by_status": {"status": "Pending",
+                                 "dishes": [dish.to_dict(timestamps=True) for dish in manager.get_all_dishes_by_status("Pending")]}}
+
+def encoder_payloads(manager):
+    return {"summary": manager.summary(),
+            "dishes_by_status": {"status": "Pending", "dishes": manager.get_all_dishes_by_status("Pending")}}
+
+
+# Returns (the best time of rounds encodings, the body), each on a new manager if cold.
+def time_encoding(encode, build_payload, orders_num, rounds, cold):
+    best, body = None, None
+    manager = build_manager(orders_num)
+    for _ in range(rounds):
+        if cold:
+           manager = build_manager(orders_num)
+        start = time.perf_counter()
+        body = encode(build_payload(manager))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="jsonify vs ResponseEncoder on the largest responses")
+    parser.add_argument("--orders", type=int, default=10_000, help="orders in the manager")
+    parser.add_argument("--rounds", type=int, default=5, help="runs of each encoding, the best one is kept")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    app = app_module.app
+    encoders = [name for name in ENCODERS if name != "orjson" or orjson is not None]
+    results = {}
+    print(f"{args.orders} orders of {DISHES_PER_ORDER} dishes")
+    print(f"{'response':18} {'cache':5} {'jsonify':>9} " + " ".join(f"{name:>9} {'speedup':>7}" for name in encoders))
+    with app.app_context():
+        for response in ("summary", "dishes_by_status"):
+            for cold in (True, False):
+                cache = "cold" if cold else "warm"
+                baseline, expected = time_encoding(lambda payloads: app.json.response(payloads[response]).get_data(),
+                                                   jsonify_payloads, args.orders, args.rounds, cold)
+                result = {"jsonify_s": baseline}
+                line = f"{response:18} {cache:5} {baseline * 1e3:7.1f}ms"
+                for name in encoders:
+                    # With the timestamps, to write the same bodies as jsonify of the to_dict dicts.
+                    encoder = ResponseEncoder(name, timestamps=True)
+                    elapsed, body = time_encoding(lambda payloads: (encoder.encode(payloads[response]) + "\n").encode(),
+                                                  encoder_payloads, args.orders, args.rounds, cold)
+                    if body != expected:
+                       raise AssertionError(f"the {name} encoder wrote a different {response} body")
+                    result[f"{name}_s"] = elapsed
+                    line += f" {elapsed * 1e3:7.1f}ms {baseline / elapsed:6.1f}x"
+                results[f"{response} {cache}"] = result
+                print(line)
+    if args.output:
+       save_results(args.output, "bench_encoding", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+## bench_import.py
+## Compares seeding a server one request at a time (POST /add_order, then PUT /orders/<t>/dishes/add
+## per dish) with the bulk NDJSON import (POST /orders/import), through the Flask test client,
+## and the same two ways through the OrderManager API (add_order + add_dish_to_order vs import_orders).
+## Run from the repository root: python -m benchmarks.bench_import [--orders 5000] [--output results.json]
+
+import argparse
+import json
+import time
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from benchmarks.results import save_results
+
+DISHES_PER_ORDER = 3
+
+
+# Returns the records of orders_num orders (as exported), every fourth one closed.
+def build_records(orders_num):
+    records = []
+    for i in range(orders_num):
+        order = Order(f"customer {i}", i + 1)
+        order.id = i + 1
+        for j in range(DISHES_PER_ORDER):
+            order.add_dish(Dish(f"dish {j}", j + 1, 4.5 + j))
+        if i % 4 == 3:
+           order.status = "Done"
+        records.append(json.loads(json.dumps(order.to_dict(timestamps=True))))
+    return records
+
+
+# Returns a test client of the app over a new, empty manager.
+def new_client():
+    app_module.order_manager = OrderManager()
+    app_module.metrics = None
+    return app_module.app.test_client()
+
+
+# Seeds the app one request per order and per dish.
+def requests_ingest(records):
+    client = new_client()
+    for record in records:
+        table_number = record["table_number"]
+        client.post("/add_order", json={"customer_name": record["customer_name"], "table_number": table_number})
+        for dish in record["dishes"]:
+            client.put(f"/orders/{table_number}/dishes/add",
+                       json={"name": dish["name"], "quantity": dish["quantity"], "unit_price": dish["unit price"]})
+        if record["status"] == "Done":
+           client.put(f"/orders/{table_number}/close")
+
+
+# Seeds the app with one NDJSON import request.
+def bulk_ingest(records):
+    client = new_client()
+    body = "".join(json.dumps(record) + "\n" for record in records)
+    response = client.post("/orders/import", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200, response.get_json()
+
+
+# Seeds a manager one call per order and per dish.
+def api_ingest(records):
+    manager = OrderManager()
+    for record in records:
+        manager.add_order(Order(record["customer_name"], record["table_number"]))
+        for dish in record["dishes"]:
+            manager.add_dish_to_order(record["table_number"], Dish(dish["name"], dish["quantity"], dish["unit price"]))
+        if record["status"] == "Done":
+           manager.close_order(record["table_number"])
+
+
+# Seeds a manager with import_orders.
+def api_bulk_ingest(records):
+    OrderManager().import_orders(records)
+
+
+# Returns the orders per second of ingest(records), the best of rounds runs.
+def orders_per_second(ingest, records, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        ingest(records)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(records) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-request vs bulk NDJSON ingest benchmark")
+    parser.add_argument("--orders", type=int, default=5000, help="orders to ingest")
+    parser.add_argument("--rounds", type=int, default=3, help="runs of each way, the best one is kept")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    records = build_records(args.orders)
+    results = {}
+    print(f"{args.orders} orders of {DISHES_PER_ORDER} dishes")
+    print(f"{'ingest':32} {'orders/s':>10} {'speedup':>8}")
+    for name, single, bulk in (("HTTP", requests_ingest, bulk_ingest), ("OrderManager API", api_ingest, api_bulk_ingest)):
+        single_rate = orders_per_second(single, records, args.rounds)
+        bulk_rate = orders_per_second(bulk, records, args.rounds)
+        results[name] = {"per_call_orders_per_s": single_rate, "bulk_orders_per_s": bulk_rate}
+        print(f"{name + ', one call at a time':32} {single_rate:10,.0f}")
+        print(f"{name + ', bulk import':32} {bulk_rate:10,.0f} {bulk_rate / single_rate:7.1f}x")
+    if args.output:
+       save_results(args.output, "bench_import", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
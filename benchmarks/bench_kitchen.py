@@ -0,0 +1,69 @@
+## bench_kitchen.py
+## Compares asking for the oldest pending dishes by scanning every order
+## (get_all_dishes_by_status("Pending"), then sorting by "pending since") with the kitchen queue
+## (next_pending_dishes), and the cost the queue adds to serving a dish.
+## Run from the repository root: python -m benchmarks.bench_kitchen [--orders 1000 10000 50000] [--output results.json]
+
+import argparse
+import time
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager, DEFAULT_KITCHEN_LIMIT
+from benchmarks.results import save_results
+
+DISHES_PER_ORDER = 4
+
+
+# Returns a manager of orders_num orders, every other dish served.
+def build_manager(orders_num):
+    manager = OrderManager()
+    for i in range(orders_num):
+        manager.add_order(Order(f"customer {i}", i + 1))
+        for j in range(DISHES_PER_ORDER):
+            manager.add_dish_to_order(i + 1, Dish(f"dish {j}", j + 1, 4.5 + j))
+            if (i + j) % 2:
+               manager.update_dish_status(i + 1, f"dish {j}", "Served")
+    return manager
+
+
+# The oldest pending dishes as they are found without the queue.
+def scan_next(manager, limit):
+    dishes = manager.get_all_dishes_by_status("Pending")
+    return sorted(dishes, key=lambda dish: dish.pending_since)[:limit]
+
+
+# Returns the mean time of a call of function(), over rounds calls.
+def mean_time(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="oldest pending dishes: full scan vs kitchen queue")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 10_000, 50_000], help="open orders")
+    parser.add_argument("--rounds", type=int, default=20, help="calls of each way, the mean is kept")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'orders':>8} {'scan':>10} {'queue':>10} {'speedup':>8} {'serve+undo':>11}")
+    for orders_num in args.orders:
+        manager = build_manager(orders_num)
+        scan = mean_time(lambda: scan_next(manager, DEFAULT_KITCHEN_LIMIT), args.rounds)
+        queue = mean_time(lambda: manager.next_pending_dishes(DEFAULT_KITCHEN_LIMIT), args.rounds)
+        def serve():
+            manager.update_dish_status(1, "dish 0", "Served")
+            manager.update_dish_status(1, "dish 0", "Pending")
+        serve_time = mean_time(serve, args.rounds * 10)
+        results[str(orders_num)] = {"scan_s": scan, "queue_s": queue, "serve_and_undo_s": serve_time}
+        print(f"{orders_num:8,} {scan * 1e3:8.2f}ms {queue * 1e3:8.3f}ms {scan / queue:7.0f}x {serve_time * 1e6:9.1f}us")
+    if args.output:
+       save_results(args.output, "bench_kitchen", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
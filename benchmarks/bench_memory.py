@@ -0,0 +1,91 @@
+## bench_memory.py
+## Measures the memory footprint of Dish and Order objects and the throughput of building them,
+## with ad-hoc dishes (each with its own name string and price, as parsed from a request)
+## and with dishes ordered from the menu (sharing the name and price of their menu item).
+## Run from the repository root: python -m benchmarks.bench_memory [--sizes 100000 1000000]
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src.Dish import Dish
+from src.Menu import Menu
+from src.Order import Order
+
+DISHES_PER_ORDER = 10
+
+
+# Builds orders of DISHES_PER_ORDER dishes until the given number of dishes is reached,
+# ad-hoc dishes or, with a menu, dishes of its items.
+def build_orders(dishes_num, menu=None):
+    orders = []
+    for i in range(dishes_num // DISHES_PER_ORDER):
+        order = Order(f"customer {i}", i + 1)
+        for j in range(DISHES_PER_ORDER):
+            if menu is None:
+               order.add_dish(Dish(f"dish {j}", j + 1, float(f"9.{j}")))
+            else:
+               order.add_dish(Dish.from_menu_item(menu.get(j + 1), j + 1))
+        orders.append(order)
+    return orders
+
+
+# Returns a menu with the dishes of build_orders.
+def build_menu():
+    menu = Menu()
+    for j in range(DISHES_PER_ORDER):
+        menu.add(f"dish {j}", float(f"9.{j}"), j + 1)
+    return menu
+
+
+# Returns the number of bytes allocated while building the objects returned by factory.
+def measure_bytes(factory):
+    gc.collect()
+    tracemalloc.start()
+    objects = factory()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return allocated
+
+
+# Returns bytes per dish and bytes per (empty) order.
+# Dish names are interned up front so the name strings are not counted.
+def measure_object_sizes(objects_num=100_000):
+    names = [f"customer {i}" for i in range(objects_num)]
+    dish_bytes = measure_bytes(lambda: [Dish("dish", 1, 9.5) for _ in range(objects_num)])
+    order_bytes = measure_bytes(lambda: [Order(name, 1) for name in names])
+    # The list holding the objects is 8 bytes per item.
+    return dish_bytes / objects_num - 8, order_bytes / objects_num - 8
+
+
+# Returns the building throughput in dishes per second, and the allocated bytes per dish.
+def measure_throughput(dishes_num, menu=None):
+    gc.collect()
+    start = time.perf_counter()
+    orders = build_orders(dishes_num, menu)
+    elapsed = time.perf_counter() - start
+    del orders
+    allocated = measure_bytes(lambda: build_orders(dishes_num, menu))
+    return dishes_num / elapsed, allocated / dishes_num
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dish/Order memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="numbers of dishes to build")
+    args = parser.parse_args()
+
+    dish_size, order_size = measure_object_sizes()
+    print(f"Dish:  {dish_size:8.1f} bytes per object")
+    print(f"Order: {order_size:8.1f} bytes per object (no dishes)")
+    menu = build_menu()
+    for dishes_num in args.sizes:
+        for kind, dishes_menu in (("ad-hoc", None), ("menu", menu)):
+            rate, size = measure_throughput(dishes_num, dishes_menu)
+            print(f"{dishes_num:>9} {kind:6} dishes: {rate:12,.0f} dishes/s, {size:8.1f} bytes per dish in orders")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+## bench_metrics.py
+## Measures the overhead of the metrics: the same request mix is sent through the Flask test
+## client with metrics off, with request metrics on, and with the OrderManager calls timed too,
+## and the hot manager calls are timed directly with and without their timing wrappers.
+## Run from the repository root: python -m benchmarks.bench_metrics [--rounds 10] [--output results.json]
+
+import argparse
+import time
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Metrics import Metrics
+from src.Order import Order
+from src.OrderManager import OrderManager
+from benchmarks.results import save_results
+
+TABLES_NUM = 100
+INSTRUMENTED_CALLS = ("find_order", "add_dish_to_order", "to_dict")
+
+
+# Builds a manager with an open order and a dish at every table.
+def build_manager():
+    manager = OrderManager()
+    for table_number in range(1, TABLES_NUM + 1):
+        manager.add_order(Order("customer", table_number))
+        manager.add_dish_to_order(table_number, Dish("Soup", 1, 6.5))
+    return manager
+
+
+# Sends one round of requests, returns the number of requests.
+def send_round(client):
+    for table_number in range(1, TABLES_NUM + 1):
+        client.get(f"/orders/{table_number}/price")
+        client.get(f"/orders/{table_number}/status")
+        client.put(f"/orders/{table_number}/dishes/Soup/update_status/Served")
+        client.put(f"/orders/{table_number}/dishes/Soup/update_status/Pending")
+        client.get(f"/order/table_number/{table_number}")
+    return TABLES_NUM * 5
+
+
+# Returns the best (least disturbed) time per request of each configuration, in microseconds.
+# The configurations take turns within every round, so they see the same machine noise.
+def time_requests(rounds):
+    configurations = {"metrics off": (build_manager(), None)}
+    configurations["request metrics"] = (build_manager(), Metrics())
+    manager, metrics = build_manager(), Metrics()
+    metrics.instrument(manager, INSTRUMENTED_CALLS)
+    configurations["request and call metrics"] = (manager, metrics)
+    client = app_module.app.test_client()
+    best = dict.fromkeys(configurations, float("inf"))
+    for round_index in range(rounds + 1):
+        for name, (manager, metrics) in configurations.items():
+            app_module.order_manager, app_module.metrics = manager, metrics
+            start = time.perf_counter()
+            requests_num = send_round(client)
+            if round_index:    # the first round warms up.
+               best[name] = min(best[name], (time.perf_counter() - start) / requests_num)
+    return {name: seconds * 1e6 for name, seconds in best.items()}
+
+
+# Returns the best time per find_order call over the rounds, in microseconds.
+def time_find_order(instrument_calls, rounds, calls=20_000):
+    manager = build_manager()
+    if instrument_calls:
+       Metrics().instrument(manager, INSTRUMENTED_CALLS)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for i in range(calls):
+            manager.find_order("table_number", i % TABLES_NUM + 1)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="metrics overhead benchmark")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    original = app_module.order_manager, app_module.metrics
+    results = {
+        "request_us": time_requests(args.rounds),
+        "find_order_us": {
+            "plain": time_find_order(False, args.rounds),
+            "timed": time_find_order(True, args.rounds),
+        },
+    }
+    app_module.order_manager, app_module.metrics = original
+
+    base = results["request_us"]["metrics off"]
+    print(f"{'per request':28} {'us':>8} {'overhead':>9}")
+    for name, value in results["request_us"].items():
+        print(f"{name:28} {value:8.1f} {(value - base) / base:9.1%}")
+    plain = results["find_order_us"]["plain"]
+    print(f"\n{'per find_order call':28} {'us':>8} {'overhead':>9}")
+    for name, value in results["find_order_us"].items():
+        print(f"{name:28} {value:8.2f} {(value - plain) / plain:9.1%}")
+    if args.output:
+       save_results(args.output, "bench_metrics", vars(args), results)
+       print(f"\nresults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+## bench_operations.py
+## Microbenchmarks of every OrderManager and Order operation, each timed call by call,
+## on managers holding 1k, 10k and 100k orders (half of them closed, 3 dishes each).
+## Run from the repository root:
+##   python -m benchmarks.bench_operations [--sizes 1000 10000 100000] [--store memory] [--output results.json]
+
+import argparse
+import os
+import tempfile
+import time
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.SQLiteOrderStore import SQLiteOrderStore
+from benchmarks.results import latency_stats, save_results
+
+DISHES_PER_ORDER = 3
+ORDER_DISHES_NUM = 10          # Dishes of the order used by the Order benchmarks.
+
+
+# Builds a manager with orders_num orders, order i at table i + 1; the orders at even tables are closed.
+def build_manager(orders_num, store=None):
+    manager = OrderManager(store=store)
+    for i in range(orders_num):
+        table_number = i + 1
+        manager.add_order(Order(f"customer {i % 1000}", table_number))
+        for j in range(DISHES_PER_ORDER):
+            manager.add_dish_to_order(table_number, Dish(f"dish {j}", j + 1, 4.5 + j))
+        if table_number % 2 == 0:
+           manager.close_order(table_number)
+    return manager
+
+
+# Times operation(argument) for each argument, returns the latency stats.
+def time_calls(operation, arguments):
+    latencies = []
+    for argument in arguments:
+        start = time.perf_counter()
+        operation(argument)
+        latencies.append(time.perf_counter() - start)
+    return latency_stats(latencies)
+
+
+# Benchmarks the OrderManager operations. Lookups and changes use a different active table on
+# every call; the operations that traverse all the orders are called full_scans times.
+# The changes are undone by the later ones, so the manager ends with the orders it started with.
+def bench_manager(manager, orders_num, samples, full_scans):
+    active = range(1, orders_num + 1, 2)
+    tables = [active[i * len(active) // samples] for i in range(min(samples, len(active)))]
+    ids = tables                   # Order i + 1 is at table i + 1.
+    scans = range(full_scans)
+    results = {}
+
+    results["find_order by id"] = time_calls(lambda order_id: manager.find_order("id", order_id), ids)
+    results["find_order by table_number"] = time_calls(lambda t: manager.find_order("table_number", t), tables)
+    results["find_order by customer_name"] = time_calls(
+        lambda t: manager.find_order("customer_name", f"customer {(t - 1) % 1000}"), tables)
+    results["get_order_price"] = time_calls(manager.get_order_price, tables)
+    results["get_order_status"] = time_calls(manager.get_order_status, tables)
+    results["get_customer_name"] = time_calls(manager.get_customer_name, tables)
+    results["get_dish_unit_price"] = time_calls(lambda t: manager.get_dish_unit_price(t, "dish 1"), tables)
+    results["get_dish_status"] = time_calls(lambda t: manager.get_dish_status(t, "dish 1"), tables)
+    results["get_table_dishes_by_status"] = time_calls(lambda t: manager.get_table_dishes_by_status(t, "Pending"), tables)
+    for status in ("Pending", "Done", "All"):
+        results[f"total_orders_price_by_status {status}"] = time_calls(
+            lambda _: manager.total_orders_price_by_status(status), scans)
+    results["get_table_numbers_by_order_status Pending"] = time_calls(
+        lambda _: manager.get_table_numbers_by_order_status("Pending"), scans)
+    results["get_all_dishes_by_status Pending"] = time_calls(lambda _: manager.get_all_dishes_by_status("Pending"), scans)
+    results["summary_page 100"] = time_calls(lambda t: manager.summary_page(100, t), tables[:full_scans])
+    results["to_dict"] = time_calls(lambda _: manager.to_dict(), scans)
+
+    results["add_dish_to_order"] = time_calls(lambda t: manager.add_dish_to_order(t, Dish("bench dish", 1, 2.5)), tables)
+    results["update_dish_quantity"] = time_calls(lambda t: manager.update_dish_quantity(t, "bench dish", 2), tables)
+    results["update_dish_status"] = time_calls(lambda t: manager.update_dish_status(t, "bench dish", "Served"), tables)
+    results["change_customer_name"] = time_calls(
+        lambda t: manager.change_customer_name(t, f"customer {(t - 1) % 1000}"), tables)
+    results["apply_batch"] = time_calls(lambda t: manager.apply_batch([
+        {"table_number": t, "action": "add", "name": "bench batch", "quantity": 1, "unit_price": 3.5},
+        {"table_number": t, "action": "update_status", "name": "bench batch", "status": "Served"},
+        {"table_number": t, "action": "remove", "name": "bench batch"}]), tables)
+    results["remove_dish_from_order"] = time_calls(lambda t: manager.remove_dish_from_order(t, "bench dish"), tables)
+
+    new_tables = range(orders_num + 1, orders_num + 1 + len(tables))
+    results["add_order"] = time_calls(lambda t: manager.add_order(Order("bench customer", t)), new_tables)
+    results["close_order"] = time_calls(manager.close_order, new_tables)
+    new_ids = [manager.created_orders_num - i for i in range(len(tables))]
+    results["remove_order by id"] = time_calls(lambda order_id: manager.remove_order("id", order_id), new_ids)
+    return results
+
+
+# Benchmarks the Order operations on an order of ORDER_DISHES_NUM dishes.
+def bench_order(samples):
+    order = Order("customer", 1)
+    for j in range(ORDER_DISHES_NUM):
+        order.add_dish(Dish(f"dish {j}", j + 1, 4.5 + j))
+    calls = range(samples)
+    data = order.to_dict(timestamps=True)
+    results = {}
+    results["find_dish_by_name"] = time_calls(lambda _: order.find_dish_by_name("dish 5"), calls)
+    results["add_dish + remove_dish"] = time_calls(
+        lambda i: (order.add_dish(Dish("bench dish", 1, 2.5)), order.remove_dish("bench dish")), calls)
+    results["update_dish_quantity"] = time_calls(lambda i: order.update_dish_quantity("dish 5", i % 3 + 1), calls)
+    results["update_dish_status"] = time_calls(
+        lambda i: order.update_dish_status("dish 5", "Served" if i % 2 else "Pending"), calls)
+    results["check_order_status"] = time_calls(lambda _: order.check_order_status(), calls)
+    results["get_dishes_by_status"] = time_calls(lambda _: order.get_dishes_by_status("Pending"), calls)
+    results["get_total_price"] = time_calls(lambda _: order.get_total_price(), calls)
+    results["compute_total_price"] = time_calls(lambda _: order.compute_total_price(), calls)
+    results["to_dict (cached)"] = time_calls(lambda _: order.to_dict(timestamps=True), calls)
+    results["to_dict (after a change)"] = time_calls(
+        lambda i: (order.update_dish_quantity("dish 5", i % 3 + 1), order.to_dict(timestamps=True)), calls)
+    results["from_dict"] = time_calls(lambda _: Order.from_dict(data), calls)
+    return results
+
+
+# Prints a table of latency stats.
+def print_results(title, results):
+    print(f"\n{title}")
+    print(f"{'operation':44} {'calls':>6} {'mean us':>10} {'p50 us':>10} {'p99 us':>10}")
+    for operation, stats in results.items():
+        print(f"{operation:44} {stats['count']:6} {stats['mean_us']:10.1f} {stats['p50_us']:10.1f} {stats['p99_us']:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OrderManager and Order microbenchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000], help="numbers of orders")
+    parser.add_argument("--samples", type=int, default=1000, help="calls per lookup or change")
+    parser.add_argument("--full-scans", type=int, default=5, help="calls per operation that traverses all orders")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = {"Order": bench_order(args.samples)}
+    print_results(f"Order ({ORDER_DISHES_NUM} dishes)", results["Order"])
+    with tempfile.TemporaryDirectory() as directory:
+        for orders_num in args.sizes:
+            store = SQLiteOrderStore(os.path.join(directory, f"orders-{orders_num}.db")) if args.store == "sqlite" else None
+            start = time.perf_counter()
+            manager = build_manager(orders_num, store)
+            build_seconds = time.perf_counter() - start
+            name = f"OrderManager {orders_num}"
+            results[name] = bench_manager(manager, orders_num, args.samples, args.full_scans)
+            print_results(f"{name} orders, {args.store} store (built in {build_seconds:.2f}s)", results[name])
+            if store is not None:
+               store.close()
+
+    if args.output:
+       save_results(args.output, "bench_operations", vars(args), results)
+       print(f"\nresults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+## bench_search.py
+## Compares searching orders by customer name prefix by scanning every order (as a client filtering
+## the whole summary does) with the customer name index (search_orders), and the cost the index
+## adds to renaming a customer.
+## Run from the repository root: python -m benchmarks.bench_search [--orders 1000 10000 100000] [--output results.json]
+
+import argparse
+import random
+import time
+
+from src.Order import Order
+from src.OrderArchive import OrderArchive
+from src.OrderManager import OrderManager, DEFAULT_PAGE_SIZE
+from benchmarks.results import save_results
+
+FIRST_NAMES = ("Ann", "Bob", "Carla", "Dmitri", "Eve", "Farid", "Gina", "Hiro", "Ines", "Jon")
+PREFIXES = ("ann", "CARLA 1", "hiro 42", "j")
+
+
+# Returns a manager of orders_num orders, every third one closed (and most of those archived).
+def build_manager(orders_num, seed=1):
+    random_names = random.Random(seed)
+    manager = OrderManager(archive=OrderArchive(), archive_after=100)
+    for i in range(orders_num):
+        manager.add_order(Order(f"{random_names.choice(FIRST_NAMES)} {random_names.randrange(1000)}", i + 1))
+        if i % 3 == 0:
+           manager.close_order(i + 1)
+    return manager
+
+
+# The matching orders as they are found without the index.
+def scan_search(manager, prefix, limit):
+    prefix = prefix.casefold()
+    orders = [order for order in manager.orders if order.customer_name.casefold().startswith(prefix)]
+    return sorted(orders, key=lambda order: (order.customer_name.casefold(), order.id))[:limit]
+
+
+# Returns the mean time of a call of function(), over rounds calls.
+def mean_time(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="customer name search: full scan vs index")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 10_000, 100_000], help="orders, live and archived")
+    parser.add_argument("--rounds", type=int, default=10, help="calls of each way, the mean is kept")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'orders':>8} {'scan':>10} {'index':>10} {'speedup':>8} {'rename':>9}")
+    for orders_num in args.orders:
+        manager = build_manager(orders_num)
+        def search_all(search):
+            for prefix in PREFIXES:
+                search(prefix, DEFAULT_PAGE_SIZE)
+        scan = mean_time(lambda: search_all(lambda prefix, limit: scan_search(manager, prefix, limit)), args.rounds)
+        index = mean_time(lambda: search_all(manager.search_orders), args.rounds)
+        names = iter(range(10 ** 9))
+        rename = mean_time(lambda: manager.change_customer_name(2, f"Kim {next(names)}"), args.rounds * 100)
+        results[str(orders_num)] = {"scan_s": scan / len(PREFIXES), "index_s": index / len(PREFIXES),
+                                    "rename_s": rename}
+        print(f"{orders_num:8,} {scan / len(PREFIXES) * 1e3:8.2f}ms {index / len(PREFIXES) * 1e3:8.3f}ms "
+              f"{scan / index:7.0f}x {rename * 1e6:7.1f}us")
+    if args.output:
+       save_results(args.output, "bench_search", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
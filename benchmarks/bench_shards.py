@@ -0,0 +1,103 @@
+## bench_shards.py
+## Measures how the throughput of the app scales with processes in the sharded deployment:
+## for each process count n, n table shard servers and n web worker processes (each driving the
+## app through the Flask test client, over the tables of all the shards) run the same request mix,
+## and the aggregate throughput is compared with a single process holding the orders itself.
+## Run from the repository root: python -m benchmarks.bench_shards [--processes 1 2 4] [--output results.json]
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.results import save_results
+
+TABLES_PER_WORKER = 50
+
+
+# Sends the request mix for the worker's tables, returns the number of requests.
+def send_requests(client, tables, rounds):
+    requests_num = 0
+    for _ in range(rounds):
+        for table_number in tables:
+            client.post("/add_order", json={"customer_name": "bench", "table_number": table_number})
+            client.put(f"/orders/{table_number}/dishes/add", json={"name": "Soup", "quantity": 1, "unit_price": 6.5})
+            client.get(f"/orders/{table_number}/status")
+            client.put(f"/orders/{table_number}/dishes/Soup/update_status/Served")
+            client.get(f"/orders/{table_number}/price")
+            client.put(f"/orders/{table_number}/close")
+            requests_num += 6
+    return requests_num
+
+
+# A web worker process: waits for the others, sends its requests, reports (start, end, requests).
+def run_worker(index, addresses, authkey, rounds, barrier, results):
+    from src import app as app_module
+    from src.ShardedOrderManager import ShardedOrderManager
+    from src.OrderManager import OrderManager
+    app_module.order_manager = ShardedOrderManager(addresses, authkey) if addresses else OrderManager()
+    app_module.metrics = None
+    client = app_module.app.test_client()
+    # Every worker has its own tables, consecutive numbers spread over all the shards.
+    tables = range(1 + index * TABLES_PER_WORKER, 1 + (index + 1) * TABLES_PER_WORKER)
+    barrier.wait()
+    start = time.monotonic()
+    requests_num = send_requests(client, tables, rounds)
+    results.put((start, time.monotonic(), requests_num))
+
+
+# Runs workers_num workers against shards_num shard servers (none: the worker holds the orders),
+# returns the aggregate requests per second.
+def run(workers_num, shards_num, rounds):
+    from src.ShardServer import serve_shard, socket_paths
+    authkey = os.urandom(32)
+    with tempfile.TemporaryDirectory() as socket_dir:
+        servers = [multiprocessing.Process(target=serve_shard, args=(index, shards_num, socket_dir, authkey), daemon=True)
+                   for index in range(shards_num)]
+        for server in servers:
+            server.start()
+        addresses = socket_paths(socket_dir, shards_num) if shards_num else None
+        while addresses and not all(os.path.exists(address) for address in addresses):
+            time.sleep(0.01)
+
+        barrier, results = multiprocessing.Barrier(workers_num), multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=run_worker, args=(index, addresses, authkey, rounds, barrier, results))
+                   for index in range(workers_num)]
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        for server in servers:
+            server.terminate()
+            server.join()
+    elapsed = max(end for _, end, _ in reports) - min(start for start, _, _ in reports)
+    return sum(requests_num for _, _, requests_num in reports) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sharded deployment scaling benchmark")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4], help="numbers of shards and workers")
+    parser.add_argument("--rounds", type=int, default=20, help="services per table")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = {"single process": run(1, 0, args.rounds)}
+    for processes_num in args.processes:
+        results[f"{processes_num} shards, {processes_num} workers"] = run(processes_num, processes_num, args.rounds)
+
+    base = results["single process"]
+    print(f"{os.cpu_count()} CPUs")
+    if os.cpu_count() < 2 * max(args.processes):
+       print(f"fewer CPUs than the {2 * max(args.processes)} processes of the largest run: the speedups do not show the scaling")
+    print(f"{'deployment':28} {'req/s':>9} {'speedup':>8}")
+    for name, throughput in results.items():
+        print(f"{name:28} {throughput:9,.0f} {throughput / base:8.2f}")
+    if args.output:
+       save_results(args.output, "bench_shards", vars(args), {"requests_per_s": results})
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+## bench_snapshots.py
+## Measures the latency of the changes to the orders while large reports run on another thread
+## (the whole summary and the pending dishes encoded as the app responds them, and the total price):
+##   - idle:     no reports, the reference;
+##   - locked:   the reports and the changes take one lock, the simple way to get reports of
+##               consistent orders (the changes wait for the whole report);
+##   - snapshot: the reports read OrderManager snapshots (taken in a brief pause of the changes).
+## The changes (a dish served, then pending again) are paced, so their latency is not their throughput.
+## Run from the repository root:
+##   python -m benchmarks.bench_snapshots [--orders 1000 10000 50000] [--output results.json]
+
+import argparse
+import contextlib
+import threading
+import time
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.ResponseEncoder import ResponseEncoder
+from benchmarks.results import latency_stats, save_results
+
+DISHES_PER_ORDER = 4
+MODES = ("idle", "locked", "snapshot")
+
+
+# Returns a manager of orders_num orders, every other dish served.
+def build_manager(orders_num):
+    manager = OrderManager()
+    for i in range(orders_num):
+        manager.add_order(Order(f"customer {i}", i + 1))
+        for j in range(DISHES_PER_ORDER):
+            manager.add_dish_to_order(i + 1, Dish(f"dish {j}", j + 1, 4.5 + j))
+            if (i + j) % 2:
+               manager.update_dish_status(i + 1, f"dish {j}", "Served")
+    return manager
+
+
+# Runs the reports until stopped, counts them in reports.
+def run_reports(manager, encoder, lock, stop, reports):
+    while not stop.is_set():
+        with lock:
+            encoder.encode(manager.summary())
+            encoder.encode({"status": "Pending", "dishes": manager.get_all_dishes_by_status("Pending")})
+            manager.total_orders_price_by_status("All")
+        reports.append(1)
+
+
+# Changes dishes every interval seconds for duration seconds, returns the latencies of the changes.
+def run_changes(manager, orders_num, lock, duration, interval):
+    latencies = []
+    statuses = ("Served", "Pending")
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        table_number = i * 7919 % orders_num + 1
+        start = time.perf_counter()
+        with lock:
+            manager.update_dish_status(table_number, "dish 0", statuses[i // orders_num % 2])
+        latencies.append(time.perf_counter() - start)
+        i += 1
+        time.sleep(max(0, interval - (time.perf_counter() - start)))
+    return latencies
+
+
+# Returns the latency stats of the changes and the reports per second in a mode.
+def run(manager, orders_num, mode, duration, interval):
+    lock = threading.Lock() if mode == "locked" else contextlib.nullcontext()
+    stop, reports = threading.Event(), []
+    reporter = None
+    if mode != "idle":
+       reporter = threading.Thread(target=run_reports, args=(manager, ResponseEncoder(), lock, stop, reports))
+       reporter.start()
+    try:
+        latencies = run_changes(manager, orders_num, lock, duration, interval)
+    finally:
+        stop.set()
+        if reporter is not None:
+           reporter.join()
+    return {"reports_per_s": len(reports) / duration, **latency_stats(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="change latency while reports run: locked vs snapshot reports")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 10_000, 50_000], help="open orders")
+    parser.add_argument("--duration", type=float, default=5, help="seconds of changes per mode")
+    parser.add_argument("--interval", type=float, default=0.001, help="seconds between two changes")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'orders':>8} {'mode':9} {'reports/s':>9} {'p50 us':>8} {'p99 us':>9} {'max us':>9}")
+    for orders_num in args.orders:
+        manager = build_manager(orders_num)
+        for mode in MODES:
+            result = run(manager, orders_num, mode, args.duration, args.interval)
+            results[f"{mode} {orders_num}"] = result
+            print(f"{orders_num:8,} {mode:9} {result['reports_per_s']:9.1f} {result['p50_us']:8.1f} "
+                  f"{result['p99_us']:9.1f} {result['max_us']:9.1f}")
+    if args.output:
+       save_results(args.output, "bench_snapshots", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+## bench_stores.py
+## Runs the same OrderManager workload on the in-memory and the SQLite stores,
+## checks that both give the same answers, and times each operation.
+## Run from the repository root: python -m benchmarks.bench_stores [--orders 100000]
+
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.MemoryOrderStore import MemoryOrderStore
+from src.SQLiteOrderStore import SQLiteOrderStore
+
+DISHES_PER_ORDER = 3
+LOOKUPS_NUM = 2000
+
+
+# Runs the workload and returns (timings in seconds by operation, results to compare).
+def run_workload(manager, orders_num):
+    timings, results = {}, {}
+
+    start = time.perf_counter()
+    for i in range(orders_num):
+        manager.add_order(Order(f"customer {i % 1000}", i + 1))
+        for j in range(DISHES_PER_ORDER):
+            manager.add_dish_to_order(i + 1, Dish(f"dish {j}", j + 1, 4.5 + j))
+    timings["add orders and dishes"] = time.perf_counter() - start
+
+    tables = range(1, orders_num + 1, max(1, orders_num // LOOKUPS_NUM))
+    start = time.perf_counter()
+    for table_number in tables:
+        manager.update_dish_status(table_number, "dish 0", "Served")
+    timings[f"update dish status x{len(tables)}"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for table_number in tables[::2]:
+        manager.close_order(table_number)
+    timings[f"close order x{len(tables[::2])}"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results["find"] = [manager.find_order("table_number", table_number).to_dict() for table_number in tables[1::2]]
+    timings[f"find order x{len(tables[1::2])}"] = time.perf_counter() - start
+
+    for status in ("Pending", "Served", "Done"):
+        start = time.perf_counter()
+        results[f"tables {status}"] = manager.get_table_numbers_by_order_status(status)
+        timings[f"table numbers by status {status}"] = time.perf_counter() - start
+
+    for status in ("Pending", "Served", "Done", "All"):
+        start = time.perf_counter()
+        results[f"total {status}"] = manager.total_orders_price_by_status(status)
+        timings[f"total price by status {status}"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results["served dishes"] = [dish.to_dict() for dish in manager.get_all_dishes_by_status("Served")]
+    timings["all dishes by status Served"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results["summary"] = manager.to_dict()
+    timings["to_dict"] = time.perf_counter() - start
+    return timings, results
+
+
+# Returns the names of the results that differ between the two stores.
+# Totals are compared with a relative tolerance: SQL SUM rounds differently than the exact running totals.
+def compare_results(expected, actual):
+    different = []
+    for name, value in expected.items():
+        if name.startswith("total"):
+           if not math.isclose(value, actual[name]):
+              different.append(name)
+        elif value != actual[name]:
+           different.append(name)
+    return different
+
+
+def main():
+    parser = argparse.ArgumentParser(description="in-memory vs SQLite store benchmark")
+    parser.add_argument("--orders", type=int, default=100_000, help="number of orders")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            "memory": MemoryOrderStore(),
+            "sqlite": SQLiteOrderStore(os.path.join(directory, "orders.db")),
+        }
+        runs = {name: run_workload(OrderManager(store=store), args.orders) for name, store in stores.items()}
+        stores["sqlite"].close()
+
+    print(f"{'operation':40} {'memory':>10} {'sqlite':>10}  ({args.orders} orders, seconds)")
+    for operation in runs["memory"][0]:
+        print(f"{operation:40} {runs['memory'][0][operation]:10.4f} {runs['sqlite'][0][operation]:10.4f}")
+    different = compare_results(runs["memory"][1], runs["sqlite"][1])
+    print("results match" if not different else f"results differ: {', '.join(different)}")
+
+
+if __name__ == "__main__":
+    main()
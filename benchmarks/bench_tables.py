@@ -0,0 +1,81 @@
+## bench_tables.py
+## Compares rendering a POS screen with one request per attribute (GET /orders/<t>/price, /status,
+## /customer_name and /dishes_by_status/Pending) with one GET /orders/<t>?fields=... request,
+## and a screen of several tables with one GET /orders?tables=... request, through the Flask test client.
+## Run from the repository root: python -m benchmarks.bench_tables [--tables 200] [--screen 8] [--output results.json]
+
+import argparse
+import time
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from benchmarks.results import save_results
+
+FIELDS = "total_price,status,customer_name,pending_dishes"
+
+
+# Returns a test client of the app over a manager with an order of 4 dishes at every table.
+def new_client(tables_num):
+    app_module.order_manager = manager = OrderManager()
+    app_module.metrics = None
+    for table_number in range(1, tables_num + 1):
+        manager.add_order(Order(f"customer {table_number}", table_number))
+        for j in range(4):
+            manager.add_dish_to_order(table_number, Dish(f"dish {j}", j + 1, 4.5 + j))
+    return app_module.app.test_client()
+
+
+# Renders the table with one request per attribute.
+def per_attribute(client, table_numbers):
+    for table_number in table_numbers:
+        for path in ("price", "status", "customer_name", "dishes_by_status/Pending"):
+            client.get(f"/orders/{table_number}/{path}").get_data()
+
+
+# Renders every table with one request.
+def per_table(client, table_numbers):
+    for table_number in table_numbers:
+        client.get(f"/orders/{table_number}?fields={FIELDS}").get_data()
+
+
+# Renders all the tables with one request.
+def all_tables(client, table_numbers):
+    client.get(f"/orders?tables={','.join(map(str, table_numbers))}&fields={FIELDS}").get_data()
+
+
+# Returns the mean time of a screen of the tables, rendered by render over every screen of the tables.
+def screen_time(render, client, tables_num, screen):
+    screens = [list(range(start, min(start + screen, tables_num + 1))) for start in range(1, tables_num + 1, screen)]
+    start = time.perf_counter()
+    for table_numbers in screens:
+        render(client, table_numbers)
+    return (time.perf_counter() - start) / len(screens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POS screen: one request per attribute vs table snapshots")
+    parser.add_argument("--tables", type=int, default=200, help="tables with an open order")
+    parser.add_argument("--screen", type=int, default=8, help="tables on a screen")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    client = new_client(args.tables)
+    results = {}
+    print(f"{'screen of ' + str(args.screen) + ' tables':32} {'requests':>8} {'time':>9} {'speedup':>8}")
+    baseline = None
+    for name, render, requests_num in (("one request per attribute", per_attribute, 4 * args.screen),
+                                       ("one request per table", per_table, args.screen),
+                                       ("one request for all the tables", all_tables, 1)):
+        elapsed = screen_time(render, client, args.tables, args.screen)
+        baseline = baseline or elapsed
+        results[name] = {"requests": requests_num, "screen_s": elapsed}
+        print(f"{name:32} {requests_num:8} {elapsed * 1e3:7.2f}ms {baseline / elapsed:7.1f}x")
+    if args.output:
+       save_results(args.output, "bench_tables", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+## compare.py
+## Compares the latencies of two saved benchmark runs, operation by operation.
+## Run from the repository root: python -m benchmarks.compare old.json new.json [--stat p50_us]
+
+import argparse
+import json
+
+
+# Flattens the nested results into {"group / operation": stats} for every dict holding the stat.
+def flatten(results, stat, prefix=""):
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+           if stat in value:
+              flat[prefix + name] = value
+           else:
+              flat.update(flatten(value, stat, f"{prefix}{name} / "))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--stat", default="p50_us", help="latency stat to compare (mean_us, p50_us, p99_us)")
+    args = parser.parse_args()
+
+    with open(args.old) as old_file, open(args.new) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    if old["benchmark"] != new["benchmark"]:
+       raise SystemExit(f"cannot compare {old['benchmark']} results with {new['benchmark']} results")
+    old_results, new_results = flatten(old["results"], args.stat), flatten(new["results"], args.stat)
+
+    print(f"{'operation':64} {'old':>10} {'new':>10} {'new/old':>8}  ({args.stat})")
+    for name, old_stats in old_results.items():
+        if name not in new_results:
+           continue
+        old_value, new_value = old_stats[args.stat], new_results[name][args.stat]
+        ratio = f"{new_value / old_value:8.2f}" if old_value else f"{'-':>8}"
+        print(f"{name:64} {old_value:10.1f} {new_value:10.1f} {ratio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+## load_app.py
+## End-to-end load generator: simulated waiters drive the app routes with a realistic service,
+## each table going through open, add dishes, kitchen status updates, polls and close,
+## and the throughput and p50/p99 latency of every route are reported.
+## Requests go through the Flask test client (a fresh in-memory manager) or, with --url, to a running server.
+## Run from the repository root:
+##   python -m benchmarks.load_app [--threads 8] [--tables 200] [--url http://127.0.0.1:5000] [--output results.json]
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from benchmarks.results import latency_stats, save_results
+
+MENU = [("Soup", 6.5), ("Salad", 8.0), ("Steak", 24.9), ("Fish", 19.5), ("Pasta", 13.0),
+        ("Cake", 7.5), ("Coffee", 3.2), ("Wine", 9.9)]
+CUSTOMER_NAMES = ["Ann", "Bob", "Cy", "Dee", "Eve", "Finn"]
+
+
+# Sends requests to a running server with urllib, returns the status code.
+class HttpClient:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+# Sends requests through the Flask test client, returns the status code.
+class TestClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        return self.client.open(path, method=method, json=body).status_code
+
+
+# A waiter serving its own tables one service after another, timing every request by route.
+class Waiter:
+    def __init__(self, client, rng, tables):
+        self.client = client
+        self.rng = rng
+        self.tables = tables
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def send(self, route, method, path, body=None, expected=(200, 201)):
+        start = time.perf_counter()
+        status_code = self.client.request(method, path, body)
+        self.latencies[route].append(time.perf_counter() - start)
+        if status_code not in expected:
+           self.errors[f"{route} {status_code}"] += 1
+
+    # One service at a table: open it, order dishes in rounds while the kitchen serves them
+    # and the table polls its status and price, then close it.
+    def serve(self, table):
+        rng = self.rng
+        self.send("add_order", "POST", "/add_order",
+                  {"customer_name": rng.choice(CUSTOMER_NAMES), "table_number": table})
+        ordered = []
+        for _ in range(rng.randint(1, 3)):
+            for name, unit_price in rng.sample(MENU, rng.randint(1, 3)):
+                if name in ordered:
+                   self.send("update_quantity", "PUT", f"/orders/{table}/dishes/{name}/update_quantity/{rng.randint(2, 4)}")
+                else:
+                   self.send("add dish", "PUT", f"/orders/{table}/dishes/add",
+                             {"name": name, "quantity": rng.randint(1, 2), "unit_price": unit_price})
+                   ordered.append(name)
+            self.send("status", "GET", f"/orders/{table}/status")
+            for name in ordered:
+                self.send("update_status", "PUT", f"/orders/{table}/dishes/{name}/update_status/Served")
+            self.send("pending dishes", "GET", f"/orders/{table}/dishes_by_status/Pending")
+        if len(ordered) > 1 and rng.random() < 0.1:
+           self.send("remove dish", "PUT", f"/orders/{table}/dishes/remove", {"name": ordered.pop()})
+        self.send("price", "GET", f"/orders/{table}/price")
+        self.send("close", "PUT", f"/orders/{table}/close")
+
+    # Dashboard polls, sent between services.
+    def poll(self):
+        route, path = self.rng.choice([
+            ("active count", "/orders/active_count"),
+            ("total price", "/orders/total_price/All"),
+            ("tables by status", "/orders/tables_numbers_by_status/Pending"),
+            ("summary page", "/orders/summary?status=Pending&limit=50"),
+        ])
+        self.send(route, "GET", path)
+
+    def run(self, services_num):
+        for _ in range(services_num):
+            self.serve(self.rng.choice(self.tables))
+            self.poll()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="end-to-end load generator for the order service")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent waiters")
+    parser.add_argument("--services", type=int, default=200, help="table services per waiter")
+    parser.add_argument("--tables", type=int, default=200, help="tables, split between the waiters")
+    parser.add_argument("--url", help="base URL of a running server (default: the Flask test client)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    if args.url:
+       make_client = lambda: HttpClient(args.url)
+    else:
+       from src import app as app_module
+       from src.OrderManager import OrderManager
+       app_module.order_manager = OrderManager()
+       make_client = lambda: TestClient(app_module.app)
+
+    # Every waiter has its own tables, so its requests never conflict with another waiter's.
+    tables_per_waiter = max(1, args.tables // args.threads)
+    waiters = [Waiter(make_client(), random.Random(args.seed + index),
+                      range(1 + index * tables_per_waiter, 1 + (index + 1) * tables_per_waiter))
+               for index in range(args.threads)]
+    threads = [threading.Thread(target=waiter.run, args=(args.services,)) for waiter in waiters]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    for waiter in waiters:
+        for route, values in waiter.latencies.items():
+            latencies[route].extend(values)
+        for error, count in waiter.errors.items():
+            errors[error] += count
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    results = {
+        "elapsed_s": elapsed,
+        "requests": len(all_latencies),
+        "requests_per_s": len(all_latencies) / elapsed,
+        "all": latency_stats(all_latencies),
+        "routes": {route: latency_stats(values) for route, values in sorted(latencies.items())},
+        "errors": dict(errors),
+    }
+
+    print(f"{results['requests']} requests from {args.threads} waiters in {elapsed:.2f}s "
+          f"({results['requests_per_s']:,.0f} req/s), {sum(errors.values())} unexpected responses")
+    print(f"{'route':20} {'requests':>9} {'mean us':>10} {'p50 us':>10} {'p99 us':>10}")
+    for route, stats in [("all", results["all"])] + list(results["routes"].items()):
+        print(f"{route:20} {stats['count']:9} {stats['mean_us']:10.1f} {stats['p50_us']:10.1f} {stats['p99_us']:10.1f}")
+    for error, count in errors.items():
+        print(f"unexpected: {error} x{count}")
+    if args.output:
+       save_results(args.output, "load_app", vars(args), results)
+       print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
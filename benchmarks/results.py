@@ -0,0 +1,44 @@
+## results.py
+## Latency statistics and JSON result files shared by the benchmarks, so runs can be compared:
+## python -m benchmarks.compare old.json new.json
+
+import datetime
+import json
+import platform
+import sys
+
+
+# Returns the p-th percentile (0-100) of the sorted values, by the nearest-rank method.
+def percentile(sorted_values, p):
+    if not sorted_values:
+       return 0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+# Summarizes latencies in seconds as counts and microseconds.
+def latency_stats(latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "count": len(latencies),
+        "mean_us": total / len(latencies) * 1e6 if latencies else 0,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "max_us": latencies[-1] * 1e6 if latencies else 0,
+    }
+
+
+# Writes the results of a benchmark run, with its parameters and the environment, to a JSON file.
+def save_results(path, benchmark, parameters, results):
+    data = {
+        "benchmark": benchmark,
+        "parameters": parameters,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+        file.write("\n")
@@ -0,0 +1,176 @@
+## stress_threads.py
+## Hammers every route of the app from many threads at once, then checks that the
+## OrderManager counters, indexes, totals and journal are still consistent.
+## Run from the repository root: python -m benchmarks.stress_threads [--threads 16] [--requests 2000]
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from src import app as app_module
+from src.OrderJournal import OrderJournal
+from src.OrderManager import OrderManager
+from src.SQLiteOrderStore import SQLiteOrderStore
+
+DISH_NAMES = ["Soup", "Steak", "Fish", "Cake", "Tea"]
+CUSTOMER_NAMES = ["Ann", "Bob", "Cy", "Dee"]
+
+
+# Sends one random request, returns (route name, status code).
+def send_random_request(client, rng, tables_num):
+    table = rng.randint(1, tables_num)
+    dish = rng.choice(DISH_NAMES)
+    roll = rng.random()
+    if roll < 0.12:
+       route = "add_order"
+       response = client.post("/add_order", json={"customer_name": rng.choice(CUSTOMER_NAMES), "table_number": table})
+    elif roll < 0.40:
+       route = "add dish"
+       response = client.put(f"/orders/{table}/dishes/add",
+                             json={"name": dish, "quantity": rng.randint(1, 4), "unit_price": rng.choice([9.9, 12.5, 3])})
+    elif roll < 0.46:
+       route = "remove dish"
+       response = client.put(f"/orders/{table}/dishes/remove", json={"name": dish})
+    elif roll < 0.56:
+       route = "update_quantity"
+       response = client.put(f"/orders/{table}/dishes/{dish}/update_quantity/{rng.randint(1, 5)}")
+    elif roll < 0.70:
+       route = "update_status"
+       response = client.put(f"/orders/{table}/dishes/{dish}/update_status/{rng.choice(['Served', 'Pending'])}")
+    elif roll < 0.75:
+       route = "close"
+       response = client.put(f"/orders/{table}/close")
+    elif roll < 0.77:
+       route = "change_customer_name"
+       response = client.put(f"/orders/{table}/change_customer_name/{rng.choice(CUSTOMER_NAMES)}")
+    elif roll < 0.785:
+       route = "table batch"
+       response = client.post(f"/orders/{table}/dishes/batch", json={"operations": [
+           {"action": "add", "name": rng.choice(DISH_NAMES), "quantity": 1, "unit_price": 4.5},
+           {"action": "update_status", "name": dish, "status": "Served"}]})
+    elif roll < 0.79:
+       route = "batch"
+       response = client.post("/batch", json={"operations": [
+           {"table_number": rng.randint(1, tables_num), "action": "update_quantity", "name": dish, "quantity": 2},
+           {"table_number": rng.randint(1, tables_num), "action": "remove", "name": dish}]})
+    elif roll < 0.80:
+       route = "remove_order"
+       identifier = rng.choice([("table_number", table), ("id", rng.randint(1, 50)), ("customer_name", rng.choice(CUSTOMER_NAMES))])
+       response = client.delete(f"/remove_order/{identifier[0]}/{identifier[1]}")
+    else:
+       route, url = rng.choice([
+           ("price", f"/orders/{table}/price"),
+           ("status", f"/orders/{table}/status"),
+           ("customer_name", f"/orders/{table}/customer_name"),
+           ("dish unit_price", f"/orders/{table}/dishes/{dish}/unit_price"),
+           ("dish status", f"/orders/{table}/dishes/{dish}/status"),
+           ("find_order", f"/order/table_number/{table}"),
+           ("tables by status", f"/orders/tables_numbers_by_status/{rng.choice(['Pending', 'Served', 'Done'])}"),
+           ("table dishes by status", f"/orders/{table}/dishes_by_status/Pending"),
+           ("dishes by status", "/dishes_by_status/Pending"),
+           ("total price", f"/orders/total_price/{rng.choice(['Pending', 'Served', 'Done', 'All'])}"),
+           ("counts", "/orders/active_count"),
+           ("summary", "/orders/summary"),
+       ])
+       response = client.get(url)
+    return route, response.status_code
+
+
+# Returns the list of broken invariants of the manager.
+def check_invariants(manager, added_orders_num):
+    failures = []
+    orders = manager.orders
+    ids = [order.id for order in orders]
+    if len(ids) != len(set(ids)):
+       failures.append("duplicate order ids")
+    if manager.created_orders_num != added_orders_num:
+       failures.append(f"created_orders_num is {manager.created_orders_num}, {added_orders_num} orders were added")
+    if manager.stored_orders_num != len(orders):
+       failures.append(f"stored_orders_num is {manager.stored_orders_num}, {len(orders)} orders are stored")
+    active_orders = [order for order in orders if order.status != "Done"]
+    if manager.active_orders_num != len(active_orders):
+       failures.append(f"active_orders_num is {manager.active_orders_num}, {len(active_orders)} orders are active")
+    first_active = {}
+    for order in active_orders:
+        first_active.setdefault(order.table_number, order.id)
+    for table_number, order_id in first_active.items():
+        if manager.find_order("table_number", table_number).id != order_id:
+           failures.append(f"table {table_number} index does not point to order {order_id}")
+    for order in orders:
+        pending_num = sum(dish.status == "Pending" for dish in order.dishes)
+        if order.status != "Done" and order.status != ("Pending" if pending_num else "Served"):
+           failures.append(f"order {order.id} status {order.status} with {pending_num} pending dishes")
+    try:
+        manager.verify_totals()
+    except RuntimeError as e:
+        failures.append(str(e))
+    return failures
+
+
+# Returns a manager on the store, recovering the orders left in the directory: in memory with a journal,
+# or in an SQLite database (which keeps them by itself); and the journal or database, to close when done.
+def open_manager(store, directory, snapshot_every):
+    if store == "sqlite":
+       database = SQLiteOrderStore(os.path.join(directory, "orders.db"))
+       return OrderManager(store=database), database
+    journal = OrderJournal(os.path.join(directory, "journal"), snapshot_every=snapshot_every)
+    return OrderManager(journal=journal), journal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-threaded stress test of the order service")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per thread")
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--snapshot-every", type=int, default=5000, help="journal snapshot interval")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manager, files = open_manager(args.store, directory, args.snapshot_every)
+        app_module.order_manager = manager
+        results = Counter()
+        results_lock = threading.Lock()
+
+        def worker(seed):
+            client = app_module.app.test_client()
+            rng = random.Random(seed)
+            local_results = Counter()
+            for _ in range(args.requests):
+                local_results[send_random_request(client, rng, args.tables)] += 1
+            with results_lock:
+                results.update(local_results)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        failures = check_invariants(manager, results[("add_order", 201)])
+        state = manager.to_dict(timestamps=True)
+        files.close()
+        recovered, files = open_manager(args.store, directory, args.snapshot_every)
+        if recovered.to_dict(timestamps=True) != state:
+           failures.append(f"the state recovered from the {args.store} store differs from the live state")
+        files.close()
+
+    requests_num = sum(results.values())
+    errors_num = sum(count for (_, code), count in results.items() if code >= 500)
+    print(f"{requests_num} requests from {args.threads} threads in {elapsed:.2f}s ({requests_num / elapsed:,.0f} req/s), "
+          f"{errors_num} server errors")
+    for failure in failures:
+        print("FAILED:", failure)
+    if failures or errors_num:
+       raise SystemExit(1)
+    print("all invariants hold")
+
+
+if __name__ == "__main__":
+    main()
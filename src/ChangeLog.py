@@ -0,0 +1,71 @@
+## ChangeLog.py
+## The latest change version of every changed order, for clients that sync only what changed
+## since the version they have. Entries are kept in version order, so reading the changes since
+## a version costs the number of changes, not the number of orders.
+## Entries at or below the floor are compacted away: once every known client has acknowledged
+## a version, or when the log grows beyond max_entries (a client behind the floor resyncs fully).
+
+import threading
+import time
+from collections import OrderedDict
+
+class ChangeLog:
+    # constructor.
+    # max_entries- the most entries kept, whatever the clients acknowledged.
+    # client_ttl- seconds after which a silent client no longer holds back the compaction.
+    def __init__(self, max_entries=100_000, client_ttl=300):
+        self.max_entries = max_entries
+        self.client_ttl = client_ttl
+        self.__entries = OrderedDict()   # order id -> (version, removed), in increasing version order.
+        self.__clients = {}              # client id -> (acknowledged version, last seen time).
+        self.__floor = 0                 # The changes at or below this version were compacted away.
+        self.__lock = threading.Lock()
+
+    @property
+    def floor(self):
+        return self.__floor
+
+    def __len__(self):
+        return len(self.__entries)
+
+    # Records that the order changed (or was removed) at the version, which must not be lower than
+    # the versions already recorded.
+    def record(self, order_id, version, removed=False):
+        with self.__lock:
+            self.__entries[order_id] = (version, removed)
+            self.__entries.move_to_end(order_id)
+            if len(self.__entries) > self.max_entries:
+               self.__compact(self.__entries[next(iter(self.__entries))][0])
+
+    # Returns the (order id, version, removed) entries above since, in version order,
+    # or None if since is below the floor: changes after it may have been compacted away.
+    def changes_since(self, since):
+        with self.__lock:
+            if since < self.__floor:
+               return None
+            changes = []
+            for order_id, (version, removed) in reversed(self.__entries.items()):
+                if version <= since:
+                   break
+                changes.append((order_id, version, removed))
+        changes.reverse()
+        return changes
+
+    # Records that a client has all the changes up to version, and compacts the entries
+    # that every client still heard from within client_ttl has.
+    def acknowledge(self, client_id, version):
+        now = time.monotonic()
+        with self.__lock:
+            self.__clients[client_id] = (version, now)
+            for stale_id in [stale_id for stale_id, (_, seen) in self.__clients.items() if now - seen > self.client_ttl]:
+                del self.__clients[stale_id]
+            self.__compact(min(acknowledged for acknowledged, _ in self.__clients.values()))
+
+    # Drops the entries at or below the version, and raises the floor to it.
+    def __compact(self, version):
+        while self.__entries:
+            order_id = next(iter(self.__entries))
+            if self.__entries[order_id][0] > version:
+               break
+            del self.__entries[order_id]
+        self.__floor = max(self.__floor, version)
@@ -0,0 +1,58 @@
+## CustomerIndex.py
+## Indexes orders by customer name for case-insensitive prefix search: a sorted list of
+## (case folded name, order id) keys, searched by bisection, so a search costs O(log n) plus
+## the matches it returns, whatever the number of orders.
+
+import bisect
+import threading
+
+class CustomerIndex:
+    # constructor, Initializes an empty index.
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__keys = []               # (case folded customer name, order id), sorted.
+        self.__names = {}              # order id -> its case folded customer name, as indexed.
+
+    # Number of indexed orders.
+    def __len__(self):
+        return len(self.__names)
+
+    # Indexes an order under its customer name, replacing the name it was indexed under.
+    # Costs nothing when the name did not change; an insertion shifts the keys after it (a memmove).
+    def update(self, order_id, customer_name):
+        name = customer_name.casefold()
+        with self.__lock:
+            indexed = self.__names.get(order_id)
+            if indexed == name:
+               return
+            if indexed is not None:
+               del self.__keys[bisect.bisect_left(self.__keys, (indexed, order_id))]
+            bisect.insort(self.__keys, (name, order_id))
+            self.__names[order_id] = name
+
+    # Removes an order from the index, if it is there.
+    def discard(self, order_id):
+        with self.__lock:
+            indexed = self.__names.pop(order_id, None)
+            if indexed is not None:
+               del self.__keys[bisect.bisect_left(self.__keys, (indexed, order_id))]
+
+    # Replaces the index by the orders (when the manager starts or is loaded).
+    def rebuild(self, orders):
+        names = {order.id: order.customer_name.casefold() for order in orders}
+        with self.__lock:
+            self.__names = names
+            self.__keys = sorted((name, order_id) for order_id, name in names.items())
+
+    # Returns the ids of up to limit orders whose customer name starts with prefix, ignoring case,
+    # ordered by name (case folded) then id.
+    def search(self, prefix, limit):
+        prefix = prefix.casefold()
+        ids = []
+        with self.__lock:
+            start = bisect.bisect_left(self.__keys, (prefix,))
+            for name, order_id in self.__keys[start:start + limit]:
+                if not name.startswith(prefix):
+                   break
+                ids.append(order_id)
+        return ids
@@ -1,10 +1,24 @@
 ## Dish.py
 ## Represents a dish in an order, including its name, quantity, unit_price, and status.
 
+import time
+
+from .JSONFormat import encode_number, encode_string
+
 class Dish:
-    # constructor
-    # Dish status must be 'Pending' or 'Served'.
+    # Fixed attributes instead of a per-object __dict__, to keep many dishes compact in memory.
+    __slots__ = ("__name", "__quantity", "__unit_price", "__status", "__pending_since", "__menu_item",
+                 "__version", "__cached_dict", "__cached_json")
+
+    # constructor, for an ad-hoc dish (see from_menu_item for a dish on the menu).
+    # Dish status must be 'Pending' or 'Served'; pending_since is when the dish last became Pending.
+    # The version counts the changes to the dish; to_dict and to_json are cached until the next change.
     def __init__(self, name, quantity, unit_price):
+        self.__version = 0
+        self.__cached_dict = None
+        self.__cached_json = None
+        self.__menu_item = None
+        self.__status = None
         self.name = name
         self.quantity = quantity
         self.unit_price = unit_price
@@ -25,6 +39,8 @@ class Dish:
         if not name:
            raise ValueError("name cannot be empty")
         self.__name = name
+        self.__menu_item = None
+        self.__version += 1
 
     @property
     def quantity(self):
@@ -40,6 +56,7 @@ class Dish:
         if quantity <= 0:
            raise ValueError("quantity must be positive")
         self.__quantity = quantity
+        self.__version += 1
 
     @property
     def unit_price(self):
@@ -55,6 +72,8 @@ class Dish:
         if unit_price <= 0:
            raise ValueError("unit price must be positive")
         self.__unit_price = float(unit_price)
+        self.__menu_item = None
+        self.__version += 1
   
     @property
     def status(self):
@@ -69,17 +88,146 @@ class Dish:
            raise TypeError("status must be a string")
         if status not in {"Pending", "Served"}:
            raise ValueError("status must be 'Pending' or 'Served'")
+        if status != self.__status:
+           self.__pending_since = time.time() if status == "Pending" else None
         self.__status = status
+        self.__version += 1
+
+    # When the dish last became Pending (Unix time in seconds), None while it is Served.
+    @property
+    def pending_since(self):
+        return self.__pending_since
+
+    # Sets when the dish became Pending (restoring a dish), ensuring it is a non-negative number,
+    # or None for a Served dish.
+    @pending_since.setter
+    def pending_since(self, pending_since):
+        if (pending_since is None) != (self.__status != "Pending"):
+           raise ValueError("pending since must be set for a Pending dish only")
+        if pending_since is not None:
+           if isinstance(pending_since, bool) or not isinstance(pending_since, (int, float)):
+              raise TypeError("pending since must be a number")
+           if not pending_since >= 0:
+              raise ValueError("pending since cannot be negative")
+        self.__pending_since = pending_since
+        self.__version += 1
+
+    # The menu item the dish was ordered from, None for an ad-hoc dish.
+    @property
+    def menu_item(self):
+        return self.__menu_item
+
+    # Builds a dish of a menu item: its name and price are the item's (validated once by the item),
+    # only the quantity is checked.
+    @classmethod
+    def from_menu_item(cls, item, quantity):
+        dish = cls.__new__(cls)
+        dish.__version = 0
+        dish.__cached_dict = None
+        dish.__cached_json = None
+        dish.__name = item.name
+        dish.__unit_price = item.unit_price
+        dish.__menu_item = item
+        dish.__status = None
+        dish.quantity = quantity
+        dish.status = "Pending"
+        return dish
+
+    # Links the dish to the menu item of the same name and price, sharing the item's name and price.
+    # Returns whether it is linked (a dish named after the item with another price stays ad-hoc).
+    def link_menu_item(self, item):
+        if item is None or item.name != self.__name or item.unit_price != self.__unit_price:
+           return False
+        self.__name, self.__unit_price, self.__menu_item = item.name, item.unit_price, item
+        return True
 
     # total price of dish
     def get_total_price(self):
         return self.quantity * self.unit_price
       
-    def to_dict(self):
-        return {
+    # Checks a dictionary representation of a dish (as returned by to_dict, the total price is ignored)
+    # in one pass, with the same rules as the setters, so from_valid_dict can skip them.
+    @staticmethod
+    def check_dict(data):
+        if not isinstance(data, dict):
+           raise TypeError("dish must be an object")
+        name, quantity, unit_price, status = data.get("name"), data.get("quantity"), data.get("unit price"), data.get("status")
+        if name is None or quantity is None or unit_price is None or status is None:
+           raise ValueError("dish must have a name, quantity, unit price and status")
+        if not isinstance(name, str) or not isinstance(quantity, int) or not isinstance(unit_price, (int, float)):
+           raise TypeError("dish name must be a string, quantity a integer and unit price a number")
+        if not name.strip():
+           raise ValueError("name cannot be empty")
+        if quantity <= 0 or unit_price <= 0:
+           raise ValueError("quantity and unit price must be positive")
+        if status not in {"Pending", "Served"}:
+           raise ValueError("status must be 'Pending' or 'Served'")
+        pending_since = data.get("pending since")
+        if pending_since is not None and (isinstance(pending_since, bool) or not isinstance(pending_since, (int, float))
+                                          or not pending_since >= 0):
+           raise ValueError("pending since must be a non-negative number")
+
+    # Builds a dish from a dictionary representation that passed check_dict, without validating it again.
+    @classmethod
+    def from_valid_dict(cls, data):
+        dish = cls.__new__(cls)
+        dish.__version = 0
+        dish.__cached_dict = None
+        dish.__cached_json = None
+        dish.__menu_item = None
+        dish.__name = data["name"].strip()
+        dish.__quantity = data["quantity"]
+        dish.__unit_price = float(data["unit price"])
+        dish.__status = data["status"]
+        dish.__pending_since = None
+        if dish.__status == "Pending":
+           dish.__pending_since = time.time() if data.get("pending since") is None else data["pending since"]
+        return dish
+
+    # Builds a dish from its dictionary representation (as returned by to_dict),
+    # restoring when it became Pending if the dict has it.
+    @classmethod
+    def from_dict(cls, data):
+        dish = cls(data["name"], data["quantity"], data["unit price"])
+        dish.status = data["status"]
+        if dish.status == "Pending" and data.get("pending since") is not None:
+           dish.pending_since = data["pending since"]
+        return dish
+
+    @property
+    def version(self):
+        return self.__version
+
+    # Returns the dish as a dict, built once per version of the dish (callers must not modify it).
+    # The version is read first, so a dict built while the dish changes is never reused.
+    # timestamps- whether to include pending since, as the journal, the shards and the exports need;
+    # without it (as in the responses), a new dict is built from the cached one.
+    def to_dict(self, timestamps=False):
+        if not timestamps:
+           return {key: value for key, value in self.to_dict(True).items() if key != "pending since"}
+        version, cached = self.__version, self.__cached_dict
+        if cached is not None and cached[0] == version:
+           return cached[1]
+        data = {
             "name": self.name,
             "unit price": self.unit_price,
             "quantity": self.quantity,
             "status": self.status,
-            "total price": self.get_total_price()
+            "total price": self.get_total_price(),
+            "pending since": self.pending_since
         }
+        self.__cached_dict = (version, data)
+        return data
+
+    # Returns the dish as JSON, exactly as json.dumps(to_dict(timestamps)) with sorted keys, compact separators
+    # and ensure_ascii, written directly (see ResponseEncoder).
+    def to_json(self, timestamps=False):
+        version, cached = self.__version, self.__cached_json
+        if cached is not None and cached[0] == version and cached[1] == timestamps:
+           return cached[2]
+        pending_since = f'"pending since":{encode_number(self.pending_since)},' if timestamps else ""
+        data = (f'{{"name":{encode_string(self.name)},{pending_since}'
+                f'"quantity":{encode_number(self.quantity)},"status":{encode_string(self.status)},'
+                f'"total price":{encode_number(self.get_total_price())},"unit price":{encode_number(self.unit_price)}}}')
+        self.__cached_json = (version, timestamps, data)
+        return data
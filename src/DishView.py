@@ -0,0 +1,56 @@
+## DishView.py
+## An immutable point-in-time view of a dish, read from its dictionary representation (see Dish.to_dict):
+## the reads of a Dish, for the reports that run on an OrderSnapshot.
+
+from .JSONFormat import encode_number, encode_string
+
+class DishView:
+    __slots__ = ("__data", "__cached_json")
+
+    # constructor, data- the dict of the dish at some version (Dish.to_dict builds a new one per version,
+    # never changed afterwards), shared with the dish rather than copied.
+    def __init__(self, data):
+        self.__data = data
+        self.__cached_json = None
+
+    @property
+    def name(self):
+        return self.__data["name"]
+
+    @property
+    def quantity(self):
+        return self.__data["quantity"]
+
+    @property
+    def unit_price(self):
+        return self.__data["unit price"]
+
+    @property
+    def status(self):
+        return self.__data["status"]
+
+    @property
+    def pending_since(self):
+        return self.__data["pending since"]
+
+    def get_total_price(self):
+        return self.__data["total price"]
+
+    # Returns a new dish dict without pending since, or with timestamps the dish dict (callers must not modify it),
+    # like Dish.to_dict.
+    def to_dict(self, timestamps=False):
+        if not timestamps:
+           return {key: value for key, value in self.__data.items() if key != "pending since"}
+        return self.__data
+
+    # Returns the dish as JSON, exactly as Dish.to_json, built once.
+    def to_json(self, timestamps=False):
+        cached = self.__cached_json
+        if cached is None or cached[0] != timestamps:
+           data = self.__data
+           pending_since = f'"pending since":{encode_number(data["pending since"])},' if timestamps else ""
+           cached = self.__cached_json = (timestamps,
+                                          f'{{"name":{encode_string(data["name"])},{pending_since}'
+                                          f'"quantity":{encode_number(data["quantity"])},"status":{encode_string(data["status"])},'
+                                          f'"total price":{encode_number(data["total price"])},"unit price":{encode_number(data["unit price"])}}}')
+        return cached[1]
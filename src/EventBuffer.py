@@ -0,0 +1,71 @@
+## EventBuffer.py
+## A bounded ring buffer of the latest events, for clients that follow the changes as a stream.
+## Every event gets the next sequence number; a client resumes with the token of the last event it got
+## and receives only the events after it, or is told to reload its state if they were already dropped
+## (or the token comes from an earlier process).
+
+import os
+import threading
+from collections import deque
+
+class EventBuffer:
+    # constructor, capacity- the number of latest events kept.
+    def __init__(self, capacity=10_000):
+        if not isinstance(capacity, int) or capacity <= 0:
+           raise ValueError("capacity must be a positive int")
+        self.capacity = capacity
+        self.epoch = os.urandom(4).hex()        # Tells the tokens of this buffer from older ones.
+        self.__events = deque(maxlen=capacity)  # (sequence number, event type, data), oldest first.
+        self.__seq = 0                          # Sequence number of the latest event.
+        self.__condition = threading.Condition(threading.Lock())
+        self.__listeners = []                   # Called after every event, see add_listener.
+
+    # Sequence number of the latest event (0 before the first one).
+    @property
+    def seq(self):
+        return self.__seq
+
+    # Returns the resume token of an event sequence number.
+    def token(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    # Returns the sequence number of a resume token, or None if it is not a token of this buffer.
+    def parse_token(self, token):
+        epoch, _, seq = (token or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.__seq:
+           return None
+        return int(seq)
+
+    # Appends an event and wakes up the waiting clients.
+    def publish(self, event_type, data):
+        with self.__condition:
+            self.__seq += 1
+            self.__events.append((self.__seq, event_type, data))
+            self.__condition.notify_all()
+        for listener in self.__listeners:
+            listener()
+
+    # Returns (events after seq, whether some events after seq were already dropped).
+    # The events are read from the newest end, so a client that keeps up costs little.
+    def __since(self, seq):
+        missed_num = self.__seq - seq
+        if missed_num > len(self.__events):
+           return list(self.__events), True
+        return [self.__events[i] for i in range(-missed_num, 0)], False
+
+    # Returns (events after seq, whether some were missed) without waiting.
+    def since(self, seq):
+        with self.__condition:
+            return self.__since(seq)
+
+    # Calls listener() after every event is published, from the publishing thread;
+    # for clients that wait for events without a thread of their own (see asgi.py).
+    def add_listener(self, listener):
+        self.__listeners.append(listener)
+
+    # Returns (events after seq, whether some were missed), waiting up to timeout seconds
+    # for the next event if there is none yet. The events are (sequence number, event type, data).
+    def wait(self, seq, timeout=None):
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__seq > seq, timeout)
+            return self.__since(seq)
@@ -0,0 +1,40 @@
+## Histogram.py
+## A latency histogram with fixed bucket bounds, as exposed in the Prometheus text format:
+## an observation costs one bisection and two additions, whatever the number of observations.
+
+import bisect
+import threading
+
+class Histogram:
+    __slots__ = ("__bounds", "__counts", "__sum", "__lock")
+
+    # constructor, bounds- the increasing upper bounds of the buckets (in seconds).
+    # Values above the last bound fall in the implicit +Inf bucket.
+    def __init__(self, bounds):
+        if list(bounds) != sorted(set(bounds)):
+           raise ValueError("bucket bounds must be increasing")
+        self.__bounds = tuple(bounds)
+        self.__counts = [0] * (len(self.__bounds) + 1)
+        self.__sum = 0.0
+        self.__lock = threading.Lock()
+
+    @property
+    def bounds(self):
+        return self.__bounds
+
+    # Records a value, in the first bucket whose bound is greater than or equal to it.
+    def observe(self, value):
+        index = bisect.bisect_left(self.__bounds, value)
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__sum += value
+
+    # Returns (cumulative count per bucket, +Inf included, sum of the values), read consistently.
+    def snapshot(self):
+        with self.__lock:
+            counts, total = list(self.__counts), self.__sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
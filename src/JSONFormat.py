@@ -0,0 +1,19 @@
+## JSONFormat.py
+## JSON scalars written exactly as json.dumps (and so jsonify) writes them with ensure_ascii,
+## for the models that write themselves as JSON (Order.to_json, Dish.to_json) without building dicts.
+
+import math
+from json.encoder import encode_basestring_ascii as encode_string
+
+# Encodes an int, a float or None like json.dumps: floats by their repr, NaN and the infinities
+# as NaN, Infinity and -Infinity. A bool (an int, e.g. a quantity of True) is written true or false.
+def encode_number(value):
+    if value is None:
+       return "null"
+    if value is True or value is False:
+       return "true" if value else "false"
+    if isinstance(value, float):
+       if math.isfinite(value):
+          return float.__repr__(value)
+       return "NaN" if value != value else "Infinity" if value > 0 else "-Infinity"
+    return int.__repr__(value)
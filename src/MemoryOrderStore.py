@@ -0,0 +1,155 @@
+## MemoryOrderStore.py
+## Keeps the orders in memory, in dicts indexed by id, active table number and customer name,
+## with running totals per order status.
+
+import bisect
+import math
+import threading
+
+from .OrderStore import OrderStore, ORDER_STATUSES
+from .RunningTotal import RunningTotal
+
+class MemoryOrderStore(OrderStore):
+    # constructor, Initializes empty indexes and totals.
+    # Orders are kept in dicts so lookups and removals don't scan the history.
+    # Running totals are kept per order status, so the totals don't traverse all orders.
+    # Changes to the indexes and totals are made under a lock, readers iterate over copies.
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__orders = {}             # All stored orders by id (in insertion order).
+        self.__ids = []                # The ids of the stored orders in increasing order, for paging (see orders);
+        self.__removed_num = 0         # the removed ones are left in it until they outnumber the stored ones.
+        self.__active_tables = {}      # table_number -> {id: order} of the orders that are not 'Done'.
+        self.__customers = {}          # customer_name -> {id: order} of all stored orders.
+        self.__saved = {}              # id -> (status, total price, customer name) as last indexed and counted.
+        self.__status_totals = {status: RunningTotal() for status in ORDER_STATUSES + ("All",)}
+
+    def add(self, order):
+        with self.__lock:
+            self.__add(order)
+
+    # Stores the orders under one acquisition of the lock.
+    def add_many(self, orders):
+        with self.__lock:
+            for order in orders:
+                self.__add(order)
+
+    # Indexes and counts a new order (under the lock).
+    def __add(self, order):
+        self.__orders[order.id] = order
+        if not self.__ids or order.id > self.__ids[-1]:
+           self.__ids.append(order.id)
+        else:
+           # An older id (e.g. an imported order): a new list, the pages being read keep the one they started on.
+           index = bisect.bisect_left(self.__ids, order.id)
+           if index == len(self.__ids) or self.__ids[index] != order.id:
+              self.__ids = self.__ids[:index] + [order.id] + self.__ids[index:]
+        if order.status != "Done":
+           self.__active_tables.setdefault(order.table_number, {})[order.id] = order
+        self.__customers.setdefault(order.customer_name, {})[order.id] = order
+        self.__count(order)
+
+    def remove(self, order):
+        with self.__lock:
+            del self.__orders[order.id]
+            self.__unindex_table(order)
+            self.__unindex_customer(self.__saved[order.id][2], order)
+            self.__uncount(order)
+            self.__removed_num += 1
+            if self.__removed_num > len(self.__orders) + 64:
+               self.__ids = [order_id for order_id in self.__ids if order_id in self.__orders]
+               self.__removed_num = 0
+
+    def save(self, order, dish_name=None):
+        with self.__lock:
+            status, total, customer_name = self.__saved[order.id]
+            if order.customer_name != customer_name:
+               self.__unindex_customer(customer_name, order)
+               self.__customers.setdefault(order.customer_name, {})[order.id] = order
+            if order.status == "Done" and status != "Done":
+               self.__unindex_table(order)
+            if (order.status, order.get_total_price(), order.customer_name) != (status, total, customer_name):
+               self.__uncount(order)
+               self.__count(order)
+
+    def get_by_id(self, order_id):
+        return self.__orders.get(order_id)
+
+    def get_active_by_table(self, table_number):
+        with self.__lock:
+            table_orders = self.__active_tables.get(table_number)
+            return next(iter(table_orders.values())) if table_orders else None
+
+    def get_by_customer(self, customer_name):
+        with self.__lock:
+            customer_orders = self.__customers.get(customer_name)
+            return customer_orders[min(customer_orders)] if customer_orders else None
+
+    # The orders after after_id are found by bisection in the sorted ids, and read one by one as they are
+    # iterated (a page costs its size, not a copy of all the ids). The ids appended meanwhile are not read,
+    # the orders removed meanwhile are skipped.
+    def orders(self, after_id=0):
+        with self.__lock:
+            ids = self.__ids
+            start, end = bisect.bisect_right(ids, after_id), len(ids)
+        return self.__iter_orders(ids, start, end)
+
+    # Iterates over the stored orders of ids[start:end].
+    def __iter_orders(self, ids, start, end):
+        for index in range(start, end):
+            order = self.__orders.get(ids[index])
+            if order is not None:
+               yield order
+
+    def table_numbers_by_status(self, status):
+        return [order.table_number for order in self.orders() if order.status == status]
+
+    def dishes_by_status(self, status):
+        dishes = []
+        for order in self.orders():
+            dishes.extend(order.get_dishes_by_status(status))
+        return dishes
+
+    def total_price_by_status(self, status):
+        with self.__lock:
+            return self.__status_totals[status].value
+
+    # Removes the order from the customer name index.
+    def __unindex_customer(self, customer_name, order):
+        customer_orders = self.__customers[customer_name]
+        del customer_orders[order.id]
+        if not customer_orders:
+           del self.__customers[customer_name]
+
+    # Removes the order from the active tables index.
+    def __unindex_table(self, order):
+        table_orders = self.__active_tables.get(order.table_number)
+        if table_orders and table_orders.pop(order.id, None) is not None and not table_orders:
+           del self.__active_tables[order.table_number]
+
+    # Adds the order to the running totals of its status.
+    def __count(self, order):
+        status, total = order.status, order.get_total_price()
+        self.__saved[order.id] = (status, total, order.customer_name)
+        self.__status_totals[status].add(total)
+        self.__status_totals["All"].add(total)
+
+    # Removes the order from the running totals it was last counted in.
+    def __uncount(self, order):
+        status, total, _ = self.__saved.pop(order.id)
+        self.__status_totals[status].subtract(total)
+        self.__status_totals["All"].subtract(total)
+
+    # The running totals are exact sums, so they must match a full recompute exactly.
+    def verify_totals(self):
+        expected = {status: [] for status in ORDER_STATUSES + ("All",)}
+        for order in self.orders():
+            total = order.compute_total_price()
+            if order.get_total_price() != total:
+               raise RuntimeError(f"order {order.id} total price is {order.get_total_price()}, expected {total}")
+            expected[order.status].append(total)
+            expected["All"].append(total)
+        for status, totals in expected.items():
+            total = math.fsum(totals) if totals else 0
+            if self.total_price_by_status(status) != total:
+               raise RuntimeError(f"'{status}' orders total price is {self.total_price_by_status(status)}, expected {total}")
@@ -0,0 +1,66 @@
+## Menu.py
+## The registry of the menu items, by id and by name. Dishes ordered by menu id reference their item
+## (see Dish.from_menu_item); dishes that are not on the menu (ad-hoc dishes) are still accepted.
+## Item ids are part of the journal of batches that add dishes by menu id, so a menu file keeps its ids.
+
+import json
+import threading
+
+from .MenuItem import MenuItem
+
+class Menu:
+    # constructor, Initializes an empty menu.
+    def __init__(self):
+        self.__items = {}          # id -> item.
+        self.__items_by_name = {}  # name -> item.
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__items)
+
+    # Returns the items, ordered by id.
+    @property
+    def items(self):
+        return sorted(self.__items.values(), key=lambda item: item.id)
+
+    # Adds an item with the given id, or the next free one, and returns it.
+    # Ids and names are unique.
+    def add(self, name, unit_price, item_id=None):
+        with self.__lock:
+            if item_id is None:
+               item_id = max(self.__items, default=0) + 1
+            item = MenuItem(item_id, name, unit_price)
+            if item.id in self.__items:
+               raise ValueError(f"menu id {item.id} is already used")
+            if item.name in self.__items_by_name:
+               raise ValueError(f"the dish '{item.name}' is already on the menu")
+            self.__items[item.id] = item
+            self.__items_by_name[item.name] = item
+        return item
+
+    # Returns the item with the id, raises LookupError if there is none.
+    def get(self, item_id):
+        if item_id is None:
+           raise ValueError("menu id cannot be None")
+        if isinstance(item_id, bool) or not isinstance(item_id, int):
+           raise TypeError("menu id must be a integer")
+        item = self.__items.get(item_id)
+        if item is None:
+           raise LookupError(f"menu id {item_id} is not found")
+        return item
+
+    # Returns the item with the name, or None if the dish is not on the menu.
+    def find_by_name(self, name):
+        return self.__items_by_name.get(name)
+
+    def to_dict(self):
+        return {"items": [item.to_dict() for item in self.items]}
+
+    # Loads a menu from a JSON file: a list of {"id", "name", "unit price"} objects.
+    @classmethod
+    def load(cls, path):
+        menu = cls()
+        with open(path, encoding="utf-8") as file:
+            for data in json.load(file):
+                menu.add(data["name"], data["unit price"], data["id"])
+        return menu
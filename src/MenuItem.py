@@ -0,0 +1,54 @@
+## MenuItem.py
+## An entry of the menu: a dish the restaurant serves, with its id, name and canonical unit price.
+## Items are immutable and shared by all the dishes ordered from them (see Dish.from_menu_item),
+## so the name (interned) and the price are stored once per item instead of once per dish.
+
+import sys
+
+class MenuItem:
+    __slots__ = ("__id", "__name", "__unit_price")
+
+    # constructor, validates the item once; the dishes ordered from it are not validated again.
+    def __init__(self, item_id, name, unit_price):
+        if item_id is None:
+           raise ValueError("menu id cannot be None")
+        if isinstance(item_id, bool) or not isinstance(item_id, int):
+           raise TypeError("menu id must be a integer")
+        if item_id <= 0:
+           raise ValueError("menu id must be positive")
+        if name is None:
+           raise ValueError("name cannot be None")
+        if not isinstance(name, str):
+           raise TypeError("name must be a string")
+        name = name.strip()
+        if not name:
+           raise ValueError("name cannot be empty")
+        if unit_price is None:
+           raise ValueError("unit price cannot be None")
+        if not isinstance(unit_price, (int, float)):
+           raise TypeError("unit price must be a number")
+        if unit_price <= 0:
+           raise ValueError("unit price must be positive")
+        self.__id = item_id
+        self.__name = sys.intern(name)
+        self.__unit_price = float(unit_price)
+
+    @property
+    def id(self):
+        return self.__id
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def unit_price(self):
+        return self.__unit_price
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "unit price": self.unit_price}
+
+    # Builds an item from its dictionary representation (as returned by to_dict).
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["name"], data["unit price"])
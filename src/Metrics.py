@@ -0,0 +1,106 @@
+## Metrics.py
+## Request and call instrumentation: request counts by route, method and status code,
+## and fixed-bucket latency histograms per route and per instrumented method,
+## rendered in the Prometheus text exposition format.
+
+import functools
+import threading
+import time
+
+from .Histogram import Histogram
+
+# Bucket bounds in seconds: requests go from sub-millisecond to seconds, calls from microseconds.
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+CALL_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.1)
+
+
+# Escapes a label value for the text format.
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Formats a float as the text format expects it.
+def format_value(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Metrics:
+    # constructor, Initializes empty counters and histograms.
+    # Routes are labeled by their rule (e.g. /orders/<int:table_number>/price), so the number
+    # of series stays bounded whatever the URLs requested.
+    def __init__(self, request_buckets=REQUEST_BUCKETS, call_buckets=CALL_BUCKETS):
+        self.request_buckets = request_buckets
+        self.call_buckets = call_buckets
+        self.__lock = threading.Lock()
+        self.__requests = {}           # (method, route, status code) -> number of requests.
+        self.__request_latencies = {}  # (method, route) -> Histogram.
+        self.__call_latencies = {}     # method name -> Histogram.
+
+    # Returns the histogram of the key, creating it on first use.
+    def __histogram(self, histograms, key, bounds):
+        histogram = histograms.get(key)
+        if histogram is None:
+           with self.__lock:
+               histogram = histograms.setdefault(key, Histogram(bounds))
+        return histogram
+
+    # Records a request of the route that was answered with status_code after the given seconds.
+    def observe_request(self, method, route, status_code, seconds):
+        key = (method, route, status_code)
+        with self.__lock:
+            self.__requests[key] = self.__requests.get(key, 0) + 1
+        self.__histogram(self.__request_latencies, (method, route), self.request_buckets).observe(seconds)
+
+    # Records a call of the named method that took the given seconds.
+    def observe_call(self, name, seconds):
+        self.__histogram(self.__call_latencies, name, self.call_buckets).observe(seconds)
+
+    # Times the calls of the named methods of target, by replacing them on the instance
+    # with timing wrappers (the calls the instance makes to them are timed too).
+    def instrument(self, target, method_names):
+        for name in method_names:
+            method = getattr(target, name)
+            setattr(target, name, self.__timed(name, method))
+
+    def __timed(self, name, method):
+        histogram = self.__histogram(self.__call_latencies, name, self.call_buckets)
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed
+
+    # Appends the lines of a histogram series to lines.
+    @staticmethod
+    def __render_histogram(lines, name, labels, histogram):
+        cumulative, total = histogram.snapshot()
+        for bound, count in zip(histogram.bounds + (float("inf"),), cumulative):
+            lines.append(f'{name}_bucket{{{labels},le="{format_value(bound)}"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {format_value(total)}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative[-1]}")
+
+    # Returns all the metrics in the Prometheus text format.
+    def render(self):
+        with self.__lock:
+            requests = sorted(self.__requests.items())
+            request_latencies = sorted(self.__request_latencies.items())
+            call_latencies = sorted(self.__call_latencies.items())
+        lines = ["# HELP http_requests_total Requests by method, route and status code.",
+                 "# TYPE http_requests_total counter"]
+        for (method, route, status_code), count in requests:
+            lines.append(f'http_requests_total{{method="{escape_label(method)}",route="{escape_label(route)}",'
+                         f'status="{status_code}"}} {count}')
+        lines += ["# HELP http_request_duration_seconds Request latency by method and route.",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), histogram in request_latencies:
+            self.__render_histogram(lines, "http_request_duration_seconds",
+                                    f'method="{escape_label(method)}",route="{escape_label(route)}"', histogram)
+        lines += ["# HELP order_manager_call_duration_seconds Latency of the instrumented OrderManager methods.",
+                  "# TYPE order_manager_call_duration_seconds histogram"]
+        for name, histogram in call_latencies:
+            self.__render_histogram(lines, "order_manager_call_duration_seconds",
+                                    f'method="{escape_label(name)}"', histogram)
+        return "\n".join(lines) + "\n"
@@ -2,18 +2,38 @@
 ## Represents a restaurant order associated with a specific table.
 ## Manages dishes, customer details, and order status.
 
+import math
+import time
+
 from .Dish import Dish
+from .JSONFormat import encode_number, encode_string
+from .RunningTotal import RunningTotal
 class Order:
+    # Fixed attributes instead of a per-object __dict__, to keep many orders compact in memory.
+    __slots__ = ("__id", "__customer_name", "__table_number", "__dishes",
+                 "__pending_dishes_num", "__total_price", "__status", "__opened_at", "__version", "__cached_dict",
+                 "__cached_json")
 
-    # constructor- start with empty list of dishes, id will change later,
+    # constructor- start with no dishes, id will change later,
     # Default status is 'Served' (no pending dishes).
+    # Dishes are kept by name (in insertion order) with a count of the pending ones,
+    # so lookups and status updates don't scan the whole order.
+    # The total price is kept up to date as dishes are added, removed or change quantity.
     # Order status must be 'Pending', 'Served', or 'Done'.
+    # The order is opened now (Unix time in seconds), see opened_at.
+    # The version counts the changes to the order and its dishes; to_dict and to_json are cached until the next change.
     def __init__(self, customer_name, table_number):
+        self.__version = 0
+        self.__cached_dict = None
+        self.__cached_json = None
         self.id = 1
         self.customer_name = customer_name
         self.table_number = table_number
-        self.__dishes = []  
+        self.__dishes = {}  
+        self.__pending_dishes_num = 0
+        self.__total_price = RunningTotal()
         self.status = "Served"
+        self.opened_at = time.time()
 
     @property
     def id(self):
@@ -24,6 +44,7 @@ class Order:
     def id(self, id):
         self.check_valid_num_identifier(id, "id") 
         self.__id = id
+        self.__version += 1
 
     @property
     def customer_name(self):
@@ -34,6 +55,7 @@ class Order:
     def customer_name(self, name):
         self.check_valid_name(name)
         self.__customer_name = name
+        self.__version += 1
 
     @property
     def table_number(self):
@@ -44,10 +66,43 @@ class Order:
     def table_number(self, table_number):
         self.check_valid_num_identifier(table_number, "table number")
         self.__table_number = table_number
+        self.__version += 1
+
+    # When the order was opened, as Unix time in seconds.
+    @property
+    def opened_at(self):
+        return self.__opened_at
 
+    # Sets the opening time, ensuring it is a non-negative number.
+    @opened_at.setter
+    def opened_at(self, opened_at):
+        if opened_at is None:
+           raise ValueError("opened_at cannot be None")
+        if isinstance(opened_at, bool) or not isinstance(opened_at, (int, float)):
+           raise TypeError("opened_at must be a number")
+        if not opened_at >= 0:
+           raise ValueError("opened_at cannot be negative")
+        self.__opened_at = opened_at
+        self.__version += 1
+
+    # Returns the dishes of the order as a new list, in the order they were added.
+    # (A copy, so readers can iterate it while the order is changed by another thread.)
     @property
     def dishes(self):
-        return self.__dishes
+        return list(self.__dishes.values())
+
+    # Number of changes made to the order and its dishes (bumped after each change is complete).
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def dishes_num(self):
+        return len(self.__dishes)
+
+    @property
+    def pending_dishes_num(self):
+        return self.__pending_dishes_num
     
     @property
     def status(self):
@@ -79,14 +134,15 @@ class Order:
         if status not in {"Pending", "Served", "Done"}:
            raise ValueError("status must be 'Pending' or 'Served' or 'Done'")
         self.__status = status
+        self.__version += 1
 
     # Finds and returns a dish by name. Raises an error if not found.
     def find_dish_by_name(self, dish_name):
         self.check_valid_name(dish_name)
-        for dish in self.dishes:
-            if dish.name == dish_name:
-               return dish
-        raise LookupError (f"{dish_name} is not found in that order")
+        dish = self.__dishes.get(dish_name)
+        if dish is None:
+           raise LookupError(f"{dish_name} is not found in that order")
+        return dish
 
     # Returns dish unit price by the name of the dish.
     def get_dish_unit_price(self, dish_name):
@@ -101,52 +157,69 @@ class Order:
     # Checks if a dish exists in the order.
     def is_dish_exists_in_order(self, dish_name):
         self.check_valid_name(dish_name)
-        for dish in self.dishes:
-            if dish.name == dish_name:
-               return True
-        return False     
+        return dish_name in self.__dishes
 
     # Adds a dish to the order if it doesn't already exist.
+    # (The dish name was already validated by the dish.)
     def add_dish(self, dish: Dish):
-        if self.is_dish_exists_in_order(dish.name):
+        if dish.name in self.__dishes:
            raise ValueError(f"the dish '{dish.name}' is already exists in the order.")
         dish.status = "Pending"  # New dish starts as Pending
-        self.dishes.append(dish)  
+        self.__dishes[dish.name] = dish  
+        self.__pending_dishes_num += 1
+        self.__total_price.add(dish.get_total_price())
         self.status = "Pending"  # Adding a dish sets the order to Pending
+        self.__version += 1
 
     # Removes a dish from the order and updates the order status.
     def remove_dish(self, dish_name):
         dish = self.find_dish_by_name(dish_name)
-        self.dishes.remove(dish)
+        del self.__dishes[dish.name]
+        if dish.status == "Pending":
+           self.__pending_dishes_num -= 1
+        self.__total_price.subtract(dish.get_total_price())
         self.check_order_status()  
+        self.__version += 1
 
     # Updates the order status based on the statuses of its dishes.
     # if all the dishes Served- the order is Served.
     def check_order_status(self):
-        for dish in self.dishes:
-            if dish.status == "Pending":
-                self.status = "Pending"
-                return 
-        self.status = "Served"
+        self.status = "Pending" if self.__pending_dishes_num else "Served"
+
+    # Sets the status of a dish, keeping the pending dishes count up to date.
+    def __set_dish_status(self, dish, status):
+        was_pending = dish.status == "Pending"
+        dish.status = status
+        self.__pending_dishes_num += (dish.status == "Pending") - was_pending
   
     # Updates dish quantity and adjusts its status if needed.
     def update_dish_quantity(self, dish_name, quantity):
         self.check_valid_num_identifier(quantity, "quantity")
         dish = self.find_dish_by_name(dish_name)
         if dish.quantity < quantity:
-           dish.status = "Pending"  # Increasing quantity resets status to Pending
+           self.__set_dish_status(dish, "Pending")  # Increasing quantity resets status to Pending
            self.status = "Pending"
+        old_price = dish.get_total_price()
         dish.quantity = quantity
+        self.__total_price.subtract(old_price)
+        self.__total_price.add(dish.get_total_price())
+        self.__version += 1
 
     # Updates the status of a dish and adjusts the order status accordingly.
     def update_dish_status(self, dish_name, status):
         dish = self.find_dish_by_name(dish_name)
-        dish.status = status
+        self.__set_dish_status(dish, status)
         if status == "Pending":
            self.status = "Pending"
         else:  
            self.check_order_status()
+        self.__version += 1
   
+    # Restores when a Pending dish became Pending (when the change that made it Pending is replayed).
+    def restore_dish_pending_since(self, dish_name, pending_since):
+        self.find_dish_by_name(dish_name).pending_since = pending_since
+        self.__version += 1
+
     # check id status is string and not None.
     def check_valid_status(self, status):
         if status is None:
@@ -160,20 +233,133 @@ class Order:
         if status not in {"Pending", "Served", "All"}:
            raise ValueError("status must be 'Pending' or 'Served' or 'All'")
         if status == "All":
-           return self.dishes[:]
+           return self.dishes
         return [dish for dish in self.dishes if dish.status == status]
 
-    # Calculates and returns the total price of all dishes in the order. 
+    # Returns the total price of all dishes in the order. 
     def get_total_price(self):
-        return sum(dish.get_total_price() for dish in self.dishes) if self.dishes else 0
+        return self.__total_price.value
+
+    # Calculates the total price of the order from scratch, by summing all its dishes.
+    def compute_total_price(self):
+        dishes = self.dishes
+        return math.fsum(dish.get_total_price() for dish in dishes) if dishes else 0
 
     # Returns a dictionary representation of the order, including all details.   
-    def to_dict(self):
-        return {
+    # It is built once per version of the order, from the cached dicts of its dishes
+    # (so callers must not modify it). The version is read first, so a dict built while
+    # the order changes is never reused: every change bumps the version once it is complete.
+    # Dishes must be changed through the order, for the order version to follow them.
+    # timestamps- whether to include opened_at and the dishes' pending since, as the journal, the shards
+    # and the exports need; without them (as in the responses, unless ORDERS_RESPONSE_TIMESTAMPS is set)
+    # a new dict is built from the cached one.
+    def to_dict(self, timestamps=False):
+        if not timestamps:
+           data = {key: value for key, value in self.to_dict(True).items() if key != "opened_at"}
+           data["dishes"] = [dish.to_dict(False) for dish in self.dishes]
+           return data
+        version, cached = self.__version, self.__cached_dict
+        if cached is not None and cached[0] == version:
+           return cached[1]
+        data = {
             "id": self.id,
             "customer_name": self.customer_name,
             "table_number": self.table_number,
-            "dishes": [dish.to_dict() for dish in self.dishes],
+            "dishes": [dish.to_dict(True) for dish in self.dishes],
             "status": self.status,
-            "total_price": self.get_total_price()
+            "total_price": self.get_total_price(),
+            "opened_at": self.opened_at
         }
+        self.__cached_dict = (version, data)
+        return data
+
+    # Returns the order as JSON, exactly as json.dumps(to_dict(timestamps)) with sorted keys, compact separators
+    # and ensure_ascii, written directly from the order and the JSON of its dishes (see ResponseEncoder).
+    def to_json(self, timestamps=False):
+        version, cached = self.__version, self.__cached_json
+        if cached is not None and cached[0] == version and cached[1] == timestamps:
+           return cached[2]
+        opened_at = f'"opened_at":{encode_number(self.opened_at)},' if timestamps else ""
+        data = (f'{{"customer_name":{encode_string(self.customer_name)},'
+                f'"dishes":[{",".join(dish.to_json(timestamps) for dish in self.dishes)}],'
+                f'"id":{encode_number(self.id)},{opened_at}"status":{encode_string(self.status)},'
+                f'"table_number":{encode_number(self.table_number)},"total_price":{encode_number(self.get_total_price())}}}')
+        self.__cached_json = (version, timestamps, data)
+        return data
+
+    # Checks a dictionary representation of an order (as returned by to_dict) in one pass, with the same
+    # rules as the setters and add_dish, so from_valid_dict can skip them. The id is not checked
+    # (from_valid_dict doesn't restore it); the order status other than 'Done' and the total price
+    # are not either: they follow from the dishes.
+    @staticmethod
+    def check_dict(data):
+        if not isinstance(data, dict):
+           raise TypeError("order must be an object")
+        customer_name, table_number, dishes = data.get("customer_name"), data.get("table_number"), data.get("dishes", [])
+        status, opened_at = data.get("status", "Served"), data.get("opened_at")
+        if customer_name is None or table_number is None:
+           raise ValueError("order must have a customer_name and table_number")
+        if not isinstance(customer_name, str) or not isinstance(table_number, int) or not isinstance(dishes, list):
+           raise TypeError("customer_name must be a string, table_number a integer and dishes a list")
+        if not customer_name.strip():
+           raise ValueError("name cannot be empty")
+        if table_number <= 0:
+           raise ValueError("table number must be positive")
+        if status not in {"Pending", "Served", "Done"}:
+           raise ValueError("status must be 'Pending' or 'Served' or 'Done'")
+        if opened_at is not None and (isinstance(opened_at, bool) or not isinstance(opened_at, (int, float))
+                                      or not opened_at >= 0):
+           raise ValueError("opened_at must be a non-negative number")
+        names = set()
+        for dish_data in dishes:
+            Dish.check_dict(dish_data)
+            name = dish_data["name"].strip()
+            if name in names:
+               raise ValueError(f"the dish '{name}' is already exists in the order.")
+            names.add(name)
+
+    # Builds an order from a dictionary representation that passed check_dict, without validating
+    # it again: the dishes are built the same way, the pending count and the total are computed once.
+    # The order keeps its opening time (if the dict has one), a 'Done' status and the dish statuses;
+    # its id is left to the caller.
+    @classmethod
+    def from_valid_dict(cls, data):
+        order = cls.__new__(cls)
+        order.__version = 0
+        order.__cached_dict = None
+        order.__cached_json = None
+        order.__id = 1
+        order.__customer_name = data["customer_name"]
+        order.__table_number = data["table_number"]
+        order.__dishes = {}
+        order.__total_price = RunningTotal()
+        pending_dishes_num = 0
+        for dish_data in data.get("dishes", []):
+            dish = Dish.from_valid_dict(dish_data)
+            order.__dishes[dish.name] = dish
+            order.__total_price.add(dish.get_total_price())
+            pending_dishes_num += dish.status == "Pending"
+        order.__pending_dishes_num = pending_dishes_num
+        if data.get("status") == "Done":
+           order.__status = "Done"
+        else:
+           order.__status = "Pending" if pending_dishes_num else "Served"
+        opened_at = data.get("opened_at")
+        order.__opened_at = time.time() if opened_at is None else opened_at
+        return order
+
+    # Builds an order from its dictionary representation (as returned by to_dict),
+    # restoring its id, its opening time (if the dict has one) and the status of the order and of every dish.
+    @classmethod
+    def from_dict(cls, data):
+        order = cls(data["customer_name"], data["table_number"])
+        order.id = data["id"]
+        if data.get("opened_at") is not None:
+           order.opened_at = data["opened_at"]
+        for dish_data in data["dishes"]:
+            dish = Dish.from_dict(dish_data)
+            order.add_dish(dish)
+            order.update_dish_status(dish.name, dish_data["status"])
+        if data["status"] == "Done":
+           order.status = "Done"
+        return order
@@ -0,0 +1,278 @@
+## OrderAnalytics.py
+## End of day reports over the orders: revenue per dish, per table and per hour, the average ticket
+## and the dish quantity percentiles. The orders are read once into a columnar snapshot (NumPy arrays,
+## one row per order and one per dish line, dish names dictionary-encoded as ints), and every report
+## is a few vectorized group-bys over it instead of a Python loop over the orders and their dishes.
+## The snapshot is kept up to date with the manager's change log (see update): only the changed orders
+## are read again, their rows overwritten and their new dish lines appended, the old ones left dead
+## until they outnumber the live ones and the columns are compacted.
+## NumPy is optional: without it the rest of the app runs, and ANALYTICS_AVAILABLE is False.
+
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ANALYTICS_AVAILABLE = np is not None
+
+# The order statuses, in the order of their codes in the snapshot.
+ORDER_STATUSES = ("Pending", "Served", "Done")
+
+# The quantity percentiles reported by default.
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# The columns of the order rows and of the dish line rows, with their types.
+ORDER_COLUMNS = {"ids": "int64", "tables": "int64", "opened_at": "float64", "statuses": "int8",
+                 "live": "bool", "totals": "float64", "first_lines": "int64", "lines_nums": "int64"}
+LINE_COLUMNS = {"orders": "int64", "dishes": "int64", "quantities": "int64", "totals": "float64", "live": "bool"}
+
+# The fewest dead dish lines worth a compaction.
+MIN_COMPACTION = 1024
+
+
+# Returns the columns (name -> array) with room for size rows: the columns themselves, or copies
+# twice as large, so appending rows costs O(1) amortized.
+def reserve(columns, size):
+    capacity = len(next(iter(columns.values())))
+    if size <= capacity:
+       return columns
+    grown = {name: np.zeros(max(size, 2 * capacity), dtype=column.dtype) for name, column in columns.items()}
+    for name, column in columns.items():
+        grown[name][:capacity] = column
+    return grown
+
+
+# Returns the rows of the orders for the snapshot: (id, table number, opened at, status, [(dish name, quantity, unit price)]).
+def order_rows(orders):
+    return [(order.id, order.table_number, order.opened_at, order.status,
+             [(dish.name, dish.quantity, dish.unit_price) for dish in order.dishes]) for order in orders]
+
+
+class OrderAnalytics:
+    # constructor, builds the snapshot of the orders (any iterable of orders).
+    # version- the version of the orders the snapshot was taken at, see from_manager.
+    def __init__(self, orders, version=None):
+        if np is None:
+           raise RuntimeError("analytics require NumPy, which is not installed")
+        self.version = version
+        self.__load(order_rows(orders))
+
+    # Takes a snapshot of the stored orders (archived ones included) of a manager.
+    # The version is read first, so the snapshot is at least as new as it.
+    @classmethod
+    def from_manager(cls, manager):
+        version = manager.version
+        return cls(manager.iter_orders(), version)
+
+    # Brings the snapshot up to date with a manager, at least as new as its orders when called.
+    # With a change log, only the orders changed since the snapshot's version are read again
+    # (all of them if the log no longer goes back that far); without one, the snapshot is taken again.
+    def update(self, manager):
+        if self.version == manager.version:
+           return
+        if getattr(manager, "change_log", None) is None or not isinstance(self.version, int):
+           self.version = manager.version
+           self.__load(order_rows(manager.iter_orders()))
+           return
+        changes = manager.changes_since(self.version)
+        rows = [(order["id"], order["table_number"], order["opened_at"], order["status"],
+                 [(dish["name"], dish["quantity"], dish["unit price"]) for dish in order["dishes"]])
+                for order in changes["orders"]]
+        if changes["full"]:
+           self.__load(rows)
+        else:
+           self.__remove(changes["removed"])
+           self.__put(rows)
+           if self.__dead_lines_num >= max(MIN_COMPACTION, self.__lines_len - self.__dead_lines_num):
+              self.__compact()
+        self.version = changes["version"]
+
+    # Empties the snapshot and puts the rows (see order_rows).
+    def __load(self, rows):
+        self.dish_names = []      # dish code -> dish name.
+        self.__dish_codes = {}    # dish name -> dish code.
+        self.__rows = {}          # order id -> its row.
+        # One row per order; the rows of removed orders are dead (not live) until the next compaction.
+        self.__orders = {name: np.zeros(0, dtype=dtype) for name, dtype in ORDER_COLUMNS.items()}
+        self.__orders_len = 0
+        # One row per dish line, pointing to the row of its order: the lines of an order are appended
+        # together (first_lines and lines_nums of its row), and the replaced ones are dead.
+        self.__lines = {name: np.zeros(0, dtype=dtype) for name, dtype in LINE_COLUMNS.items()}
+        self.__lines_len = 0
+        self.__dead_lines_num = 0
+        self.__put(rows)
+
+    # Kills the dish lines of an order row.
+    def __kill_lines(self, row):
+        first_line, lines_num = self.__orders["first_lines"][row], self.__orders["lines_nums"][row]
+        self.__lines["live"][first_line:first_line + lines_num] = False
+        self.__dead_lines_num += int(lines_num)
+
+    # Removes the orders with the ids from the snapshot.
+    def __remove(self, order_ids):
+        for order_id in order_ids:
+            row = self.__rows.pop(order_id, None)
+            if row is not None:
+               self.__kill_lines(row)
+               self.__orders["live"][row] = False
+
+    # Puts the rows of new or changed orders: a changed order keeps its row, and its dish lines are replaced.
+    # The values are gathered in lists and written to the columns at once.
+    def __put(self, rows):
+        status_codes = {status: code for code, status in enumerate(ORDER_STATUSES)}
+        order_rows, ids, tables, opened_at, statuses, totals, first_lines, lines_nums = [], [], [], [], [], [], [], []
+        orders_len = self.__orders_len
+        line_orders, line_dishes, quantities, unit_prices = [], [], [], []
+        for order_id, table_number, order_opened_at, status, dishes in rows:
+            row = self.__rows.get(order_id)
+            if row is None:
+               row = self.__rows[order_id] = orders_len
+               orders_len += 1
+            else:
+               self.__kill_lines(row)
+            order_rows.append(row)
+            ids.append(order_id)
+            tables.append(table_number)
+            opened_at.append(order_opened_at)
+            statuses.append(status_codes[status])
+            first_lines.append(self.__lines_len + len(line_orders))
+            lines_nums.append(len(dishes))
+            total = 0.0
+            for dish_name, quantity, unit_price in dishes:
+                code = self.__dish_codes.get(dish_name)
+                if code is None:
+                   code = self.__dish_codes[dish_name] = len(self.dish_names)
+                   self.dish_names.append(dish_name)
+                line_orders.append(row)
+                line_dishes.append(code)
+                quantities.append(quantity)
+                unit_prices.append(unit_price)
+                total += quantity * unit_price
+            totals.append(total)
+        self.__orders = reserve(self.__orders, orders_len)
+        self.__orders_len = orders_len
+        lines_len = self.__lines_len + len(line_orders)
+        self.__lines = reserve(self.__lines, lines_len)
+        new_lines = slice(self.__lines_len, lines_len)
+        self.__lines_len = lines_len
+        lines = self.__lines
+        lines["orders"][new_lines] = line_orders
+        lines["dishes"][new_lines] = line_dishes
+        lines["quantities"][new_lines] = quantities
+        lines["totals"][new_lines] = lines["quantities"][new_lines] * np.array(unit_prices, dtype=np.float64)
+        lines["live"][new_lines] = True
+        orders = self.__orders
+        order_rows = np.array(order_rows, dtype=np.int64)
+        orders["ids"][order_rows] = ids
+        orders["tables"][order_rows] = tables
+        orders["opened_at"][order_rows] = opened_at
+        orders["statuses"][order_rows] = statuses
+        orders["live"][order_rows] = True
+        orders["first_lines"][order_rows] = first_lines
+        orders["lines_nums"][order_rows] = lines_nums
+        orders["totals"][order_rows] = totals
+
+    # Drops the dead rows: the dish lines are regrouped by order row, in row order.
+    def __compact(self):
+        live_orders = self.__orders["live"][:self.__orders_len]
+        new_rows = np.cumsum(live_orders) - 1
+        orders = {name: column[:self.__orders_len][live_orders] for name, column in self.__orders.items()}
+        live_lines = self.__lines["live"][:self.__lines_len]
+        lines = {name: column[:self.__lines_len][live_lines] for name, column in self.__lines.items()}
+        lines["orders"] = new_rows[lines["orders"]]
+        order = np.argsort(lines["orders"], kind="stable")
+        lines = {name: column[order] for name, column in lines.items()}
+        orders["first_lines"] = np.cumsum(orders["lines_nums"]) - orders["lines_nums"]
+        self.__orders, self.__orders_len = orders, len(orders["ids"])
+        self.__lines, self.__lines_len = lines, len(lines["orders"])
+        self.__dead_lines_num = 0
+        self.__rows = dict(zip(orders["ids"].tolist(), range(self.__orders_len)))
+
+    # Returns the used part of an order column.
+    def __order_column(self, name):
+        return self.__orders[name][:self.__orders_len]
+
+    # Returns the used part of a dish line column.
+    def __line_column(self, name):
+        return self.__lines[name][:self.__lines_len]
+
+    @property
+    def orders_num(self):
+        return len(self.__rows)
+
+    @property
+    def lines_num(self):
+        return self.__lines_len - self.__dead_lines_num
+
+    # Returns the mask of the live orders with the status ('Pending', 'Served', 'Done' or 'All').
+    def __orders_mask(self, status):
+        if status is None:
+           raise ValueError("status cannot be None")
+        if not isinstance(status, str):
+           raise TypeError("status must be a string")
+        if status == "All":
+           return self.__order_column("live").copy()
+        if status not in ORDER_STATUSES:
+           raise ValueError("status is not valid")
+        return self.__order_column("live") & (self.__order_column("statuses") == ORDER_STATUSES.index(status))
+
+    # Returns the mask of the live dish lines of the orders with the status.
+    def __lines_mask(self, status):
+        return self.__line_column("live") & self.__orders_mask(status)[self.__line_column("orders")]
+
+    # Returns the revenue and the quantity sold of every dish in the orders with the status,
+    # highest revenue first.
+    def revenue_by_dish(self, status="All"):
+        lines = self.__lines_mask(status)
+        dishes = self.__line_column("dishes")[lines]
+        revenues = np.bincount(dishes, weights=self.__line_column("totals")[lines], minlength=len(self.dish_names))
+        quantities = np.bincount(dishes, weights=self.__line_column("quantities")[lines], minlength=len(self.dish_names))
+        return [{"dish": self.dish_names[code], "quantity": int(quantities[code]), "revenue": float(revenues[code])}
+                for code in np.argsort(-revenues, kind="stable") if quantities[code]]
+
+    # Groups the orders with the status by key (one value per order row), returns the
+    # (key values, number of orders, revenue) of the groups, ordered by key.
+    def __group_orders(self, keys, status):
+        orders = self.__orders_mask(status)
+        values, groups = np.unique(keys[orders], return_inverse=True)
+        return (values, np.bincount(groups, minlength=len(values)),
+                np.bincount(groups, weights=self.__order_column("totals")[orders], minlength=len(values)))
+
+    # Returns the number of orders and the revenue of every table, for the orders with the status.
+    def revenue_by_table(self, status="All"):
+        tables, orders_nums, revenues = self.__group_orders(self.__order_column("tables"), status)
+        return [{"table_number": int(table_number), "orders_num": int(orders_num), "revenue": float(revenue)}
+                for table_number, orders_num, revenue in zip(tables, orders_nums, revenues)]
+
+    # Returns the number of orders and the revenue of every hour (UTC) in which orders with
+    # the status were opened, the hour as its start time ('2024-05-01T18:00:00Z').
+    def revenue_by_hour(self, status="All"):
+        hours, orders_nums, revenues = self.__group_orders(self.__order_column("opened_at") // 3600, status)
+        return [{"hour": time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime(hour * 3600)),
+                 "orders_num": int(orders_num), "revenue": float(revenue)}
+                for hour, orders_num, revenue in zip(hours, orders_nums, revenues)]
+
+    # Returns the average total price of the orders with the status that have dishes.
+    def average_ticket(self, status="All"):
+        orders = self.__orders_mask(status) & (self.__order_column("lines_nums") > 0)
+        totals = self.__order_column("totals")[orders]
+        return {
+        "orders_num": len(totals),
+        "revenue": float(totals.sum()),
+        "average_ticket": float(totals.mean()) if len(totals) else 0
+        }
+
+    # Returns the percentiles (0 to 100) of the dish quantities in the orders with the status,
+    # as {"p50": ..., ...}, None when there are no dishes.
+    def quantity_percentiles(self, percentiles=DEFAULT_PERCENTILES, status="All"):
+        for percentile in percentiles:
+            if isinstance(percentile, bool) or not isinstance(percentile, (int, float)):
+               raise TypeError("percentile must be a number")
+            if not 0 <= percentile <= 100:
+               raise ValueError("percentile must be between 0 and 100")
+        quantities = self.__line_column("quantities")[self.__lines_mask(status)]
+        values = np.percentile(quantities, percentiles) if len(quantities) else [None] * len(percentiles)
+        return {f"p{percentile:g}": None if value is None else float(value)
+                for percentile, value in zip(percentiles, values)}
@@ -0,0 +1,139 @@
+## OrderArchive.py
+## Keeps closed ('Done') orders out of the live store, each encoded as a compact JSON record,
+## either in memory or, with a path, in a spill file on local disk (only a small index stays in memory).
+## The file is not a persistence mechanism: it is truncated when the archive is opened.
+
+import json
+import math
+import os
+import threading
+
+from .Order import Order
+from .RunningTotal import RunningTotal
+
+class OrderArchive:
+    # constructor, Initializes an empty archive, in memory or in the file at path.
+    def __init__(self, path=None):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__records = {}            # id -> (table_number, encoded order) in memory, or (table_number, offset, length) on disk.
+        self.__customers = {}          # customer_name -> set of ids.
+        self.__total_price = RunningTotal()
+        self.__file = open(path, "w+b") if path is not None else None
+        self.__file_size = 0
+
+    # Number of archived orders.
+    def __len__(self):
+        return len(self.__records)
+
+    # Encodes an order as a compact record:
+    # [id, customer, table, [[dish name, quantity, unit price, status, pending since], ...], opened at].
+    @staticmethod
+    def __encode(order):
+        dishes = [[dish.name, dish.quantity, dish.unit_price, dish.status, dish.pending_since] for dish in order.dishes]
+        return json.dumps([order.id, order.customer_name, order.table_number, dishes, order.opened_at],
+                          separators=(",", ":")).encode()
+
+    # Decodes a record back into a 'Done' order.
+    @staticmethod
+    def __decode(data):
+        order_id, customer_name, table_number, dishes, opened_at = json.loads(data)
+        return Order.from_dict({
+            "id": order_id,
+            "customer_name": customer_name,
+            "table_number": table_number,
+            "status": "Done",
+            "opened_at": opened_at,
+            "dishes": [{"name": name, "quantity": quantity, "unit price": unit_price, "status": status,
+                        "pending since": pending_since}
+                       for name, quantity, unit_price, status, pending_since in dishes],
+        })
+
+    # Archives a closed order.
+    def add(self, order):
+        if order.status != "Done":
+           raise ValueError("only 'Done' orders can be archived")
+        data = self.__encode(order)
+        with self.__lock:
+            if self.__file is None:
+               self.__records[order.id] = (order.table_number, data)
+            else:
+               os.pwrite(self.__file.fileno(), data, self.__file_size)
+               self.__records[order.id] = (order.table_number, self.__file_size, len(data))
+               self.__file_size += len(data)
+            self.__customers.setdefault(order.customer_name, set()).add(order.id)
+            self.__total_price.add(order.get_total_price())
+
+    # Reads the encoded order of a record.
+    def __read(self, record):
+        if self.__file is None:
+           return record[1]
+        return os.pread(self.__file.fileno(), record[2], record[1])
+
+    # Returns the archived order with the given id (a new Order object), or None.
+    def get(self, order_id):
+        record = self.__records.get(order_id)
+        return self.__decode(self.__read(record)) if record is not None else None
+
+    # Returns the oldest archived order of the customer, or None.
+    def get_by_customer(self, customer_name):
+        with self.__lock:
+            ids = self.__customers.get(customer_name)
+            order_id = min(ids) if ids else None
+        return self.get(order_id) if order_id is not None else None
+
+    # Removes an archived order, returns it or None if it is not archived.
+    # Space in the spill file is not reclaimed.
+    def remove(self, order_id):
+        with self.__lock:
+            record = self.__records.pop(order_id, None)
+            if record is None:
+               return None
+            order = self.__decode(self.__read(record))
+            ids = self.__customers[order.customer_name]
+            ids.discard(order_id)
+            if not ids:
+               del self.__customers[order.customer_name]
+            self.__total_price.subtract(order.get_total_price())
+        return order
+
+    # Iterates over the archived orders with an id greater than after_id (new Order objects), ordered by id.
+    def orders(self, after_id=0):
+        with self.__lock:
+            records = sorted(item for item in self.__records.items() if item[0] > after_id)
+        for _, record in records:
+            yield self.__decode(self.__read(record))
+
+    # Returns a function iterating over the orders archived now, ordered by id (new Order objects),
+    # whatever is archived or removed afterwards: the index is copied, the orders decoded as they are read
+    # (records are never overwritten, the spill file only grows).
+    def snapshot(self):
+        with self.__lock:
+            records = dict(self.__records)
+        def orders():
+            for _, record in sorted(records.items()):
+                yield self.__decode(self.__read(record))
+        return orders
+
+    # Returns the (id, table number) pairs of the archived orders, ordered by id.
+    def id_table_numbers(self):
+        with self.__lock:
+            return [(order_id, record[0]) for order_id, record in sorted(self.__records.items())]
+
+    # Total price of all the archived orders.
+    @property
+    def total_price(self):
+        with self.__lock:
+            return self.__total_price.value
+
+    # Recomputes the total price from the archived orders and raises an error if it doesn't match.
+    def verify_total(self):
+        totals = [order.get_total_price() for order in self.orders()]
+        total = math.fsum(totals) if totals else 0
+        if self.total_price != total:
+           raise RuntimeError(f"archived orders total price is {self.total_price}, expected {total}")
+
+    # Closes the spill file, if any.
+    def close(self):
+        if self.__file is not None:
+           self.__file.close()
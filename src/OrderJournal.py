@@ -0,0 +1,245 @@
+## OrderJournal.py
+## Persists an OrderManager to a directory as an append-only operation log plus periodic snapshots.
+##
+## On disk, every line of a log or snapshot file is "<crc32 as 8 hex digits> <json>":
+##   log-<first seq>.ndjson      one {"seq", "op", "args"} record per successful manager change.
+##   snapshot-<seq>.json         one {"seq", "state"} record, the manager to_dict() after record seq.
+## On startup the files are verified, then the newest snapshot is loaded and only the log records after it are replayed.
+
+import json
+import os
+import threading
+import time
+import zlib
+
+LOG_PREFIX, LOG_SUFFIX = "log-", ".ndjson"
+SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX = "snapshot-", ".json"
+
+
+# Encodes a record as a checksummed line.
+def encode_line(record):
+    body = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(body.encode()):08x} {body}\n"
+
+
+# Decodes a checksummed line, raising ValueError if it is torn or corrupted.
+def decode_line(line):
+    if not line.endswith("\n") or len(line) < 10 or line[8] != " ":
+       raise ValueError("torn or malformed line")
+    body = line[9:-1]
+    if int(line[:8], 16) != zlib.crc32(body.encode()):
+       raise ValueError("checksum mismatch")
+    return json.loads(body)
+
+
+# Returns the sorted (seq, file name) pairs of the files with the given prefix and suffix.
+def list_files(directory, prefix, suffix):
+    files = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+           files.append((int(name[len(prefix):-len(suffix)]), name))
+    return sorted(files)
+
+
+# Makes the renames and deletions in the directory durable.
+def fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class OrderJournal:
+    # constructor.
+    # sync_every / sync_interval- the log is written on every change but fsynced once per
+    #   sync_every records or sync_interval seconds, whichever comes first: a record is on disk at most
+    #   sync_interval seconds after it was appended, even when no other record follows it (see __sync_later).
+    # snapshot_every- a snapshot is due (and the older log can be dropped) every snapshot_every records.
+    #   The manager takes it, once no change is in progress, so it matches the logged records.
+    def __init__(self, directory, sync_every=64, sync_interval=0.05, snapshot_every=100_000):
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.__manager = None
+        self.__file = None
+        self.__seq = 0                 # seq of the last record.
+        self.__snapshot_seq = 0        # seq of the last record included in the latest snapshot.
+        self.__unsynced_num = 0
+        self.__last_sync = time.monotonic()
+        self.__sync_timer = None       # Syncs the records left unsynced by the latest appends.
+        self.__replaying = False
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def seq(self):
+        return self.__seq
+
+    @property
+    def snapshot_seq(self):
+        return self.__snapshot_seq
+
+    # Whether enough records were logged since the latest snapshot to take a new one.
+    @property
+    def snapshot_due(self):
+        return not self.__replaying and self.__seq - self.__snapshot_seq >= self.snapshot_every
+
+    # Loads the newest snapshot into the (empty) manager and replays the log after it.
+    # A torn record at the end of the last log file (a crash during a write) is cut off.
+    # The files are verified first, so a corrupted journal raises ValueError before any of it is loaded.
+    def recover(self, manager):
+        verify(self.directory)
+        self.__manager = manager
+        snapshots = list_files(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+        if snapshots:
+           with open(os.path.join(self.directory, snapshots[-1][1])) as file:
+               snapshot = decode_line(file.readline())
+           manager.load_dict(snapshot["state"])
+           self.__seq = self.__snapshot_seq = snapshot["seq"]
+
+        logs = list_files(self.directory, LOG_PREFIX, LOG_SUFFIX)
+        self.__replaying = True
+        try:
+            for index, (_, name) in enumerate(logs):
+                self.__replay_file(os.path.join(self.directory, name), index == len(logs) - 1)
+        finally:
+            self.__replaying = False
+
+        if logs and logs[-1][0] > self.__snapshot_seq:
+           self.__open_log(logs[-1][1])
+        else:
+           self.__open_log(f"{LOG_PREFIX}{self.__seq + 1:020d}{LOG_SUFFIX}")
+
+    # Replays the records of a log file that are not already in the snapshot.
+    def __replay_file(self, path, is_last):
+        with open(path, "rb") as file:
+            offset = 0
+            for raw_line in file:
+                try:
+                    record = decode_line(raw_line.decode())
+                except ValueError:
+                    if not is_last or file.read(1):
+                       raise ValueError(f"corrupted record in {path} at offset {offset}")
+                    # Torn last write, drop it so new records are appended after a whole line.
+                    os.truncate(path, offset)
+                    return
+                offset += len(raw_line)
+                if record["seq"] <= self.__seq:
+                   continue
+                if record["seq"] != self.__seq + 1:
+                   raise ValueError(f"missing records {self.__seq + 1}-{record['seq'] - 1} in {path}")
+                self.__manager.apply_operation(record["op"], record["args"])
+                self.__seq = record["seq"]
+
+    # Opens the given log file for appending.
+    def __open_log(self, name):
+        if self.__file is not None:
+           self.__file.close()
+        self.__file = open(os.path.join(self.directory, name), "a")
+
+    # Appends a record of a successful manager change, syncing as configured.
+    def append(self, operation, args):
+        if self.__replaying:
+           return
+        with self.__lock:
+            self.__seq += 1
+            self.__file.write(encode_line({"seq": self.__seq, "op": operation, "args": args}))
+            self.__file.flush()
+            self.__unsynced_num += 1
+            if (self.__unsynced_num >= self.sync_every
+                or time.monotonic() - self.__last_sync >= self.sync_interval):
+               self.__sync()
+            elif self.__sync_timer is None:
+               self.__sync_timer = threading.Timer(self.sync_interval, self.__sync_later)
+               self.__sync_timer.daemon = True
+               self.__sync_timer.start()
+
+    # Syncs the records still unsynced sync_interval seconds after the first of them was appended,
+    # so the last records of a burst are synced even if no record follows them.
+    def __sync_later(self):
+        with self.__lock:
+            self.__sync_timer = None
+            if self.__file is not None and self.__unsynced_num:
+               self.__sync()
+
+    # Forces the written records to disk.
+    def __sync(self):
+        os.fsync(self.__file.fileno())
+        self.__unsynced_num = 0
+        self.__last_sync = time.monotonic()
+
+    # Writes the manager state as a new snapshot, then drops the log and snapshots it replaces.
+    def __snapshot(self):
+        self.__sync()
+        name = f"{SNAPSHOT_PREFIX}{self.__seq:020d}{SNAPSHOT_SUFFIX}"
+        temp_path = os.path.join(self.directory, name + ".tmp")
+        with open(temp_path, "w") as file:
+            file.write(encode_line({"seq": self.__seq, "state": self.__manager.to_dict(timestamps=True)}))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, os.path.join(self.directory, name))
+        self.__snapshot_seq = self.__seq
+        self.__open_log(f"{LOG_PREFIX}{self.__seq + 1:020d}{LOG_SUFFIX}")
+        fsync_directory(self.directory)
+
+        for seq, old_name in list_files(self.directory, LOG_PREFIX, LOG_SUFFIX):
+            if seq <= self.__snapshot_seq:
+               os.remove(os.path.join(self.directory, old_name))
+        for seq, old_name in list_files(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX):
+            if seq < self.__snapshot_seq:
+               os.remove(os.path.join(self.directory, old_name))
+
+    # Takes a snapshot now. No manager change may be in progress.
+    def snapshot(self):
+        with self.__lock:
+            self.__snapshot()
+
+    # Syncs and closes the log file.
+    def close(self):
+        with self.__lock:
+            if self.__sync_timer is not None:
+               self.__sync_timer.cancel()
+               self.__sync_timer = None
+            if self.__file is not None:
+               self.__sync()
+               self.__file.close()
+               self.__file = None
+
+
+# Checks the files of a journal directory without loading them into a manager.
+# Returns a summary of the snapshot and log records, raising ValueError if the files are inconsistent.
+# A torn record at the very end of the last log is reported, not raised.
+def verify(directory):
+    report = {"snapshot_seq": 0, "records_num": 0, "last_seq": 0, "torn_tail": False}
+    snapshots = list_files(directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+    if snapshots:
+       seq, name = snapshots[-1]
+       with open(os.path.join(directory, name)) as file:
+           snapshot = decode_line(file.readline())
+       if snapshot["seq"] != seq:
+          raise ValueError(f"{name} holds seq {snapshot['seq']}")
+       report["snapshot_seq"] = report["last_seq"] = seq
+
+    logs = list_files(directory, LOG_PREFIX, LOG_SUFFIX)
+    for index, (first_seq, name) in enumerate(logs):
+        with open(os.path.join(directory, name), "rb") as file:
+            expected_seq = first_seq
+            for raw_line in file:
+                try:
+                    record = decode_line(raw_line.decode())
+                except ValueError:
+                    if index == len(logs) - 1 and not file.read(1):
+                       report["torn_tail"] = True
+                       break
+                    raise ValueError(f"corrupted record in {name}")
+                if record["seq"] != expected_seq:
+                   raise ValueError(f"{name} has seq {record['seq']} where {expected_seq} was expected")
+                if record["seq"] > report["last_seq"] + 1:
+                   raise ValueError(f"records {report['last_seq'] + 1}-{record['seq'] - 1} are missing")
+                expected_seq += 1
+                if record["seq"] > report["last_seq"]:
+                   report["last_seq"] = record["seq"]
+                   report["records_num"] += 1
+    return report
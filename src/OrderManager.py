@@ -1,16 +1,123 @@
 ## OrderManager.py
 ## Manages restaurant orders, including creation, retrieval, and updates.
 
+import heapq
+import itertools
+import threading
+from collections import deque
+from contextlib import ExitStack, closing, contextmanager
+
 from .Order import Order
 from .Dish import Dish
+from .CustomerIndex import CustomerIndex
+from .MemoryOrderStore import MemoryOrderStore
+from .OrderSnapshot import OrderSnapshot
+from .OrderStore import ORDER_STATUSES
+from .OrderView import OrderView
+from .ReadWriteLock import ReadWriteLock
+
+# The methods that change the manager state, as recorded in the journal.
+MUTATING_OPERATIONS = {"add_order", "remove_order", "close_order", "change_customer_name",
+                       "add_dish_to_order", "remove_dish_from_order",
+                       "update_dish_quantity", "update_dish_status", "apply_batch", "import_orders"}
+
+# The actions of a batch operation, see OrderManager.apply_batch.
+BATCH_ACTIONS = ("add", "remove", "update_quantity", "update_status")
+
+# The dish events published for the batch actions, see OrderManager.__publish.
+BATCH_EVENTS = {"add": "dish_added", "remove": "dish_removed",
+                "update_quantity": "dish_quantity", "update_status": "dish_status"}
+
+# The number of orders an import validates and stores at a time, see OrderManager.import_orders.
+IMPORT_CHUNK_SIZE = 1000
+
+# The default number of dishes returned by OrderManager.next_pending_dishes.
+DEFAULT_KITCHEN_LIMIT = 10
+
+# The default and largest number of orders in a summary page, see OrderManager.summary_page.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# The fields of a table snapshot (see OrderManager.get_tables); the table number always comes with them.
+TABLE_FIELDS = ("id", "customer_name", "status", "total_price", "opened_at", "dishes", "pending_dishes", "served_dishes")
+
+
+# Raised when a batch is rejected, holds the error of the failed operation
+# and the results of the operations up to it.
+class BatchError(Exception):
+    def __init__(self, error, results):
+        super().__init__(f"batch rejected, operation {len(results) - 1} failed: {error}")
+        self.error = error
+        self.results = results
 
 class OrderManager: 
-    # constructor, Initializes empty list of orders and counters.     
-    def __init__(self):
-        self.__orders = []
-        self.__created_orders_num = 0  # Total number of orders ever created. 
-        self.__stored_orders_num = 0   # Number of stored orders in the list.
-        self.__active_orders_num = 0   # Number of currently active orders.
+    # constructor, Initializes the counters from the store (by default, an empty in-memory store).
+    # The store keeps the orders, indexed by id, active table and customer name, and the totals.
+    # In debug mode, the totals are verified against a full recompute (O(n)) on every read: for tests only.
+    # With a journal, the manager state is recovered from it and every change is logged to it;
+    # a durable store (e.g. an SQLite file) already keeps the state across restarts, so it takes no journal.
+    # The manager is thread safe: changes lock only their table, the counters are updated atomically.
+    # With an archive, closed orders beyond the archive_after most recently closed ones are moved
+    # from the store to the archive; they are still found by id and counted in the totals and summary.
+    # The archive lives only as long as the process, so it cannot be used with a durable store either.
+    # The n-th created order gets the id id_offset + (n - 1) * id_stride + 1, so the managers of
+    # table shards (see ShardServer) assign disjoint ids: shard i of k uses id_offset=i, id_stride=k.
+    # With an EventBuffer, every change to the dishes of an order is published to it (see __publish).
+    # With a ChangeLog, the version of every change is recorded for the changed orders (see changes_since).
+    # With a Menu, the dishes added with the name and price of a menu item reference the item,
+    # and batches can add dishes by menu id.
+    def __init__(self, debug=False, journal=None, store=None, archive=None, archive_after=0, id_offset=0, id_stride=1,
+                 events=None, change_log=None, menu=None):
+        if journal is not None and store is not None and store.durable:
+           raise ValueError("a journal cannot be used with a durable store, which already keeps the orders across restarts")
+        if archive is not None and store is not None and store.durable:
+           raise ValueError("an archive cannot be used with a durable store, the archived orders would not survive a restart")
+        self.debug = debug
+        self.events = events
+        self.change_log = change_log
+        self.menu = menu
+        self.__changed_orders = threading.local()  # The (id, removed) of the orders the thread's change touched.
+        self.id_offset = id_offset
+        self.id_stride = id_stride
+        self.__store = store if store is not None else MemoryOrderStore()
+        self.__archive = archive
+        self.__archive_after = archive_after
+        self.__closed_ids = deque()              # ids of the closed orders still in the store, by closing time.
+        self.__archive_lock = threading.Lock()
+        counters = self.__store.load_counters() or (0, 0, 0)
+        self.__created_orders_num = counters[0]  # Total number of orders ever created. 
+        self.__stored_orders_num = counters[1]   # Number of stored orders in the list.
+        self.__active_orders_num = counters[2]   # Number of currently active orders.
+        self.__table_locks = {}                  # table_number -> lock of the changes to its orders.
+        self.__counters_lock = threading.Lock()
+        self.__changes_lock = ReadWriteLock()    # Shared by the changes, exclusive for journal and order snapshots.
+        self.__version = 0                       # Bumped after every change, see version.
+        self.__table_versions = {}               # table_number -> the version of the last change at the table.
+        self.__version_lock = threading.Lock()
+        # The kitchen queue: a heap of (pending since, seq, order id, dish name) entries, and the
+        # pending dishes of every order not 'Done' as {order id: {dish name: pending since}}. A heap entry
+        # that no longer matches them (the dish was served, removed or became Pending again) is stale,
+        # and dropped when it reaches the top or when the heap is rebuilt.
+        self.__kitchen_heap = []
+        self.__kitchen_pending = {}
+        self.__kitchen_pending_num = 0
+        self.__kitchen_seq = itertools.count()
+        self.__kitchen_lock = threading.Lock()
+        # The views of the live orders as of the latest snapshot, {order id: OrderView}, and the ids of the
+        # orders changed since: a snapshot replaces only their views (see snapshot), a change only notes its id.
+        # A durable store keeps no views: they would hold a copy of the whole database in memory,
+        # its snapshots read the orders from it when taken.
+        self.__views = {} if not self.__store.durable else None
+        self.__changed_ids = set()
+        self.__views_lock = threading.Lock()   # Held by the thread bringing the views up to date.
+        self.__snapshot = None
+        self.__customer_index = CustomerIndex()  # The live and archived orders by customer name, see search_orders.
+        self.__journal = journal
+        if journal is not None:
+           journal.recover(self)
+        self.__rebuild_kitchen_queue()
+        self.__rebuild_views()
+        self.__customer_index.rebuild(self.__all_orders())
 
     @property
     def created_orders_num(self):
@@ -54,9 +161,31 @@ class OrderManager:
            raise ValueError("active_orders_num cannot be negative")
         self.__active_orders_num = value
 
+    # The manager version, bumped once every change is complete: a reader that reads the version
+    # before the orders gets orders at least as new as that version.
+    # Versions start over when the manager is recreated.
+    @property
+    def version(self):
+        return self.__version
+
+    # Returns the version of the last change at the table (0 if there was none).
+    def table_version(self, table_number):
+        return self.__table_versions.get(table_number, 0)
+
+    # Returns the stored orders (archived ones included) as a list, ordered by id.
     @property
     def orders(self):
-        return self.__orders 
+        return list(self.__all_orders())
+
+    # Iterates over the live and archived orders with an id greater than after_id, ordered by id.
+    def __all_orders(self, after_id=0):
+        if self.__archive is None:
+           return self.__store.orders(after_id)
+        return heapq.merge(self.__store.orders(after_id), self.__archive.orders(after_id), key=lambda order: order.id)
+
+    @property
+    def store(self):
+        return self.__store
     
     # Returns the total price of an order by table number.
     def get_order_price(self, table_number):
@@ -75,8 +204,12 @@ class OrderManager:
 
     # Updates the customer name for a given table number.
     def change_customer_name(self, table_number, name):
-        order = self.find_order("table_number",table_number)
-        order.customer_name = name
+        with self.__locked_tables(table_number):
+            order = self.find_order("table_number",table_number)
+            order.customer_name = name
+            self.__store.save(order)
+            self.__log("change_customer_name", table_number=table_number, name=name)
+            self.__note_change(order)
         
     # Returns the unit price of a dish in a specific order.
     def get_dish_unit_price(self, table_number, dish_name):
@@ -116,60 +249,486 @@ class OrderManager:
 
         if identifier_type != "customer_name":
            identifier_value = int(identifier_value) 
-        
-        for order in self.orders:  
-            if getattr(order, identifier_type) == identifier_value:
-                if identifier_type != "table_number":
-                   return order
-                if order.status != "Done":
-                   return order
-        raise LookupError("Order is not found")
-  
+
+        if identifier_type == "id":
+           order = self.__store.get_by_id(identifier_value)
+           if order is None and self.__archive is not None:
+              order = self.__archive.get(identifier_value)
+        elif identifier_type == "table_number":
+           # The first active order that was opened at the table.
+           order = self.__store.get_active_by_table(identifier_value)
+        else:
+           # The oldest stored order of the customer.
+           order = self.__store.get_by_customer(identifier_value)
+           if self.__archive is not None:
+              archived_order = self.__archive.get_by_customer(identifier_value)
+              if archived_order is not None and (order is None or archived_order.id < order.id):
+                 order = archived_order
+        if order is None:
+           raise LookupError("Order is not found")
+        return order
+
+    # Returns the lock of the table, creating it on first use.
+    def __table_lock(self, table_number):
+        lock = self.__table_locks.get(table_number)
+        if lock is None:
+           lock = self.__table_locks.setdefault(table_number, threading.Lock())
+        return lock
+
+    # Holds the locks of the tables for the duration of a with block, so changes to the same
+    # table are applied one at a time while changes to different tables run in parallel.
+    # The locks are taken in table number order, so batches over several tables can't deadlock.
+    # Bumps the manager and table versions before releasing the locks (even if the change failed,
+    # which costs readers at most a needless refresh).
+    # Takes a due journal snapshot afterwards, while no change is in progress.
+    @contextmanager
+    def __locked_tables(self, *table_numbers):
+        with self.__changes_lock.shared(), ExitStack() as stack:
+            for table_number in sorted(set(table_numbers)):
+                stack.enter_context(self.__table_lock(table_number))
+            try:
+                yield
+            finally:
+                with self.__version_lock:
+                    self.__version += 1
+                    for table_number in table_numbers:
+                        self.__table_versions[table_number] = self.__version
+                    if self.change_log is not None:
+                       for order_id, removed in self.__changed():
+                           self.change_log.record(order_id, self.__version, removed)
+                       self.__changed().clear()
+        if self.__journal is not None and self.__journal.snapshot_due:
+           with self.__changes_lock.exclusive():
+               if self.__journal.snapshot_due:
+                  self.__journal.snapshot()
+
+    # Returns the list of the orders changed by the thread's current change.
+    def __changed(self):
+        changed = getattr(self.__changed_orders, "orders", None)
+        if changed is None:
+           changed = self.__changed_orders.orders = []
+        return changed
+
+    # Notes that the current change changed (or removed) the order, for the kitchen queue, the views,
+    # the customer name index and the change log.
+    def __note_change(self, order, removed=False):
+        self.__queue_pending_dishes(order, removed)
+        self.__update_view(order, removed)
+        if removed:
+           self.__customer_index.discard(order.id)
+        else:
+           self.__customer_index.update(order.id, order.customer_name)
+        if self.change_log is not None:
+           self.__changed().append((order.id, removed))
+
+    # Brings the kitchen queue up to date with the pending dishes of an order (none if it is removed or 'Done'):
+    # the dishes that became Pending are pushed, the others are left stale. Costs O(log n) per pushed dish.
+    def __queue_pending_dishes(self, order, removed=False):
+        pending = {}
+        if not removed and order.status != "Done" and order.pending_dishes_num:
+           pending = {dish.name: dish.pending_since for dish in order.dishes if dish.status == "Pending"}
+        with self.__kitchen_lock:
+            queued = self.__kitchen_pending.pop(order.id, {})
+            if pending:
+               self.__kitchen_pending[order.id] = pending
+            self.__kitchen_pending_num += len(pending) - len(queued)
+            for dish_name, pending_since in pending.items():
+                if queued.get(dish_name) != pending_since:
+                   heapq.heappush(self.__kitchen_heap,
+                                  (pending_since, next(self.__kitchen_seq), order.id, dish_name))
+            # Stale entries are at most half of the heap.
+            if len(self.__kitchen_heap) > 2 * self.__kitchen_pending_num + 64:
+               self.__compact_kitchen_heap()
+
+    # Rebuilds the heap from the pending dishes, dropping the stale entries (under the kitchen lock).
+    def __compact_kitchen_heap(self):
+        self.__kitchen_heap = [entry for entry in self.__kitchen_heap
+                               if self.__kitchen_pending.get(entry[2], {}).get(entry[3]) == entry[0]]
+        heapq.heapify(self.__kitchen_heap)
+
+    # Rebuilds the kitchen queue from the stored orders (when the manager starts or is loaded).
+    def __rebuild_kitchen_queue(self):
+        with self.__kitchen_lock:
+            self.__kitchen_heap, self.__kitchen_pending, self.__kitchen_pending_num = [], {}, 0
+        for order in self.__store.orders():
+            self.__queue_pending_dishes(order)
+
+    # Notes that the view of an order is out of date (the order changed, or was removed or archived);
+    # the next snapshot replaces it.
+    def __update_view(self, order, removed=False):
+        if self.__views is not None:
+           self.__changed_ids.add(order.id)
+
+    # Rebuilds the views from the stored orders (when the manager starts or is loaded).
+    def __rebuild_views(self):
+        if self.__views is not None:
+           with self.__views_lock:
+               self.__views = {order.id: OrderView(order.to_dict(timestamps=True)) for order in self.__store.orders()}
+               self.__changed_ids = set()
+        self.__snapshot = None
+
+    # Returns a point-in-time snapshot of all the orders (see OrderSnapshot), for the reports: the changes
+    # are paused only to read the dicts of the orders changed since the previous snapshot (cached per
+    # order version), the archive index, the counters and the totals; the views are brought up to date
+    # and copied after the changes resume, and the reports read the snapshot while the changes go on.
+    # With a durable store (no views), the orders are read from the store while the changes are paused.
+    # The latest snapshot is reused until the next change.
+    def snapshot(self):
+        snapshot = self.__snapshot
+        if snapshot is not None and snapshot.version == self.__version:
+           return snapshot
+        if self.__views is None or self.__changes_lock.held_exclusive:
+           # No views, or called with the changes paused (a journal snapshot): read all the stored orders.
+           with self.__changes_lock.exclusive():
+               version, counters, totals, archived = self.__snapshot_state()
+               views = [OrderView(order.to_dict(timestamps=True)) for order in self.__store.orders()]
+           return OrderSnapshot(version, counters, views, totals, archived)
+        with self.__views_lock:
+            snapshot = self.__snapshot
+            if snapshot is not None and snapshot.version == self.__version:
+               return snapshot
+            with self.__changes_lock.exclusive():
+                version, counters, totals, archived = self.__snapshot_state()
+                changed_ids, self.__changed_ids = self.__changed_ids, set()
+                changed = [(order_id, self.__store.get_by_id(order_id)) for order_id in changed_ids]
+                changed = [(order_id, order.to_dict(timestamps=True) if order is not None else None) for order_id, order in changed]
+            views = self.__views
+            for order_id, data in changed:
+                if data is None:
+                   views.pop(order_id, None)
+                else:
+                   views[order_id] = OrderView(data)
+            snapshot = self.__snapshot = OrderSnapshot(version, counters, list(views.values()), totals, archived)
+        return snapshot
+
+    # Returns the version, counters, totals and archive index of a snapshot (the changes must be paused).
+    def __snapshot_state(self):
+        counters = (self.created_orders_num, self.stored_orders_num, self.active_orders_num)
+        totals = {status: self.__store.total_price_by_status(status) for status in ORDER_STATUSES + ("All",)}
+        archived = None
+        if self.__archive is not None:
+           archived_total = self.__archive.total_price
+           if archived_total:
+              totals["Done"] += archived_total
+              totals["All"] += archived_total
+           archived = self.__archive.snapshot()
+        return self.__version, counters, totals, archived
+
+    # Returns the limit pending dishes that have waited longest, oldest first, from the kitchen queue
+    # (without scanning the orders): the order id, table number and dish of each, as dicts.
+    # The dishes of 'Done' and archived orders are not in the queue.
+    def next_pending_dishes(self, limit=DEFAULT_KITCHEN_LIMIT):
+        limit = self.__check_bound("limit", limit)
+        if limit > MAX_PAGE_SIZE:
+           raise ValueError(f"limit cannot be more than {MAX_PAGE_SIZE}")
+        entries = []
+        with self.__kitchen_lock:
+            heap = self.__kitchen_heap
+            while heap and len(entries) < limit:
+                entry = heapq.heappop(heap)
+                if self.__kitchen_pending.get(entry[2], {}).get(entry[3]) == entry[0]:
+                   entries.append(entry)
+            for entry in entries:
+                heapq.heappush(heap, entry)
+        dishes = []
+        for _, _, order_id, dish_name in entries:
+            order = self.__store.get_by_id(order_id)
+            if order is not None and order.is_dish_exists_in_order(dish_name):
+               dishes.append({"order_id": order_id, "table_number": order.table_number,
+                              "dish": order.find_dish_by_name(dish_name).to_dict(timestamps=True)})
+        return dishes
+
+    # Removes the order from the system and updating counters.
+    def __remove(self, order):
+        with self.__counters_lock:
+            self.stored_orders_num -= 1
+            if order.status != "Done":
+                self.active_orders_num -= 1
+            self.__save_counters()
+        if self.__archive is None:
+           self.__store.remove(order)
+           return
+        with self.__archive_lock:
+            if self.__archive.remove(order.id) is None:
+               self.__store.remove(order)
+
+    # Queues a closed order for archiving, and moves the orders closed before the
+    # archive_after most recent ones from the store to the archive.
+    def __archive_closed(self, order_id):
+        if self.__archive is None:
+           return
+        with self.__archive_lock:
+            self.__closed_ids.append(order_id)
+            while len(self.__closed_ids) > self.__archive_after:
+                order = self.__store.get_by_id(self.__closed_ids.popleft())
+                if order is not None and order.status == "Done":
+                   self.__archive.add(order)
+                   self.__store.remove(order)
+                   self.__update_view(order, removed=True)
+
+    # Saves the orders counters in the store.
+    def __save_counters(self):
+        self.__store.save_counters(self.created_orders_num, self.stored_orders_num, self.active_orders_num)
+
     # Adds a new order to the system, assigning it a unique ID and updating counters.
+    # The order is stored and logged under the counters lock, so orders are stored and logged in ID order.
     def add_order(self, order):
-        self.created_orders_num += 1 
-        self.stored_orders_num += 1
-        self.active_orders_num += 1 
-        order.id = self.created_orders_num
-        self.orders.append(order)
+        with self.__locked_tables(order.table_number):
+            with self.__counters_lock:
+                self.created_orders_num += 1 
+                self.stored_orders_num += 1
+                self.active_orders_num += 1 
+                order.id = self.id_offset + (self.created_orders_num - 1) * self.id_stride + 1
+                self.__save_counters()
+                self.__store.add(order)
+                self.__log("add_order", id=order.id, customer_name=order.customer_name, table_number=order.table_number,
+                           opened_at=order.opened_at)
+            self.__note_change(order)
+
+    # Imports orders in bulk from their dictionary representations (as returned by to_dict, e.g. exported):
+    # each record is validated once and its order built without validating it again (see Order.from_valid_dict).
+    # The orders get new ids in record order and keep their status, opening time and dishes.
+    # The records are imported by chunks of IMPORT_CHUNK_SIZE, each stored at once with one update of
+    # the counters and one journal record. A chunk with an invalid record is not imported, and the error
+    # tells the record number and how many orders were imported before it. Returns the number imported.
+    def import_orders(self, records):
+        records = iter(records)
+        imported_num = 0
+        while True:
+            chunk = list(itertools.islice(records, IMPORT_CHUNK_SIZE))
+            if not chunk:
+               return imported_num
+            for index, record in enumerate(chunk, imported_num + 1):
+                try:
+                    Order.check_dict(record)
+                except (TypeError, ValueError) as e:
+                    raise type(e)(f"record {index}: {e} ({imported_num} orders imported)") from e
+            self.__import_chunk([Order.from_valid_dict(record) for record in chunk])
+            imported_num += len(chunk)
+
+    # Stores a chunk of imported orders, assigning their ids.
+    def __import_chunk(self, orders):
+        if self.menu is not None:
+           for order in orders:
+               for dish in order.dishes:
+                   self.__link_menu_item(dish)
+        with self.__locked_tables(*{order.table_number for order in orders}):
+            with self.__counters_lock:
+                first_id = self.id_offset + self.created_orders_num * self.id_stride + 1
+                for index, order in enumerate(orders):
+                    order.id = first_id + index * self.id_stride
+                self.created_orders_num += len(orders)
+                self.stored_orders_num += len(orders)
+                self.active_orders_num += sum(order.status != "Done" for order in orders)
+                self.__save_counters()
+                self.__store.add_many(orders)
+                if self.__journal is not None:
+                   self.__log("import_orders", records=[order.to_dict(timestamps=True) for order in orders])
+            for order in orders:
+                self.__note_change(order)
+                if order.status == "Done":
+                   self.__archive_closed(order.id)
+            if self.events is not None:
+               self.events.publish("orders_imported", {"orders_num": len(orders),
+                                                       "first_id": orders[0].id, "last_id": orders[-1].id})
 
     # Removes an order from the system based on an identifier (table, ID, or customer) and updating counters.
+    # The order is looked up again by ID once its table is locked, in case it was changed meanwhile.
     def remove_order(self, identifier_type, identifier_value):
         order = self.find_order(identifier_type, identifier_value)
-        self.stored_orders_num -= 1
-        if order.status != "Done":
-            self.active_orders_num -= 1
-        self.orders.remove(order)
+        with self.__locked_tables(order.table_number):
+            order = self.find_order("id", order.id)
+            self.__remove(order)
+            self.__log("remove_order", identifier_type="id", identifier_value=order.id)
+            self.__publish("order_removed", order)
+            self.__note_change(order, removed=True)
 
     # Marks an order as 'Done', update active orders counter
     # and return the total price of the order.  
     def close_order(self, table_number):
-        order = self.find_order("table_number",table_number)
-        order.status = "Done"      
-        self.active_orders_num -= 1
+        with self.__locked_tables(table_number):
+            order = self.find_order("table_number",table_number)
+            order.status = "Done"      
+            with self.__counters_lock:
+                self.active_orders_num -= 1
+                self.__save_counters()
+            self.__store.save(order)
+            self.__log("close_order", table_number=table_number)
+            self.__note_change(order)
+            self.__archive_closed(order.id)
         return order.get_total_price()
 
     # Adds a dish to an existing order.
     def add_dish_to_order(self, table_number, dish: Dish):
-        order = self.find_order("table_number",table_number)
-        order.add_dish(dish)
+        with self.__locked_tables(table_number):
+            order = self.find_order("table_number",table_number)
+            self.__link_menu_item(dish)
+            order.add_dish(dish)
+            self.__store.save(order, dish.name)
+            self.__log("add_dish_to_order", table_number=table_number,
+                       name=dish.name, quantity=dish.quantity, unit_price=dish.unit_price,
+                       pending_since=self.__pending_times(order, [dish.name]))
+            self.__publish("dish_added", order, dish.name)
+            self.__note_change(order)
+
+    # Returns the menu item with the id.
+    def __menu_item(self, menu_id):
+        if self.menu is None:
+           raise LookupError("there is no menu")
+        return self.menu.get(menu_id)
+
+    # Links an ad-hoc dish to the menu item of the same name and price, if there is one.
+    def __link_menu_item(self, dish):
+        if self.menu is not None and dish.menu_item is None:
+           dish.link_menu_item(self.menu.find_by_name(dish.name))
 
     # Removes a dish from an order. if the order became empty- order deleted.
     def remove_dish_from_order(self, table_number, dish_name):
-        order = self.find_order("table_number", table_number)
-        order.remove_dish(dish_name)
-        if not order.dishes:
-           self.remove_order("table_number", table_number) 
+        with self.__locked_tables(table_number):
+            order = self.find_order("table_number", table_number)
+            order.remove_dish(dish_name)
+            if order.dishes_num:
+               self.__store.save(order, dish_name)
+            else:
+               self.__remove(order) 
+            self.__log("remove_dish_from_order", table_number=table_number, dish_name=dish_name)
+            self.__publish("dish_removed", order, dish_name)
+            self.__note_change(order, removed=not order.dishes_num)
 
     # Updates the quantity of a specific dish in an order.
     def update_dish_quantity(self, table_number, dish_name, new_quantity):
-        order = self.find_order("table_number",table_number)
-        order.update_dish_quantity(dish_name, new_quantity)
+        with self.__locked_tables(table_number):
+            order = self.find_order("table_number",table_number)
+            order.update_dish_quantity(dish_name, new_quantity)
+            self.__store.save(order, dish_name)
+            self.__log("update_dish_quantity", table_number=table_number, dish_name=dish_name, new_quantity=new_quantity,
+                       pending_since=self.__pending_times(order, [dish_name]))
+            self.__publish("dish_quantity", order, dish_name)
+            self.__note_change(order)
 
     # Updates the status of a dish within an order.   
     def update_dish_status(self, table_number, dish_name, status):
-        order = self.find_order("table_number",table_number)
-        order.update_dish_status(dish_name, status)
+        with self.__locked_tables(table_number):
+            order = self.find_order("table_number",table_number)
+            order.update_dish_status(dish_name, status)
+            self.__store.save(order, dish_name)
+            self.__log("update_dish_status", table_number=table_number, dish_name=dish_name, status=status,
+                       pending_since=self.__pending_times(order, [dish_name]))
+            self.__publish("dish_status", order, dish_name)
+            self.__note_change(order)
+
+    # Applies a list of dish operations to orders, all or nothing.
+    # Each operation is a dict with the 'table_number', an 'action' ('add', 'remove', 'update_quantity'
+    # or 'update_status'), the dish 'name', and the 'quantity', 'unit_price' or 'status' the action needs.
+    # Each order is looked up once and its table stays locked for the whole batch. The operations are
+    # first tried on copies of the orders; if one fails, no order is changed and a BatchError is raised.
+    # Returns a result dict per operation.
+    def apply_batch(self, operations):
+        if not isinstance(operations, list):
+           raise TypeError("operations must be a list")
+        for index, operation in enumerate(operations):
+            try:
+                if not isinstance(operation, dict):
+                   raise TypeError("operation must be an object")
+                self.check_valid_identifier("table_number", operation.get("table_number"))
+            except Exception as e:
+                raise BatchError(e, self.__batch_results(index, e))
+        operations = [{**operation, "table_number": int(operation["table_number"])} for operation in operations]
+
+        table_numbers = {operation["table_number"] for operation in operations}
+        with self.__locked_tables(*table_numbers):
+            orders = {}
+            for table_number in table_numbers:
+                try:
+                    orders[table_number] = self.find_order("table_number", table_number)
+                except LookupError:
+                    pass
+            # Dry run on copies: any failure leaves the real orders untouched.
+            copies = {table_number: Order.from_dict(order.to_dict(timestamps=True)) for table_number, order in orders.items()}
+            for index, operation in enumerate(operations):
+                try:
+                    self.__apply_batch_operation(copies, operation)
+                except Exception as e:
+                    raise BatchError(e, self.__batch_results(index, e))
+
+            changed_orders = list(orders.values())
+            events, changed_dishes = [], {}
+            for operation in operations:
+                order = orders[operation["table_number"]]
+                dish_name = self.__apply_batch_operation(orders, operation)
+                changed_dishes.setdefault(order, {})[dish_name] = None
+                if order.dishes_num:
+                   self.__store.save(order, dish_name)
+                else:
+                   self.__remove(order)
+                if self.events is not None:
+                   events.append((BATCH_EVENTS[operation["action"]], self.__event_data(order, dish_name)))
+            self.__log("apply_batch", operations=operations,
+                       pending_since=[times for order, dish_names in changed_dishes.items()
+                                      for times in self.__pending_times(order, dish_names)])
+            for event_type, data in events:
+                self.events.publish(event_type, data)
+            for order in changed_orders:
+                self.__note_change(order, removed=not order.dishes_num)
+        return self.__batch_results(len(operations))
+
+    # Returns the results of a batch: 'ok' for the operations before index,
+    # and the error of the operation at index, if it failed.
+    @staticmethod
+    def __batch_results(index, error=None):
+        results = [{"index": i, "result": "ok"} for i in range(index)]
+        if error is not None:
+           results.append({"index": index, "result": "failed", "error": str(error)})
+        return results
+
+    # Applies one batch operation to the order of its table in orders, returns the name of the dish.
+    # An order left with no dishes is deleted from orders, like remove_dish_from_order deletes it.
+    # An 'add' operation with a 'menu_id' adds the menu item (with the 'quantity') instead of a 'name' and 'unit_price'.
+    def __apply_batch_operation(self, orders, operation):
+        action, table_number, name = operation.get("action"), operation["table_number"], operation.get("name")
+        if action not in BATCH_ACTIONS:
+           raise ValueError("action must be 'add', 'remove', 'update_quantity' or 'update_status'")
+        order = orders.get(table_number)
+        if order is None:
+           raise LookupError("Order is not found")
+        if action == "add":
+           if operation.get("menu_id") is not None:
+              dish = Dish.from_menu_item(self.__menu_item(operation["menu_id"]), operation.get("quantity"))
+           else:
+              dish = Dish(name, operation.get("quantity"), operation.get("unit_price"))
+              self.__link_menu_item(dish)
+           order.add_dish(dish)
+           return dish.name
+        if action == "remove":
+           order.remove_dish(name)
+           if not order.dishes_num:
+              del orders[table_number]
+        elif action == "update_quantity":
+           order.update_dish_quantity(name, operation.get("quantity"))
+        else:
+           order.update_dish_status(name, operation.get("status"))
+        return name
+
+    # Returns up to limit orders (archived ones included) whose customer name starts with name, ignoring case,
+    # ordered by customer name then id, from the customer name index (without scanning the orders).
+    def search_orders(self, name, limit=DEFAULT_PAGE_SIZE):
+        if name is None:
+           raise ValueError("name cannot be None")
+        if not isinstance(name, str):
+           raise TypeError("name must be a string")
+        if not name.strip():
+           raise ValueError("name cannot be empty")
+        limit = self.__check_bound("limit", limit)
+        if limit > MAX_PAGE_SIZE:
+           raise ValueError(f"limit cannot be more than {MAX_PAGE_SIZE}")
+        orders = []
+        for order_id in self.__customer_index.search(name, limit):
+            order = self.__store.get_by_id(order_id)
+            if order is None and self.__archive is not None:
+               order = self.__archive.get(order_id)
+            if order is not None:
+               orders.append(order)
+        return orders
 
     # Validates the order status before processing.
     def check_valid_status(self, status):
@@ -185,33 +744,301 @@ class OrderManager:
         self.check_valid_status(status)
         if status == "All":
            raise ValueError("status cannot be 'All'")
-        return [order.table_number for order in self.orders if order.status == status]
+        if status != "Done" or self.__archive is None:
+           return self.__store.table_numbers_by_status(status)
+        live = [(order.id, order.table_number) for order in self.__store.orders() if order.status == "Done"]
+        return [table_number for _, table_number in heapq.merge(self.__archive.id_table_numbers(), live)]
 
-    # Calculates the total price of all orders matching a given status.
+    # Returns the total price of all orders matching a given status, from the store and archive running totals.
     # If status is 'All', returns the total price of all orders.
     def total_orders_price_by_status(self, status):
         self.check_valid_status(status)
-        if status == "All":
-           return sum(order.get_total_price() for order in self.orders)
-        return sum(order.get_total_price() for order in self.orders if order.status == status)    
+        if self.debug:
+           self.verify_totals()
+        # Read under the archive lock, so an order being moved to the archive is counted once.
+        with self.__archive_lock:
+            total = self.__store.total_price_by_status(status)
+            if self.__archive is not None and status in {"Done", "All"}:
+               archived_total = self.__archive.total_price
+               total = total + archived_total if archived_total else total
+        return total
+
+    # Recomputes all the totals by traversing every order and dish,
+    # and raises an error if they don't match the running totals.
+    # The changes are paused meanwhile, so a change in progress can't make them differ.
+    def verify_totals(self):
+        with self.__changes_lock.exclusive():
+            self.__store.verify_totals()
+            if self.__archive is not None:
+               self.__archive.verify_total()
 
     # Retrieves all dishes in an order that match a given status.
     def get_table_dishes_by_status(self, table_number, status):
         order = self.find_order("table_number",table_number) 
         return order.get_dishes_by_status(status)
 
-    # Returns a list of all dishes across all orders that match a given status.
+    # Returns the snapshots of the orders at tables, for a POS screen: one dict per active order,
+    # in the order of the tables, with its table number and the fields asked for (all the TABLE_FIELDS
+    # by default), each order looked up once. Tables without an active order are listed in 'not_found'.
+    # table_numbers and fields- see check_table_numbers and check_table_fields.
+    def get_tables(self, table_numbers, fields=None):
+        table_numbers = self.check_table_numbers(table_numbers)
+        fields = self.check_table_fields(fields)
+        snapshots, not_found = [], []
+        for table_number in table_numbers:
+            order = self.__store.get_active_by_table(table_number)
+            if order is None:
+               not_found.append(table_number)
+            else:
+               snapshots.append(self.__table_snapshot(order, fields))
+        return {"orders": snapshots, "not_found": not_found}
+
+    # Returns the fields of an order (and its table number), as plain data.
+    @staticmethod
+    def __table_snapshot(order, fields):
+        snapshot = {"table_number": order.table_number}
+        for field in fields:
+            if field == "dishes":
+               snapshot[field] = [dish.to_dict(timestamps=True) for dish in order.dishes]
+            elif field == "pending_dishes":
+               snapshot[field] = [dish.to_dict(timestamps=True) for dish in order.get_dishes_by_status("Pending")]
+            elif field == "served_dishes":
+               snapshot[field] = [dish.to_dict(timestamps=True) for dish in order.get_dishes_by_status("Served")]
+            elif field == "total_price":
+               snapshot[field] = order.get_total_price()
+            else:
+               snapshot[field] = getattr(order, field)
+        return snapshot
+
+    # Validates table numbers (a list of ints, or a comma separated string of them), 1 to MAX_PAGE_SIZE
+    # of them, and returns them as a list of ints without repeats.
+    @staticmethod
+    def check_table_numbers(table_numbers):
+        if isinstance(table_numbers, str):
+           table_numbers = [value.strip() for value in table_numbers.split(",")]
+           if not all(value.isdigit() for value in table_numbers):
+              raise ValueError("tables must be a comma separated list of ints")
+           table_numbers = [int(value) for value in table_numbers]
+        elif not isinstance(table_numbers, (list, tuple)):
+           raise TypeError("tables must be a list")
+        if not table_numbers:
+           raise ValueError("tables cannot be empty")
+        if len(table_numbers) > MAX_PAGE_SIZE:
+           raise ValueError(f"tables cannot be more than {MAX_PAGE_SIZE}")
+        for table_number in table_numbers:
+            if isinstance(table_number, bool) or not isinstance(table_number, int):
+               raise TypeError("table number must be a integer")
+            if table_number <= 0:
+               raise ValueError("table number must be positive")
+        return list(dict.fromkeys(table_numbers))
+
+    # Validates table snapshot fields (names of TABLE_FIELDS, as a list or a comma separated string)
+    # and returns them as a list, all the TABLE_FIELDS for None.
+    @staticmethod
+    def check_table_fields(fields):
+        if fields is None:
+           return list(TABLE_FIELDS)
+        if isinstance(fields, str):
+           fields = [field.strip() for field in fields.split(",")]
+        elif not isinstance(fields, (list, tuple)):
+           raise TypeError("fields must be a list")
+        for field in fields:
+            if field not in TABLE_FIELDS:
+               raise ValueError(f"field must be one of {', '.join(TABLE_FIELDS)}")
+        return list(dict.fromkeys(fields))
+
+    # Returns a list of all dishes across all orders that match a given status, as DishViews of a snapshot,
+    # or read by the store's own query (as Dishes) when it is durable. Archived orders are not included.
     def get_all_dishes_by_status(self, status):
-        dishes = []
-        for order in self.orders:
-            dishes.extend(order.get_dishes_by_status(status))
-        return dishes
+        if self.__views is None:
+           if status is None:
+              raise ValueError("status cannot be None")
+           if not isinstance(status, str):
+              raise TypeError("status must be a string")
+           return self.__store.dishes_by_status(status)
+        return self.snapshot().dishes_by_status(status)
    
-    # Converts the order manager's data into a dictionary format for serialization.
-    def to_dict(self):
+    # Validates an optional filter bound (an int or a numeric string) and returns it as an int.
+    @staticmethod
+    def __check_bound(name, value, minimum=1):
+        if value is None:
+           return None
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+           raise TypeError(f"{name} must be an int")
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an int")
+        if value < minimum:
+           raise ValueError(f"{name} must be at least {minimum}")
+        return value
+
+    # Iterates over the orders (archived ones included) matching the filters, ordered by id:
+    # the order status ('All' for any), inclusive table number and id ranges (None for no bound),
+    # and the ids after after_id (the id of the last order already read, like a page cursor).
+    # The filters are validated right away, the orders are read lazily as the iteration goes.
+    def iter_orders(self, status="All", min_table=None, max_table=None, min_id=None, max_id=None, after_id=0):
+        self.check_valid_status(status)
+        min_table = self.__check_bound("min_table", min_table)
+        max_table = self.__check_bound("max_table", max_table)
+        min_id = self.__check_bound("min_id", min_id)
+        max_id = self.__check_bound("max_id", max_id)
+        after_id = self.__check_bound("after_id", after_id, 0) or 0
+        if min_id is not None:
+           after_id = max(after_id, min_id - 1)
+        return self.__matching_orders(status, min_table, max_table, max_id, after_id)
+
+    def __matching_orders(self, status, min_table, max_table, max_id, after_id):
+        for order in self.__all_orders(after_id):
+            if max_id is not None and order.id > max_id:
+               return
+            if status != "All" and order.status != status:
+               continue
+            if (min_table is not None and order.table_number < min_table
+                or max_table is not None and order.table_number > max_table):
+               continue
+            yield order
+
+    # Returns a page of the summary: the counters, up to limit orders matching the filters
+    # (see iter_orders) after the cursor, and the cursor of the next page, None on the last page.
+    # The cursor is the id of the last order of the page, so pages stay stable while orders are added.
+    def summary_page(self, limit=DEFAULT_PAGE_SIZE, cursor=None, **filters):
+        limit = self.__check_bound("limit", limit)
+        if limit > MAX_PAGE_SIZE:
+           raise ValueError(f"limit cannot be more than {MAX_PAGE_SIZE}")
+        after_id = self.__check_bound("cursor", cursor, 0) or 0
+        with closing(self.iter_orders(after_id=after_id, **filters)) as orders:
+            page = list(itertools.islice(orders, limit + 1))
         return {
         "created_orders_num": self.created_orders_num,
         "stored_orders_num": self.stored_orders_num,
         "active_orders_num": self.active_orders_num,
-        "orders": [order.to_dict() for order in self.orders]
+        "orders": [order.to_dict(timestamps=True) for order in page[:limit]],
+        "next_cursor": page[limit - 1].id if len(page) > limit else None
         }
+
+    # Returns the changes since a version, for a client that syncs from the version it has:
+    # the current version, the orders added or changed since then and the ids of the orders removed since then.
+    # All the orders are returned instead, with 'full' set, for since 0 (a new client), a since beyond the version
+    # (a client of an earlier process) or a since whose changes were already compacted away.
+    # client- the id of a client that has all the changes up to since, so the older ones can be compacted.
+    # Requires a change log.
+    def changes_since(self, since, client=None):
+        if self.change_log is None:
+           raise RuntimeError("the order manager has no change log")
+        version = self.version  # Read first: the changes returned are at least as new as it.
+        since = self.__check_bound("since", since, 0) or 0
+        if client is not None:
+           self.change_log.acknowledge(str(client), min(since, version))
+        changes = self.change_log.changes_since(since) if 0 < since <= version else None
+        if changes is None:
+           return {"version": version, "full": True, "orders": [order.to_dict(timestamps=True) for order in self.__all_orders()],
+                   "removed": []}
+        orders, removed = [], []
+        for order_id, _, order_removed in changes:
+            try:
+                if order_removed:
+                   raise LookupError("Order is not found")
+                orders.append(self.find_order("id", order_id).to_dict(timestamps=True))
+            except LookupError:
+                removed.append(order_id)
+        return {"version": version, "full": False, "orders": orders, "removed": removed}
+
+    # Converts the order manager's data into a dictionary format for serialization.
+    # Returns the counters and all the orders of a snapshot, as OrderViews (and Order objects for the
+    # archived ones; see to_dict for their dicts).
+    def summary(self):
+        return self.snapshot().summary()
+
+    # timestamps- whether the orders and dishes include them (see Order.to_dict), as the journal snapshots need.
+    def to_dict(self, timestamps=False):
+        return self.snapshot().to_dict(timestamps)
+
+    # Restores the manager from its dictionary representation (as returned by to_dict(timestamps=True)).
+    # The manager must be empty; the orders keep their ids and statuses.
+    def load_dict(self, data):
+        if self.created_orders_num or next(self.__all_orders(), None) is not None:
+           raise ValueError("cannot load into a manager that already has orders")
+        for order_data in data["orders"]:
+            self.__store.add(Order.from_dict(order_data))
+        self.created_orders_num = data["created_orders_num"]
+        self.stored_orders_num = data["stored_orders_num"]
+        self.active_orders_num = data["active_orders_num"]
+        self.__save_counters()
+        for order_data in data["orders"]:
+            if order_data["status"] == "Done":
+               self.__archive_closed(order_data["id"])
+        self.__rebuild_kitchen_queue()
+        self.__rebuild_views()
+        self.__customer_index.rebuild(self.__all_orders())
+
+    # Publishes a change to the dishes of an order, if there is an event buffer.
+    # Events are published under the table lock, so the events of a table come in order.
+    def __publish(self, event_type, order, dish_name=None):
+        if self.events is not None:
+           self.events.publish(event_type, self.__event_data(order, dish_name))
+
+    # Returns the data of a dish event: the order id and table number, and the dish as a dict,
+    # or only its name if it was removed.
+    @staticmethod
+    def __event_data(order, dish_name=None):
+        data = {"order_id": order.id, "table_number": order.table_number}
+        if dish_name is not None:
+           if order.is_dish_exists_in_order(dish_name):
+              data["dish"] = order.find_dish_by_name(dish_name).to_dict(timestamps=True)
+           else:
+              data["dish_name"] = dish_name
+        return data
+
+    # Returns the [table number, dish name, pending since] of the named dishes of the order that are Pending,
+    # logged with the changes to dishes so replaying them restores when the dishes became Pending.
+    @staticmethod
+    def __pending_times(order, dish_names):
+        times = []
+        for dish_name in dish_names:
+            if order.is_dish_exists_in_order(dish_name):
+               dish = order.find_dish_by_name(dish_name)
+               if dish.status == "Pending":
+                  times.append([order.table_number, dish.name, dish.pending_since])
+        return times
+
+    # Restores when the dishes of a replayed change became Pending, see __pending_times.
+    def __restore_pending_times(self, times):
+        for table_number, dish_name, pending_since in times:
+            order = self.find_order("table_number", table_number)
+            if order.get_dish_status(dish_name) == "Pending":
+               order.restore_dish_pending_since(dish_name, pending_since)
+               self.__store.save(order, dish_name)
+               self.__queue_pending_dishes(order)
+               self.__update_view(order)
+        self.__snapshot = None
+
+    # Records a successful change in the journal, if there is one.
+    def __log(self, operation, **args):
+        if self.__journal is not None:
+           self.__journal.append(operation, args)
+
+    # Applies an operation recorded in the journal, by calling the matching method.
+    # Changes to dishes are logged with when the dishes became Pending, restored once they are replayed.
+    def apply_operation(self, operation, args):
+        if operation not in MUTATING_OPERATIONS:
+           raise ValueError(f"unknown operation '{operation}'")
+        args = dict(args)
+        pending_times = args.pop("pending_since", [])
+        if operation == "add_order":
+           order = Order(args["customer_name"], args["table_number"])
+           if args.get("opened_at") is not None:
+              order.opened_at = args["opened_at"]
+           self.add_order(order)
+           if order.id != args["id"]:
+              raise RuntimeError(f"replayed order got id {order.id}, expected {args['id']}")
+        elif operation == "import_orders":
+           first_id = self.id_offset + self.created_orders_num * self.id_stride + 1
+           if args["records"][0]["id"] != first_id:
+              raise RuntimeError(f"replayed import starts at id {first_id}, expected {args['records'][0]['id']}")
+           self.import_orders(args["records"])
+        elif operation == "add_dish_to_order":
+           self.add_dish_to_order(args["table_number"], Dish(args["name"], args["quantity"], args["unit_price"]))
+        else:
+           getattr(self, operation)(**args)
+        self.__restore_pending_times(pending_times)
@@ -0,0 +1,57 @@
+## OrderSnapshot.py
+## A point-in-time view of all the orders of an OrderManager (see OrderManager.snapshot), for reports:
+## it is taken while no change is in progress and never changes afterwards, so the reports read it
+## without locks while the orders keep changing, and see every order at the same version.
+
+import heapq
+
+class OrderSnapshot:
+    # constructor, version- the manager version it was taken at, counters- the (created, stored, active)
+    # orders counters, orders- the OrderViews of the live orders (in any order), totals- status -> total price
+    # of the orders (archived ones included), archived- a function iterating over the archived orders
+    # ordered by id (see OrderArchive.snapshot), None without an archive.
+    def __init__(self, version, counters, orders, totals, archived=None):
+        self.version = version
+        self.created_orders_num, self.stored_orders_num, self.active_orders_num = counters
+        self.__orders = sorted(orders, key=lambda order: order.id)
+        self.__totals = totals
+        self.__archived = archived
+
+    # The views of the live orders, ordered by id.
+    @property
+    def live_orders(self):
+        return self.__orders
+
+    # Iterates over the live and archived orders, ordered by id.
+    def orders(self):
+        if self.__archived is None:
+           return iter(self.__orders)
+        return heapq.merge(self.__orders, self.__archived(), key=lambda order: order.id)
+
+    # Returns the total price of the orders with the status ('Pending', 'Served', 'Done' or 'All').
+    def total_price_by_status(self, status):
+        return self.__totals[status]
+
+    # Returns the views of the dishes of the live orders that match the status ('Pending', 'Served' or 'All').
+    def dishes_by_status(self, status):
+        if status is None:
+           raise ValueError("status cannot be None")
+        if not isinstance(status, str):
+           raise TypeError("status must be a string")
+        if status not in {"Pending", "Served", "All"}:
+           raise ValueError("status must be 'Pending' or 'Served' or 'All'")
+        return [dish for order in self.__orders for dish in order.get_dishes_by_status(status)]
+
+    # Returns the counters and all the orders (see OrderManager.summary).
+    def summary(self):
+        return {
+        "created_orders_num": self.created_orders_num,
+        "stored_orders_num": self.stored_orders_num,
+        "active_orders_num": self.active_orders_num,
+        "orders": list(self.orders())
+        }
+
+    def to_dict(self, timestamps=False):
+        data = self.summary()
+        data["orders"] = [order.to_dict(timestamps) for order in data["orders"]]
+        return data
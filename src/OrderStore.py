@@ -0,0 +1,80 @@
+## OrderStore.py
+## The storage interface under OrderManager: keeps the orders, their lookup indexes and the counters.
+## OrderManager validates and applies every change on the Order objects, then hands them to the store.
+
+import math
+
+ORDER_STATUSES = ("Pending", "Served", "Done")
+
+class OrderStore:
+    # Whether the store keeps the orders across restarts by itself (so no journal is needed to recover them).
+    durable = False
+
+    # Stores a new order, its id is already assigned.
+    def add(self, order):
+        raise NotImplementedError
+
+    # Stores new orders at once (ids already assigned, in increasing order), for bulk imports.
+    def add_many(self, orders):
+        for order in orders:
+            self.add(order)
+
+    # Removes a stored order.
+    def remove(self, order):
+        raise NotImplementedError
+
+    # Saves the changes made to a stored order: its status, customer name and total price,
+    # and the dish named dish_name if a dish was added, removed or changed.
+    def save(self, order, dish_name=None):
+        raise NotImplementedError
+
+    # Returns the order with the given id, or None.
+    def get_by_id(self, order_id):
+        raise NotImplementedError
+
+    # Returns the first active (not 'Done') order opened at the table, or None.
+    def get_active_by_table(self, table_number):
+        raise NotImplementedError
+
+    # Returns the oldest order of the customer, or None.
+    def get_by_customer(self, customer_name):
+        raise NotImplementedError
+
+    # Iterates over the stored orders with an id greater than after_id (all of them by default), ordered by id.
+    def orders(self, after_id=0):
+        raise NotImplementedError
+
+    # Returns the table numbers of the orders with the given status, ordered by order id.
+    def table_numbers_by_status(self, status):
+        raise NotImplementedError
+
+    # Returns the dishes with the given status ('Pending', 'Served' or 'All') across all orders.
+    def dishes_by_status(self, status):
+        raise NotImplementedError
+
+    # Returns the total price of the orders with the given status, or of all orders for 'All'.
+    def total_price_by_status(self, status):
+        raise NotImplementedError
+
+    # Returns the saved (created, stored, active) orders counters, or None if there are none.
+    def load_counters(self):
+        return None
+
+    # Saves the orders counters.
+    def save_counters(self, created_orders_num, stored_orders_num, active_orders_num):
+        pass
+
+    # Recomputes all the totals by traversing every order and dish,
+    # and raises an error if they don't match the store totals.
+    def verify_totals(self):
+        expected = {status: [] for status in ORDER_STATUSES + ("All",)}
+        for order in self.orders():
+            total = order.compute_total_price()
+            if not math.isclose(order.get_total_price(), total):
+               raise RuntimeError(f"order {order.id} total price is {order.get_total_price()}, expected {total}")
+            expected[order.status].append(total)
+            expected["All"].append(total)
+        for status, totals in expected.items():
+            total = math.fsum(totals)
+            if not math.isclose(self.total_price_by_status(status), total):
+               raise RuntimeError(f"'{status}' orders total price is {self.total_price_by_status(status)}, expected {total}")
@@ -0,0 +1,73 @@
+## OrderTransfer.py
+## Moves orders between servers as NDJSON, one order (as returned by Order.to_dict) per line:
+## the export of a server (GET /orders/export) is streamed into the import of another (POST /orders/import),
+## which validates every record once and stores the orders in bulk (see OrderManager.import_orders).
+## Seed or migrate a server from the command line with:
+##   python -m src.OrderTransfer export --url http://old-host:5000 > orders.ndjson
+##   python -m src.OrderTransfer import --url http://new-host:5000 orders.ndjson
+## or directly: python -m src.OrderTransfer copy --url http://old-host:5000 --to http://new-host:5000
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import urllib.request
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+COPY_BUFFER_SIZE = 1 << 16
+
+
+# Yields the records of NDJSON lines (str or bytes), skipping blank lines.
+def read_ndjson(lines):
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+           continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {line_number}: invalid JSON ({e})") from None
+
+
+# Opens the export of the server at url, as a binary stream of NDJSON lines.
+def open_export(url):
+    return urllib.request.urlopen(url.rstrip("/") + "/orders/export")
+
+
+# Posts a binary stream of NDJSON lines to the import of the server at url, returns its response.
+# Without a length, the stream is sent chunked as it is read.
+def post_import(url, stream, length=None):
+    headers = {"Content-Type": NDJSON_MIMETYPE}
+    if length is not None:
+       headers["Content-Length"] = str(length)
+    request = urllib.request.Request(url.rstrip("/") + "/orders/import", data=stream, headers=headers, method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export and import orders as NDJSON")
+    parser.add_argument("command", choices=["export", "import", "copy"])
+    parser.add_argument("path", nargs="?", help="NDJSON file to import (standard input by default)")
+    parser.add_argument("--url", required=True, help="server to export from, or to import into")
+    parser.add_argument("--to", help="server to import into, for copy")
+    args = parser.parse_intermixed_args()
+
+    if args.command == "export":
+       with open_export(args.url) as response:
+           shutil.copyfileobj(response, sys.stdout.buffer, COPY_BUFFER_SIZE)
+    elif args.command == "import":
+       if args.path:
+          with open(args.path, "rb") as file:
+              print(post_import(args.url, file, os.path.getsize(args.path)))
+       else:
+          print(post_import(args.url, sys.stdin.buffer))
+    else:
+       if not args.to:
+          parser.error("copy needs --to")
+       with open_export(args.url) as response:
+           print(post_import(args.to, response))
+
+
+if __name__ == "__main__":
+    main()
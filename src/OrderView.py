@@ -0,0 +1,91 @@
+## OrderView.py
+## An immutable point-in-time view of an order, read from its dictionary representation (see Order.to_dict):
+## the reads of an Order, for the reports that run on an OrderSnapshot.
+## The dict is the one the order cached for its version: the view shares it (and the dicts of the
+## dishes that did not change since) instead of copying the order.
+
+from .DishView import DishView
+from .JSONFormat import encode_number, encode_string
+
+class OrderView:
+    __slots__ = ("__data", "__dishes", "__cached_json")
+
+    # constructor, data- the dict of the order at some version, with its timestamps (Order.to_dict(timestamps=True)
+    # builds a new one per version, never changed afterwards).
+    def __init__(self, data):
+        self.__data = data
+        self.__dishes = None
+        self.__cached_json = None
+
+    @property
+    def id(self):
+        return self.__data["id"]
+
+    @property
+    def customer_name(self):
+        return self.__data["customer_name"]
+
+    @property
+    def table_number(self):
+        return self.__data["table_number"]
+
+    @property
+    def status(self):
+        return self.__data["status"]
+
+    @property
+    def opened_at(self):
+        return self.__data["opened_at"]
+
+    # The views of the dishes, built on first use.
+    def __dish_views(self):
+        if self.__dishes is None:
+           self.__dishes = tuple(DishView(dish) for dish in self.__data["dishes"])
+        return self.__dishes
+
+    # Returns the views of the dishes as a new list, in the order they were added.
+    @property
+    def dishes(self):
+        return list(self.__dish_views())
+
+    @property
+    def dishes_num(self):
+        return len(self.__data["dishes"])
+
+    # Returns the views of the dishes filtered by status ('Pending', 'Served', or 'All'), like Order.get_dishes_by_status.
+    def get_dishes_by_status(self, status):
+        if status is None:
+           raise ValueError("status cannot be None")
+        if not isinstance(status, str):
+           raise TypeError("status must be a string")
+        if status not in {"Pending", "Served", "All"}:
+           raise ValueError("status must be 'Pending' or 'Served' or 'All'")
+        if status == "All":
+           return self.dishes
+        return [dish for dish in self.__dish_views() if dish.status == status]
+
+    def get_total_price(self):
+        return self.__data["total_price"]
+
+    # Returns a new order dict without the timestamps, or with timestamps the order dict (callers must not modify it),
+    # like Order.to_dict.
+    def to_dict(self, timestamps=False):
+        if not timestamps:
+           data = {key: value for key, value in self.__data.items() if key != "opened_at"}
+           data["dishes"] = [dish.to_dict(False) for dish in self.__dish_views()]
+           return data
+        return self.__data
+
+    # Returns the order as JSON, exactly as Order.to_json, built once from the JSON of the dish views.
+    def to_json(self, timestamps=False):
+        cached = self.__cached_json
+        if cached is None or cached[0] != timestamps:
+           data = self.__data
+           opened_at = f'"opened_at":{encode_number(data["opened_at"])},' if timestamps else ""
+           cached = self.__cached_json = (timestamps,
+                                          f'{{"customer_name":{encode_string(data["customer_name"])},'
+                                          f'"dishes":[{",".join(dish.to_json(timestamps) for dish in self.__dish_views())}],'
+                                          f'"id":{encode_number(data["id"])},{opened_at}'
+                                          f'"status":{encode_string(data["status"])},"table_number":{encode_number(data["table_number"])},'
+                                          f'"total_price":{encode_number(data["total_price"])}}}')
+        return cached[1]
@@ -0,0 +1,56 @@
+## ReadWriteLock.py
+## A lock that many threads can hold together in shared mode, or one thread alone in exclusive mode.
+## Threads waiting for exclusive mode block new shared holders, so they are not starved.
+## The thread holding exclusive mode can take it again (e.g. a journal snapshot reading a manager snapshot).
+
+import threading
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    # constructor, Initializes an unheld lock.
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__shared_num = 0          # Number of threads holding the lock in shared mode.
+        self.__exclusive = False       # Whether a thread holds, or waits for, exclusive mode.
+        self.__owner = None            # The thread holding exclusive mode.
+
+    # Holds the lock in shared mode for the duration of a with block.
+    @contextmanager
+    def shared(self):
+        with self.__condition:
+            while self.__exclusive:
+                self.__condition.wait()
+            self.__shared_num += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__shared_num -= 1
+                if not self.__shared_num:
+                   self.__condition.notify_all()
+
+    # Whether the current thread holds the lock in exclusive mode.
+    @property
+    def held_exclusive(self):
+        return self.__owner == threading.get_ident()
+
+    # Holds the lock in exclusive mode for the duration of a with block.
+    @contextmanager
+    def exclusive(self):
+        if self.__owner == threading.get_ident():
+           yield
+           return
+        with self.__condition:
+            while self.__exclusive:
+                self.__condition.wait()
+            self.__exclusive = True
+            while self.__shared_num:
+                self.__condition.wait()
+            self.__owner = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__exclusive = False
+                self.__owner = None
+                self.__condition.notify_all()
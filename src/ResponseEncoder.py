@@ -0,0 +1,109 @@
+## ResponseEncoder.py
+## Encodes the JSON responses of the app, byte for byte as jsonify does (sorted keys, compact separators,
+## ensure_ascii; indented in debug mode), faster:
+##   - orders and dishes write themselves (Order.to_json, Dish.to_json, cached until their next change,
+##     and their snapshot views OrderView and DishView),
+##     instead of being turned into dicts (to_dict) and then encoded;
+##   - the other values are encoded by orjson when it is installed, with the standard json module otherwise.
+## orjson differs from json.dumps on a few values (non-ASCII text, very small or large floats, NaN and
+## the infinities); its output is escaped like ensure_ascii, and re-encoded with json in the other cases.
+## Choose the encoder with ORDERS_JSON_ENCODER=orjson or json.
+## The orders' opened_at and the dishes' pending since are left out of the orders and dishes unless the
+## encoder is made with timestamps (ORDERS_RESPONSE_TIMESTAMPS=1), so the responses keep their fields;
+## the kitchen queue, the table fields and the export give them when asked.
+
+import json
+import math
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .Order import Order
+from .Dish import Dish
+from .OrderView import OrderView
+from .DishView import DishView
+
+ENCODERS = ("orjson", "json")
+MODELS = (Order, Dish, OrderView, DishView)
+
+# The characters json.dumps escapes with ensure_ascii but orjson writes as they are.
+UNESCAPED = re.compile("[^\x00-\x7e]")
+# The floats orjson writes differently from json.dumps: with an exponent, or below 1e-4 without one.
+# They are found in the output (a match inside a string only costs a re-encoding).
+DIFFERENT_FLOAT = re.compile(rb"\de|0\.0000")
+
+# Escapes a character like json.dumps with ensure_ascii.
+def escape_char(match):
+    code = ord(match.group())
+    if code < 0x10000:
+       return f"\\u{code:04x}"
+    code -= 0x10000
+    return f"\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}"
+
+# Returns whether a value holds a float that is NaN or infinite.
+def has_nonfinite(value):
+    if isinstance(value, float):
+       return not math.isfinite(value)
+    if isinstance(value, dict):
+       return any(has_nonfinite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+       return any(has_nonfinite(item) for item in value)
+    return False
+
+class ResponseEncoder:
+    # constructor, name- 'orjson' or 'json', orjson if it is installed by default.
+    # timestamps- whether the orders and dishes are written with their timestamps.
+    def __init__(self, name=None, timestamps=False):
+        if name is None:
+           name = "orjson" if orjson is not None else "json"
+        if name not in ENCODERS:
+           raise ValueError(f"the JSON encoder must be one of {', '.join(ENCODERS)}")
+        if name == "orjson" and orjson is None:
+           raise ValueError("orjson is not installed")
+        self.name = name
+        self.timestamps = timestamps
+        self.__dumps = self.__orjson_dumps if name == "orjson" else self.__json_dumps
+
+    # Encodes a value as JSON text, exactly as jsonify does (without its final newline): compact,
+    # or indented by indent spaces. Orders and dishes are written directly when they are the value,
+    # values of a dict or items of a list; elsewhere (and indented) they are written from to_dict.
+    def encode(self, value, indent=None):
+        if indent is not None:
+           return json.dumps(value, indent=indent, sort_keys=True, ensure_ascii=True, default=self.__to_plain)
+        return self.__encode(value)
+
+    def __encode(self, value):
+        if isinstance(value, MODELS):
+           return value.to_json(self.timestamps)
+        if type(value) is list and any(isinstance(item, MODELS) for item in value):
+           return "[" + ",".join(self.__encode(item) for item in value) + "]"
+        if type(value) is dict and all(type(key) is str for key in value) and any(
+                isinstance(item, MODELS) or type(item) is list and item and isinstance(item[0], MODELS)
+                for item in value.values()):
+           return "{" + ",".join(f"{json.encoder.encode_basestring_ascii(key)}:{self.__encode(value[key])}"
+                                 for key in sorted(value)) + "}"
+        return self.__dumps(value)
+
+    # Returns a value with its orders and dishes turned into dicts, for json.dumps.
+    def __to_plain(self, value):
+        if isinstance(value, MODELS):
+           return value.to_dict(self.timestamps)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def __json_dumps(self, value):
+        return json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=True, default=self.__to_plain)
+
+    # Encodes with orjson, or with json when orjson would write the value differently
+    # (or cannot write it: non-string keys, ints beyond 64 bits, other types).
+    def __orjson_dumps(self, value):
+        try:
+            data = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return self.__json_dumps(value)
+        if DIFFERENT_FLOAT.search(data) or b"null" in data and has_nonfinite(value):
+           return self.__json_dumps(value)
+        text = data.decode()
+        return text if text.isascii() and "\x7f" not in text else UNESCAPED.sub(escape_char, text)
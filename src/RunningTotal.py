@@ -0,0 +1,37 @@
+## RunningTotal.py
+## A sum of prices that can be updated one value at a time without accumulating rounding errors.
+## Keeps the exact sum as non-overlapping float partials (like math.fsum), so after any sequence
+## of additions and subtractions its value equals math.fsum of the values currently in it.
+
+import math
+
+class RunningTotal:
+    __slots__ = ("__partials",)
+
+    # constructor- starts at 0.
+    def __init__(self):
+        self.__partials = []
+
+    # Adds a value to the total.
+    def add(self, value):
+        partials = self.__partials
+        i = 0
+        for partial in partials:
+            if abs(value) < abs(partial):
+               value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+               partials[i] = low
+               i += 1
+            value = high
+        partials[i:] = [value] if value else []
+
+    # Subtracts a value from the total.
+    def subtract(self, value):
+        self.add(-value)
+
+    # Returns the total, correctly rounded. An empty total is 0.
+    @property
+    def value(self):
+        return math.fsum(self.__partials) if self.__partials else 0
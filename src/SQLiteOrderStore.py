@@ -0,0 +1,242 @@
+## SQLiteOrderStore.py
+## Keeps the orders in an SQLite database, so they outlive the process and are queried
+## without loading them all into memory. Orders are read into Order objects on lookup and
+## written back by OrderManager after every change; the status queries and totals run in SQL.
+
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+from .Dish import Dish
+from .Order import Order
+from .OrderStore import OrderStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    customer_name TEXT NOT NULL,
+    table_number INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    total_price REAL NOT NULL,
+    opened_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS orders_active_table ON orders (table_number, id) WHERE status != 'Done';
+CREATE INDEX IF NOT EXISTS orders_customer_name ON orders (customer_name, id);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, id);
+CREATE TABLE IF NOT EXISTS dishes (
+    order_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    status TEXT NOT NULL,
+    pending_since REAL,
+    PRIMARY KEY (order_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS dishes_status ON dishes (status, order_id, position);
+CREATE TABLE IF NOT EXISTS counters (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    created_orders_num INTEGER NOT NULL,
+    stored_orders_num INTEGER NOT NULL,
+    active_orders_num INTEGER NOT NULL
+);
+"""
+
+# The statements are kept as constants, so every pooled connection prepares each one once
+# and reuses it from its statement cache.
+INSERT_ORDER = ("INSERT INTO orders (id, customer_name, table_number, status, total_price, opened_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)")
+UPDATE_ORDER = "UPDATE orders SET customer_name = ?, status = ?, total_price = ? WHERE id = ?"
+DELETE_ORDER = "DELETE FROM orders WHERE id = ?"
+INSERT_DISH = ("INSERT INTO dishes (order_id, position, name, quantity, unit_price, status, pending_since) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+UPSERT_DISH = ("INSERT INTO dishes (order_id, position, name, quantity, unit_price, status, pending_since) "
+               "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM dishes WHERE order_id = ?), ?, ?, ?, ?, ?) "
+               "ON CONFLICT (order_id, name) DO UPDATE SET quantity = excluded.quantity, "
+               "unit_price = excluded.unit_price, status = excluded.status, pending_since = excluded.pending_since")
+DELETE_DISH = "DELETE FROM dishes WHERE order_id = ? AND name = ?"
+DELETE_DISHES = "DELETE FROM dishes WHERE order_id = ?"
+ORDER_COLUMNS = "id, customer_name, table_number, status, opened_at"
+SELECT_BY_ID = f"SELECT {ORDER_COLUMNS} FROM orders WHERE id = ?"
+SELECT_ACTIVE_BY_TABLE = (f"SELECT {ORDER_COLUMNS} FROM orders "
+                          "WHERE table_number = ? AND status != 'Done' ORDER BY id LIMIT 1")
+SELECT_BY_CUSTOMER = f"SELECT {ORDER_COLUMNS} FROM orders WHERE customer_name = ? ORDER BY id LIMIT 1"
+SELECT_ORDERS_PAGE = f"SELECT {ORDER_COLUMNS} FROM orders WHERE id > ? ORDER BY id LIMIT ?"
+DISH_COLUMNS = "order_id, name, quantity, unit_price, status, pending_since"
+SELECT_ORDER_DISHES = f"SELECT {DISH_COLUMNS} FROM dishes WHERE order_id = ? ORDER BY position"
+SELECT_DISHES = f"SELECT {DISH_COLUMNS} FROM dishes ORDER BY order_id, position"
+SELECT_DISHES_BETWEEN = (f"SELECT {DISH_COLUMNS} FROM dishes WHERE order_id > ? AND order_id <= ? "
+                         "ORDER BY order_id, position")
+SELECT_DISHES_BY_STATUS = f"SELECT {DISH_COLUMNS} FROM dishes WHERE status = ? ORDER BY order_id, position"
+SELECT_TABLES_BY_STATUS = "SELECT table_number FROM orders WHERE status = ? ORDER BY id"
+SELECT_TOTAL = "SELECT SUM(total_price) FROM orders"
+SELECT_TOTAL_BY_STATUS = "SELECT SUM(total_price) FROM orders WHERE status = ?"
+SELECT_COUNTERS = "SELECT created_orders_num, stored_orders_num, active_orders_num FROM counters WHERE id = 1"
+SAVE_COUNTERS = ("INSERT OR REPLACE INTO counters (id, created_orders_num, stored_orders_num, active_orders_num) "
+                 "VALUES (1, ?, ?, ?)")
+
+
+class SQLiteOrderStore(OrderStore):
+    # constructor, opens a pool of connections to the database file (created if missing).
+    # An in-memory database (":memory:") is private to a connection, so it gets a pool of one.
+    # pool_timeout- seconds to wait for a free connection before raising TimeoutError (a 503 in the app).
+    # page_size- the orders read per query by orders(), which holds a connection only while reading a page.
+    def __init__(self, path, pool_size=4, pool_timeout=10, page_size=500):
+        self.path = path
+        self.pool_timeout = pool_timeout
+        self.page_size = page_size
+        self.durable = path != ":memory:"
+        self.__pool = queue.LifoQueue()
+        for _ in range(1 if path == ":memory:" else pool_size):
+            self.__pool.put(self.__connect())
+        with self.__connection() as connection:
+            connection.executescript(SCHEMA)
+            # Databases from before the orders had an opening time get the column, at 0 (unknown),
+            # and from before the dishes had a pending time, the column at NULL (Pending from when they are read).
+            if "opened_at" not in {column[1] for column in connection.execute("PRAGMA table_info(orders)")}:
+               connection.execute("ALTER TABLE orders ADD COLUMN opened_at REAL NOT NULL DEFAULT 0")
+            if "pending_since" not in {column[1] for column in connection.execute("PRAGMA table_info(dishes)")}:
+               connection.execute("ALTER TABLE dishes ADD COLUMN pending_since REAL")
+
+    # Opens a connection that can be used from any thread (one thread at a time, through the pool).
+    def __connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=64)
+        if self.path != ":memory:":
+           connection.execute("PRAGMA journal_mode = WAL")
+           connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    # Borrows a connection from the pool for the duration of a with block.
+    @contextmanager
+    def __connection(self):
+        try:
+            connection = self.__pool.get(timeout=self.pool_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no database connection was free within {self.pool_timeout} seconds") from None
+        try:
+            yield connection
+        finally:
+            self.__pool.put(connection)
+
+    # Closes all the pooled connections.
+    def close(self):
+        while not self.__pool.empty():
+            self.__pool.get().close()
+
+    def add(self, order):
+        with self.__connection() as connection, connection:
+            connection.execute(INSERT_ORDER, (order.id, order.customer_name, order.table_number,
+                                              order.status, order.get_total_price(), order.opened_at))
+            connection.executemany(INSERT_DISH, [(order.id, position, dish.name, dish.quantity, dish.unit_price, dish.status,
+                                                  dish.pending_since)
+                                                 for position, dish in enumerate(order.dishes)])
+
+    # Stores the orders in one transaction.
+    def add_many(self, orders):
+        with self.__connection() as connection, connection:
+            connection.executemany(INSERT_ORDER, [(order.id, order.customer_name, order.table_number, order.status,
+                                                   order.get_total_price(), order.opened_at) for order in orders])
+            connection.executemany(INSERT_DISH, [(order.id, position, dish.name, dish.quantity, dish.unit_price, dish.status,
+                                                  dish.pending_since)
+                                                 for order in orders for position, dish in enumerate(order.dishes)])
+
+    def remove(self, order):
+        with self.__connection() as connection, connection:
+            connection.execute(DELETE_DISHES, (order.id,))
+            connection.execute(DELETE_ORDER, (order.id,))
+
+    # Updates the order row, and the row of the dish that changed, if any.
+    def save(self, order, dish_name=None):
+        with self.__connection() as connection, connection:
+            connection.execute(UPDATE_ORDER, (order.customer_name, order.status, order.get_total_price(), order.id))
+            if dish_name is None:
+               return
+            if order.is_dish_exists_in_order(dish_name):
+               dish = order.find_dish_by_name(dish_name)
+               connection.execute(UPSERT_DISH, (order.id, order.id, dish.name, dish.quantity, dish.unit_price, dish.status,
+                                                 dish.pending_since))
+            else:
+               connection.execute(DELETE_DISH, (order.id, dish_name))
+
+    # Reads a single order and its dishes, or returns None.
+    def __get_order(self, query, value):
+        with self.__connection() as connection:
+            row = connection.execute(query, (value,)).fetchone()
+            if row is None:
+               return None
+            return self.__build_order(row, connection.execute(SELECT_ORDER_DISHES, (row[0],)))
+
+    # Builds an Order from its row and the rows of its dishes.
+    @staticmethod
+    def __build_order(row, dish_rows):
+        order_id, customer_name, table_number, status, opened_at = row
+        return Order.from_dict({
+            "id": order_id,
+            "customer_name": customer_name,
+            "table_number": table_number,
+            "status": status,
+            "opened_at": opened_at,
+            "dishes": [{"name": name, "quantity": quantity, "unit price": unit_price, "status": dish_status,
+                        "pending since": pending_since}
+                       for _, name, quantity, unit_price, dish_status, pending_since in dish_rows],
+        })
+
+    def get_by_id(self, order_id):
+        return self.__get_order(SELECT_BY_ID, order_id)
+
+    def get_active_by_table(self, table_number):
+        return self.__get_order(SELECT_ACTIVE_BY_TABLE, table_number)
+
+    def get_by_customer(self, customer_name):
+        return self.__get_order(SELECT_BY_CUSTOMER, customer_name)
+
+    # Reads the orders page by page (page_size orders after the last one read), each page and its dishes
+    # with two ordered queries merged by order id. The connection goes back to the pool between pages,
+    # so a slow reader (e.g. a streamed response) does not hold it.
+    def orders(self, after_id=0):
+        while True:
+            with self.__connection() as connection:
+                rows = connection.execute(SELECT_ORDERS_PAGE, (after_id, self.page_size)).fetchall()
+                if not rows:
+                   return
+                dish_rows = connection.execute(SELECT_DISHES_BETWEEN, (after_id, rows[-1][0])).fetchall()
+            dishes = {}
+            for dish_row in dish_rows:
+                dishes.setdefault(dish_row[0], []).append(dish_row)
+            for row in rows:
+                yield self.__build_order(row, dishes.get(row[0], ()))
+            if len(rows) < self.page_size:
+               return
+            after_id = rows[-1][0]
+
+    def table_numbers_by_status(self, status):
+        with self.__connection() as connection:
+            return [table_number for (table_number,) in connection.execute(SELECT_TABLES_BY_STATUS, (status,))]
+
+    def dishes_by_status(self, status):
+        if status not in {"Pending", "Served", "All"}:
+           raise ValueError("status must be 'Pending' or 'Served' or 'All'")
+        with self.__connection() as connection:
+            if status == "All":
+               rows = connection.execute(SELECT_DISHES)
+            else:
+               rows = connection.execute(SELECT_DISHES_BY_STATUS, (status,))
+            return [Dish.from_dict({"name": name, "quantity": quantity, "unit price": unit_price, "status": dish_status,
+                                    "pending since": pending_since})
+                    for _, name, quantity, unit_price, dish_status, pending_since in rows]
+
+    def total_price_by_status(self, status):
+        with self.__connection() as connection:
+            if status == "All":
+               (total,) = connection.execute(SELECT_TOTAL).fetchone()
+            else:
+               (total,) = connection.execute(SELECT_TOTAL_BY_STATUS, (status,)).fetchone()
+        return total if total else 0
+
+    def load_counters(self):
+        with self.__connection() as connection:
+            return connection.execute(SELECT_COUNTERS).fetchone()
+
+    def save_counters(self, created_orders_num, stored_orders_num, active_orders_num):
+        with self.__connection() as connection, connection:
+            connection.execute(SAVE_COUNTERS, (created_orders_num, stored_orders_num, active_orders_num))
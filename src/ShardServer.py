@@ -0,0 +1,254 @@
+## ShardServer.py
+## Serves the orders of one table shard over a Unix socket, so several web worker processes share
+## one restaurant: each shard process owns an OrderManager for the tables t with (t - 1) % shards_num
+## equal to its index, and the workers route every call to the owning shard (see ShardedOrderManager).
+## Start all the shards with: python -m src.ShardServer --shards 4 --socket-dir /run/orders
+## then the web workers with ORDERS_SHARD_SOCKETS=/run/orders/shard-0.sock,...,/run/orders/shard-3.sock
+## Both need the same secret ORDERS_SHARD_AUTHKEY: the shards accept pickled requests, so a worker must
+## authenticate, and the socket directory must be private to the user running them (see secure_socket_dir).
+
+import argparse
+import multiprocessing
+import os
+import signal
+import stat
+import sys
+import threading
+from multiprocessing.connection import Listener
+
+from .Dish import Dish
+from .Menu import Menu
+from .Order import Order
+from .OrderArchive import OrderArchive
+from .OrderJournal import OrderJournal
+from .OrderManager import OrderManager, BatchError
+from .SQLiteOrderStore import SQLiteOrderStore
+
+# The errors sent back to the workers as they are; any other error is sent as a RuntimeError.
+REMOTE_ERRORS = {error.__name__: error for error in (ValueError, TypeError, KeyError, LookupError, RuntimeError, TimeoutError)}
+
+
+# Returns the index of the shard owning a table number or an order id (given as an int or a numeric
+# string). Invalid values go to shard 0, whose manager rejects them with the usual error.
+def shard_index(number, shards_num):
+    try:
+        number = int(number)
+    except (TypeError, ValueError):
+        return 0
+    return (number - 1) % shards_num if number > 0 else 0
+
+
+# Returns the socket paths of the shards served from a directory.
+def socket_paths(socket_dir, shards_num):
+    return [os.path.join(socket_dir, f"shard-{index}.sock") for index in range(shards_num)]
+
+
+# Creates the socket directory private to the current user, or makes an existing one private
+# (os.makedirs does not change the mode of an existing directory). Raises ValueError if it is not
+# a directory of the current user.
+def secure_socket_dir(socket_dir):
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    info = os.lstat(socket_dir)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+       raise ValueError(f"{socket_dir} is not a directory of the current user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+       os.chmod(socket_dir, 0o700)
+
+
+# Returns (error type name, message, extra) describing an error to send back.
+# A BatchError carries the type and message of the failed operation's error, and the results.
+def describe_error(error):
+    if isinstance(error, BatchError):
+       return ("BatchError", str(error), (type(error.error).__name__, str(error.error), error.results))
+    name = type(error).__name__
+    return (name if name in REMOTE_ERRORS else "RuntimeError", str(error), None)
+
+
+# Rebuilds an error sent back by describe_error.
+def rebuild_error(name, message, extra):
+    if name == "BatchError":
+       cause_name, cause_message, results = extra
+       error = BatchError(REMOTE_ERRORS.get(cause_name, RuntimeError)(cause_message), results)
+       error.args = (message,)
+       return error
+    return REMOTE_ERRORS.get(name, RuntimeError)(message)
+
+
+class ShardServer:
+    # constructor, manager- the OrderManager of the shard's tables.
+    # Requests are (operation, args, kwargs) tuples, answered with ("ok", result) or ("error", name, message, extra);
+    # the results are plain data (orders and dishes as dicts). Every connection is served by its own thread.
+    # authkey- the secret the workers must prove they know before any request is unpickled.
+    def __init__(self, manager, address, authkey):
+        if not authkey:
+           raise ValueError("a shard server requires an authkey")
+        self.manager = manager
+        self.address = address
+        self.authkey = authkey
+        # The versions start over when the shard restarts, so they are sent with a random epoch of the process:
+        # a version read before the restart never matches one read after it.
+        self.epoch = os.urandom(4).hex()
+        # The manager methods whose results are sent as they are.
+        self.__operations = {name: getattr(manager, name) for name in (
+            "get_order_price", "get_order_status", "get_customer_name", "change_customer_name",
+            "get_dish_unit_price", "get_dish_status", "remove_order", "close_order",
+            "remove_dish_from_order", "update_dish_quantity", "update_dish_status", "apply_batch",
+            "total_orders_price_by_status", "verify_totals", "summary_page", "import_orders",
+            "next_pending_dishes", "get_tables")}
+        self.__operations.update({
+            "add_order": self.__add_order,
+            "add_dish_to_order": self.__add_dish_to_order,
+            "find_order": self.__find_order,
+            "get_table_dishes_by_status": self.__get_table_dishes_by_status,
+            "table_numbers_by_status": self.__table_numbers_by_status,
+            "dishes_by_status": self.__dishes_by_status,
+            "search_orders": self.__search_orders,
+            "counters": self.__counters,
+            "table_version": self.__table_version,
+        })
+
+    # Adds an order, returns its id.
+    def __add_order(self, customer_name, table_number, opened_at=None):
+        order = Order(customer_name, table_number)
+        if opened_at is not None:
+           order.opened_at = opened_at
+        self.manager.add_order(order)
+        return order.id
+
+    def __add_dish_to_order(self, table_number, name, quantity, unit_price):
+        self.manager.add_dish_to_order(table_number, Dish(name, quantity, unit_price))
+
+    def __find_order(self, identifier_type, identifier_value):
+        return self.manager.find_order(identifier_type, identifier_value).to_dict(timestamps=True)
+
+    def __search_orders(self, name, limit):
+        return [order.to_dict(timestamps=True) for order in self.manager.search_orders(name, limit)]
+
+    def __get_table_dishes_by_status(self, table_number, status):
+        return [dish.to_dict(timestamps=True) for dish in self.manager.get_table_dishes_by_status(table_number, status)]
+
+    # Returns the (order id, table number) pairs of the orders with the status, ordered by id,
+    # so the worker can merge the shards in order id order.
+    def __table_numbers_by_status(self, status):
+        self.manager.check_valid_status(status)
+        if status == "All":
+           raise ValueError("status cannot be 'All'")
+        return [(order.id, order.table_number) for order in self.manager.iter_orders(status=status)]
+
+    # Returns the (order id, dish dict) pairs of the live orders' dishes with the status, ordered by order id,
+    # from a snapshot of the shard.
+    def __dishes_by_status(self, status):
+        self.manager.check_valid_status(status)
+        if status not in {"Pending", "Served", "All"}:
+           raise ValueError("status must be 'Pending' or 'Served' or 'All'")
+        return [(order.id, dish.to_dict(timestamps=True)) for order in self.manager.snapshot().live_orders
+                for dish in order.get_dishes_by_status(status)]
+
+    # Returns the (created, stored, active) orders counters, the manager version and the epoch.
+    def __counters(self):
+        manager = self.manager
+        return (manager.created_orders_num, manager.stored_orders_num, manager.active_orders_num, manager.version,
+                self.epoch)
+
+    # Returns the version of a table, prefixed with the epoch.
+    def __table_version(self, table_number):
+        return f"{self.epoch}.{self.manager.table_version(table_number)}"
+
+    # Runs one request, returns its response.
+    def handle(self, request):
+        operation, args, kwargs = request
+        try:
+            function = self.__operations.get(operation)
+            if function is None:
+               raise ValueError(f"unknown operation '{operation}'")
+            return ("ok", function(*args, **kwargs))
+        except Exception as e:
+            return ("error",) + describe_error(e)
+
+    # Answers the requests of a connection until the worker closes it.
+    def __serve_connection(self, connection):
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    return
+                connection.send(self.handle(request))
+
+    # Accepts connections until the process is stopped.
+    def serve_forever(self):
+        if os.path.exists(self.address):
+           os.remove(self.address)
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception:
+                    continue   # a worker that failed the handshake.
+                threading.Thread(target=self.__serve_connection, args=(connection,), daemon=True).start()
+
+
+# Runs the server of one shard (in its own process), with its own journal directory,
+# SQLite database and archive when they are configured, and the menu of all the shards.
+def serve_shard(index, shards_num, socket_dir, authkey, journal_dir=None, db_path=None, archive_after=None,
+                menu_path=None):
+    secure_socket_dir(socket_dir)
+    journal = OrderJournal(os.path.join(journal_dir, f"shard-{index}")) if journal_dir else None
+    store = SQLiteOrderStore(f"{db_path}.shard-{index}") if db_path else None
+    archive = OrderArchive() if archive_after is not None else None
+    menu = Menu.load(menu_path) if menu_path else None
+    manager = OrderManager(journal=journal, store=store, archive=archive, archive_after=archive_after or 0,
+                           id_offset=index, id_stride=shards_num, menu=menu)
+    # Stopped by the launcher: sync the journal on the way out.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        ShardServer(manager, socket_paths(socket_dir, shards_num)[index], authkey).serve_forever()
+    finally:
+        if journal is not None:
+           journal.close()
+
+
+# Starts the shard processes and waits for them; stopping the launcher stops them.
+def main():
+    parser = argparse.ArgumentParser(description="serve the orders of table shards over Unix sockets")
+    parser.add_argument("--shards", type=int, default=os.cpu_count())
+    parser.add_argument("--socket-dir", required=True, help="directory of the shard-<i>.sock sockets")
+    parser.add_argument("--journal-dir", default=os.environ.get("ORDERS_JOURNAL_DIR"),
+                        help="journal directory, with a shard-<i> subdirectory per shard")
+    parser.add_argument("--db-path", default=os.environ.get("ORDERS_DB_PATH"),
+                        help="SQLite database path, suffixed with .shard-<i> per shard")
+    parser.add_argument("--archive-after", type=int, default=os.environ.get("ORDERS_ARCHIVE_AFTER"))
+    parser.add_argument("--menu-path", default=os.environ.get("ORDERS_MENU_PATH"), help="menu JSON file")
+    args = parser.parse_args()
+    if args.journal_dir and args.db_path:
+       parser.error("--journal-dir cannot be used with --db-path: the databases already keep the orders across restarts")
+    if args.archive_after is not None and args.db_path:
+       parser.error("--archive-after cannot be used with --db-path: the archived orders would not survive a restart")
+    authkey = os.environ.get("ORDERS_SHARD_AUTHKEY")
+    if not authkey:
+       parser.error("ORDERS_SHARD_AUTHKEY must be set, to the same secret as for the web workers")
+
+    # The sockets accept pickled requests, so only the owner may connect.
+    try:
+        secure_socket_dir(args.socket_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    processes = [multiprocessing.Process(target=serve_shard, daemon=True,
+                                         args=(index, args.shards, args.socket_dir, authkey.encode(),
+                                               args.journal_dir, args.db_path, args.archive_after, args.menu_path))
+                 for index in range(args.shards)]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
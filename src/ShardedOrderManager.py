@@ -0,0 +1,268 @@
+## ShardedOrderManager.py
+## The OrderManager of a web worker in the multi-process deployment: the orders live in table shard
+## processes (see ShardServer), every call about a table or an order id is sent to the shard owning it,
+## and the calls about all the orders gather the shards: counters and totals are added up,
+## table numbers, dishes and orders are merged in order id order.
+
+import heapq
+import itertools
+import math
+import os
+import queue
+from multiprocessing.connection import Client
+
+from .Dish import Dish
+from .Order import Order
+from .OrderManager import OrderManager, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, IMPORT_CHUNK_SIZE, DEFAULT_KITCHEN_LIMIT
+from .ShardServer import shard_index, rebuild_error
+
+class ShardedOrderManager:
+    # constructor, addresses- the socket paths of the shards, in shard index order.
+    # authkey- the secret of the shard servers (ORDERS_SHARD_AUTHKEY), required.
+    # Connections are opened on first use and pooled per shard, and reopened in a forked process.
+    def __init__(self, addresses, authkey):
+        if not authkey:
+           raise ValueError("the shard servers require an authkey")
+        self.addresses = list(addresses)
+        self.authkey = authkey
+        self.debug = False
+        self.__pid = os.getpid()
+        self.__pools = [queue.LifoQueue() for _ in self.addresses]
+
+    # Sends an operation to a shard and returns its result, or raises its error.
+    def __call(self, index, operation, *args, **kwargs):
+        if self.__pid != os.getpid():
+           self.__pid, self.__pools = os.getpid(), [queue.LifoQueue() for _ in self.addresses]
+        pool = self.__pools[index]
+        try:
+            connection = pool.get_nowait()
+        except queue.Empty:
+            connection = Client(self.addresses[index], family="AF_UNIX", authkey=self.authkey)
+        try:
+            connection.send((operation, args, kwargs))
+            response = connection.recv()
+        except BaseException:
+            connection.close()
+            raise
+        pool.put(connection)
+        if response[0] == "error":
+           raise rebuild_error(*response[1:])
+        return response[1]
+
+    # Sends an operation to the shard owning the table (or the order id).
+    def __call_owner(self, number, operation, *args, **kwargs):
+        return self.__call(shard_index(number, len(self.addresses)), operation, *args, **kwargs)
+
+    # Sends an operation to every shard, returns their results in shard order.
+    def __call_all(self, operation, *args, **kwargs):
+        return [self.__call(index, operation, *args, **kwargs) for index in range(len(self.addresses))]
+
+    # Returns the counters and versions of all the shards added up, and the version of all the shards:
+    # their epochs (which change when a shard restarts) and the sum of their versions.
+    def __counters(self):
+        counters = self.__call_all("counters")
+        totals = [sum(values) for values in zip(*(shard_counters[:4] for shard_counters in counters))]
+        return totals[:3] + [f"{'.'.join(shard_counters[4] for shard_counters in counters)}.{totals[3]}"]
+
+    @property
+    def created_orders_num(self):
+        return self.__counters()[0]
+
+    @property
+    def stored_orders_num(self):
+        return self.__counters()[1]
+
+    @property
+    def active_orders_num(self):
+        return self.__counters()[2]
+
+    # The epochs of the shards and the sum of their versions, which grows with every change in any shard
+    # (a string, see __counters).
+    @property
+    def version(self):
+        return self.__counters()[3]
+
+    # The version of the table in its shard, prefixed with the shard's epoch.
+    def table_version(self, table_number):
+        return self.__call_owner(table_number, "table_version", table_number)
+
+    @property
+    def orders(self):
+        return list(self.iter_orders())
+
+    def get_order_price(self, table_number):
+        return self.__call_owner(table_number, "get_order_price", table_number)
+
+    def get_order_status(self, table_number):
+        return self.__call_owner(table_number, "get_order_status", table_number)
+
+    def get_customer_name(self, table_number):
+        return self.__call_owner(table_number, "get_customer_name", table_number)
+
+    def change_customer_name(self, table_number, name):
+        self.__call_owner(table_number, "change_customer_name", table_number, name)
+
+    def get_dish_unit_price(self, table_number, dish_name):
+        return self.__call_owner(table_number, "get_dish_unit_price", table_number, dish_name)
+
+    def get_dish_status(self, table_number, dish_name):
+        return self.__call_owner(table_number, "get_dish_status", table_number, dish_name)
+
+    # Finds an order by table number or id in its shard; by customer name, the oldest one of all the shards.
+    def find_order(self, identifier_type, identifier_value):
+        if isinstance(identifier_type, str) and identifier_type.lower().strip() == "customer_name":
+           orders = []
+           for index in range(len(self.addresses)):
+               try:
+                   orders.append(self.__call(index, "find_order", identifier_type, identifier_value))
+               except LookupError:
+                   pass
+           if not orders:
+              raise LookupError("Order is not found")
+           return Order.from_dict(min(orders, key=lambda order: order["id"]))
+        return Order.from_dict(self.__call_owner(identifier_value, "find_order", identifier_type, identifier_value))
+
+    def add_order(self, order):
+        order.id = self.__call_owner(order.table_number, "add_order", order.customer_name, order.table_number,
+                                     order.opened_at)
+
+    def remove_order(self, identifier_type, identifier_value):
+        if isinstance(identifier_type, str) and identifier_type.lower().strip() == "customer_name":
+           order = self.find_order(identifier_type, identifier_value)
+           identifier_type, identifier_value = "id", order.id
+        self.__call_owner(identifier_value, "remove_order", identifier_type, identifier_value)
+
+    def close_order(self, table_number):
+        return self.__call_owner(table_number, "close_order", table_number)
+
+    def add_dish_to_order(self, table_number, dish: Dish):
+        self.__call_owner(table_number, "add_dish_to_order", table_number, dish.name, dish.quantity, dish.unit_price)
+
+    def remove_dish_from_order(self, table_number, dish_name):
+        self.__call_owner(table_number, "remove_dish_from_order", table_number, dish_name)
+
+    def update_dish_quantity(self, table_number, dish_name, new_quantity):
+        self.__call_owner(table_number, "update_dish_quantity", table_number, dish_name, new_quantity)
+
+    def update_dish_status(self, table_number, dish_name, status):
+        self.__call_owner(table_number, "update_dish_status", table_number, dish_name, status)
+
+    # Applies a batch in the shard owning its tables. A batch over the tables of several shards
+    # is rejected: it could not be applied all or nothing.
+    def apply_batch(self, operations):
+        if not isinstance(operations, list):
+           raise TypeError("operations must be a list")
+        shards = {shard_index(operation.get("table_number"), len(self.addresses)) if isinstance(operation, dict) else 0
+                  for operation in operations}
+        if len(shards) > 1:
+           raise ValueError("a batch cannot change tables of different shards")
+        return self.__call(shards.pop() if shards else 0, "apply_batch", operations)
+
+    # Imports orders in bulk (see OrderManager.import_orders): every chunk of records is split by the
+    # shard owning their tables, and each shard imports its part. Errors tell the record number in the shard's part.
+    def import_orders(self, records):
+        records = iter(records)
+        imported_num = 0
+        while True:
+            chunk = list(itertools.islice(records, IMPORT_CHUNK_SIZE))
+            if not chunk:
+               return imported_num
+            parts = {}
+            for record in chunk:
+                table_number = record.get("table_number") if isinstance(record, dict) else None
+                parts.setdefault(shard_index(table_number, len(self.addresses)), []).append(record)
+            for index, part in parts.items():
+                imported_num += self.__call(index, "import_orders", part)
+
+    def get_table_numbers_by_order_status(self, status):
+        pairs = self.__call_all("table_numbers_by_status", status)
+        return [table_number for _, table_number in heapq.merge(*pairs)]
+
+    # Adds up the shard totals (each exact, their sum rounded once more).
+    def total_orders_price_by_status(self, status):
+        totals = self.__call_all("total_orders_price_by_status", status)
+        return math.fsum(totals) if any(totals) else 0
+
+    def verify_totals(self):
+        self.__call_all("verify_totals")
+
+    def get_table_dishes_by_status(self, table_number, status):
+        return [Dish.from_dict(data) for data in self.__call_owner(table_number, "get_table_dishes_by_status",
+                                                                  table_number, status)]
+
+    def get_all_dishes_by_status(self, status):
+        pairs = self.__call_all("dishes_by_status", status)
+        return [Dish.from_dict(data) for _, data in heapq.merge(*pairs, key=lambda pair: pair[0])]
+
+    # Returns the snapshots of the orders at tables (see OrderManager.get_tables), one request per shard.
+    def get_tables(self, table_numbers, fields=None):
+        table_numbers = OrderManager.check_table_numbers(table_numbers)
+        fields = OrderManager.check_table_fields(fields)
+        shards_tables = {}
+        for table_number in table_numbers:
+            shards_tables.setdefault(shard_index(table_number, len(self.addresses)), []).append(table_number)
+        snapshots, not_found = {}, set()
+        for index, shard_tables in shards_tables.items():
+            tables = self.__call(index, "get_tables", shard_tables, fields)
+            snapshots.update((snapshot["table_number"], snapshot) for snapshot in tables["orders"])
+            not_found.update(tables["not_found"])
+        return {"orders": [snapshots[table_number] for table_number in table_numbers if table_number in snapshots],
+                "not_found": [table_number for table_number in table_numbers if table_number in not_found]}
+
+    # Merges the orders of every shard whose customer name starts with name (see OrderManager.search_orders):
+    # the limit first of all, by case folded customer name then id.
+    def search_orders(self, name, limit=DEFAULT_PAGE_SIZE):
+        orders = heapq.merge(*self.__call_all("search_orders", name, limit),
+                             key=lambda data: (data["customer_name"].casefold(), data["id"]))
+        return [Order.from_dict(data) for data in itertools.islice(orders, int(limit))]
+
+    # Merges the oldest pending dishes of every shard: the limit oldest of all.
+    def next_pending_dishes(self, limit=DEFAULT_KITCHEN_LIMIT):
+        dishes = heapq.merge(*self.__call_all("next_pending_dishes", limit),
+                             key=lambda data: data["dish"]["pending since"])
+        return list(itertools.islice(dishes, int(limit)))
+
+    # Iterates over the orders of all the shards matching the filters, ordered by id (see OrderManager.iter_orders).
+    # The first page of every shard is read right away, so invalid filters raise here.
+    def iter_orders(self, after_id=0, **filters):
+        pages = self.__call_all("summary_page", MAX_PAGE_SIZE, after_id, **filters)
+        return heapq.merge(*(self.__shard_orders(index, page, filters) for index, page in enumerate(pages)),
+                           key=lambda order: order.id)
+
+    # Iterates over the orders of a shard from its first page, reading the next pages as needed.
+    def __shard_orders(self, index, page, filters):
+        while True:
+            for data in page["orders"]:
+                yield Order.from_dict(data)
+            if page["next_cursor"] is None:
+               return
+            page = self.__call(index, "summary_page", MAX_PAGE_SIZE, page["next_cursor"], **filters)
+
+    # Merges the same page of every shard: the first limit orders of the union after the cursor.
+    def summary_page(self, limit=DEFAULT_PAGE_SIZE, cursor=None, **filters):
+        pages = self.__call_all("summary_page", limit, cursor, **filters)
+        limit = int(limit)
+        orders = list(heapq.merge(*(page["orders"] for page in pages), key=lambda order: order["id"]))
+        more = len(orders) > limit or any(page["next_cursor"] is not None for page in pages)
+        return {
+        "created_orders_num": sum(page["created_orders_num"] for page in pages),
+        "stored_orders_num": sum(page["stored_orders_num"] for page in pages),
+        "active_orders_num": sum(page["active_orders_num"] for page in pages),
+        "orders": orders[:limit],
+        "next_cursor": orders[limit - 1]["id"] if more else None
+        }
+
+    # Returns the counters and all the orders, as Order objects (see to_dict for their dicts).
+    def summary(self):
+        created_orders_num, stored_orders_num, active_orders_num, _ = self.__counters()
+        return {
+        "created_orders_num": created_orders_num,
+        "stored_orders_num": stored_orders_num,
+        "active_orders_num": active_orders_num,
+        "orders": list(self.iter_orders())
+        }
+
+    def to_dict(self, timestamps=False):
+        data = self.summary()
+        data["orders"] = [order.to_dict(timestamps) for order in data["orders"]]
+        return data
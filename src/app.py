@@ -1,8 +1,27 @@
 ## app.py
-from flask import Flask, request, jsonify
-from .OrderManager import OrderManager
+import atexit
+import functools
+import io
+import os
+import threading
+import time
+
+from flask import Flask, Response, g, request, make_response
+from .OrderManager import OrderManager, BatchError, DEFAULT_PAGE_SIZE, DEFAULT_KITCHEN_LIMIT
+from .OrderJournal import OrderJournal
+from .SQLiteOrderStore import SQLiteOrderStore
+from .OrderArchive import OrderArchive
+from .Metrics import Metrics
+from .ShardedOrderManager import ShardedOrderManager
+from .EventBuffer import EventBuffer
+from .ChangeLog import ChangeLog
+from .Menu import Menu
+from .OrderTransfer import read_ndjson
+from .OrderAnalytics import OrderAnalytics, ANALYTICS_AVAILABLE, DEFAULT_PERCENTILES
 from .Order import Order
 from .Dish import Dish
+from .OrderView import OrderView
+from .ResponseEncoder import ResponseEncoder
 
 # Mapping error types to appropriate HTTP status codes.
 ERROR_HTTP_CODES = {
@@ -10,43 +29,156 @@ ERROR_HTTP_CODES = {
     KeyError: 404,  # Missing key (e.g., non-existent order ID)
     LookupError: 404,  # Order or dish not found
     TypeError: 400,  # Incorrect data type
+    TimeoutError: 503,  # The store is busy (no database connection was free in time)
     Exception: 500,  # Unexpected general error
 }
 
+# The JSON responses are encoded by orjson when it is installed, or as chosen by ORDERS_JSON_ENCODER
+# (orjson or json), byte for byte as jsonify would; see ResponseEncoder.
+# The orders and dishes are written without their timestamps (opened_at, pending since), as before they
+# were recorded, unless ORDERS_RESPONSE_TIMESTAMPS=1; /kitchen/next, the table fields and /orders/export give them anyway.
+response_encoder = ResponseEncoder(os.environ.get("ORDERS_JSON_ENCODER"),
+                                   timestamps=os.environ.get("ORDERS_RESPONSE_TIMESTAMPS") == "1")
+
+# Returns the JSON response of a value (orders and dishes are written directly), like jsonify:
+# compact, or indented in debug mode.
+def json_response(value):
+    indent = 2 if (app.json.compact is None and app.debug) or app.json.compact is False else None
+    return app.response_class(response_encoder.encode(value, indent) + "\n", mimetype=app.json.mimetype)
+
 # Handles exceptions centrally and returns an appropriate HTTP response code.
 def handle_exception(e):
     http_code = ERROR_HTTP_CODES.get(type(e), 500)  # Default to 500
-    return jsonify({"error": str(e)}), http_code
+    return json_response({"error": str(e)}), http_code
+
+# Handles a rejected batch: the HTTP code of the failed operation's error,
+# with the results of the operations up to it (none of them were applied).
+def handle_batch_error(e):
+    http_code = ERROR_HTTP_CODES.get(type(e.error), 500)
+    return json_response({"error": str(e), "results": e.results}), http_code
 
 
 app = Flask(__name__)
-order_manager = OrderManager()
+
+# The menu is loaded from the ORDERS_MENU_PATH JSON file (a list of {"id", "name", "unit price"} objects),
+# empty without it; dishes can be ordered by menu id, or as ad-hoc dishes by name and price.
+menu_path = os.environ.get("ORDERS_MENU_PATH")
+menu = Menu.load(menu_path) if menu_path else Menu()
+
+# With ORDERS_SHARD_SOCKETS set (comma separated socket paths), the orders live in table shard
+# processes started with ShardServer, so any number of worker processes share them.
+# The journal, database and archive variables then configure the shard processes instead,
+# and ORDERS_SHARD_AUTHKEY must be set to the secret of the shard processes.
+shard_sockets = os.environ.get("ORDERS_SHARD_SOCKETS")
+if shard_sockets:
+   shard_authkey = os.environ.get("ORDERS_SHARD_AUTHKEY")
+   order_manager = ShardedOrderManager(shard_sockets.split(","), shard_authkey.encode() if shard_authkey else None)
+   dish_events = None
+   change_log = None
+else:
+   # With ORDERS_JOURNAL_DIR set, the orders are recovered from that directory on startup
+   # and every change is logged to it, so they survive restarts.
+   journal_dir = os.environ.get("ORDERS_JOURNAL_DIR")
+   journal = OrderJournal(journal_dir) if journal_dir else None
+   if journal is not None:
+       atexit.register(journal.close)
+   # With ORDERS_DB_PATH set, the orders are kept in that SQLite database instead of in memory,
+   # where they survive restarts by themselves: ORDERS_JOURNAL_DIR cannot be set with it.
+   db_path = os.environ.get("ORDERS_DB_PATH")
+   store = SQLiteOrderStore(db_path) if db_path else None
+   # With ORDERS_ARCHIVE_AFTER set, closed orders beyond that many most recently closed ones are
+   # archived in a compact form, in memory or in the ORDERS_ARCHIVE_PATH spill file. The archive does not
+   # survive restarts (only a journal recovers it), so ORDERS_DB_PATH cannot be set with it.
+   archive_after = os.environ.get("ORDERS_ARCHIVE_AFTER")
+   archive = OrderArchive(os.environ.get("ORDERS_ARCHIVE_PATH")) if archive_after else None
+   # The latest ORDERS_EVENTS_CAPACITY dish changes are kept for the /events/dishes streams.
+   dish_events = EventBuffer(int(os.environ.get("ORDERS_EVENTS_CAPACITY", 10_000)))
+   # The orders changed since a version are kept for /orders/changes, up to ORDERS_CHANGES_CAPACITY of them.
+   change_log = ChangeLog(int(os.environ.get("ORDERS_CHANGES_CAPACITY", 100_000)))
+   # With ORDERS_VERIFY_TOTALS=1, every totals read recomputes them from all the orders and fails on
+   # a mismatch (a full scan per read, for tests; not tied to FLASK_DEBUG).
+   verify_totals = os.environ.get("ORDERS_VERIFY_TOTALS") == "1"
+   order_manager = OrderManager(debug=verify_totals, journal=journal, store=store,
+                                archive=archive, archive_after=int(archive_after or 0), events=dish_events,
+                                change_log=change_log, menu=menu)
+
+# Requests are counted and timed by route unless ORDERS_METRICS=0; with ORDERS_METRICS_CALLS set,
+# the hot OrderManager methods are timed too. Both are exposed at /metrics.
+metrics = Metrics() if os.environ.get("ORDERS_METRICS", "1") != "0" else None
+if metrics is not None and os.environ.get("ORDERS_METRICS_CALLS"):
+   metrics.instrument(order_manager, ("find_order", "add_dish_to_order", "to_dict"))
+
+# Starts timing the request.
+@app.before_request
+def start_request_timer():
+    if metrics is not None:
+       g.request_start = time.perf_counter()
+
+# Records the request by route (the rule, not the URL) and status code.
+@app.after_request
+def record_request(response):
+    if metrics is not None:
+       route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+       metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - g.request_start)
+    return response
+
+# Versions start over with every process, so the ETags carry a random prefix of the process.
+ETAG_PREFIX = os.urandom(4).hex()
+
+# Decorates a GET route with a version-based ETag: version(**route arguments) is read before
+# the response is built, and a request whose If-None-Match holds the current ETag gets a 304
+# without building the response at all. Only successful responses carry the ETag.
+def versioned(version):
+    def decorator(route):
+        @functools.wraps(route)
+        def wrapper(**kwargs):
+            etag = f"{ETAG_PREFIX}-{version(**kwargs)}"
+            if request.if_none_match.contains_weak(etag):
+               response = Response(status=304)
+            else:
+               response = make_response(route(**kwargs))
+            if response.status_code in (200, 304):
+               response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+# The version of the responses about the orders at one table.
+def table_version(table_number, **_):
+    return order_manager.table_version(table_number)
+
+# The version of the responses about all the orders.
+def manager_version(**_):
+    return order_manager.version
 
 
 # Returns the total price of the order at a given table.
 @app.route("/orders/<int:table_number>/price", methods=["GET"])
+@versioned(table_version)
 def get_order_price(table_number):
     try:
         price = order_manager.get_order_price(table_number)
-        return jsonify({"table_number": table_number, "total_price": price}), 200
+        return json_response({"table_number": table_number, "total_price": price}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Returns the status of the order at a given table.
 @app.route("/orders/<int:table_number>/status", methods=["GET"])
+@versioned(table_version)
 def get_order_status(table_number):
     try:
         order_status = order_manager.get_order_status(table_number)
-        return jsonify({"table_number": table_number, "status": order_status}), 200
+        return json_response({"table_number": table_number, "status": order_status}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Returns the customer's name associated with the order at a given table.
 @app.route("/orders/<int:table_number>/customer_name", methods=["GET"])
+@versioned(table_version)
 def get_customer_name(table_number):
     try:
         customer_name = order_manager.get_customer_name(table_number)
-        return jsonify({"table_number": table_number, "customer_name": customer_name}), 200
+        return json_response({"table_number": table_number, "customer_name": customer_name}), 200
     except Exception as e:
         return handle_exception(e)
 
@@ -55,34 +187,79 @@ def get_customer_name(table_number):
 def change_customer_name(table_number, new_name):
     try:
         order_manager.change_customer_name(table_number, new_name)
-        return jsonify({"message": "customer name successfully changed"}), 200
+        return json_response({"message": "customer name successfully changed"}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Returns the unit price of a specific dish in the order at a given table.
 @app.route("/orders/<int:table_number>/dishes/<string:dish_name>/unit_price", methods=["GET"])
+@versioned(table_version)
 def get_dish_unit_price(table_number, dish_name):
     try:
         dish_unit_price = order_manager.get_dish_unit_price(table_number, dish_name)
-        return jsonify({"table_number": table_number, "dish_name": dish_name, "unit_price": dish_unit_price}), 200 
+        return json_response({"table_number": table_number, "dish_name": dish_name, "unit_price": dish_unit_price}), 200 
     except Exception as e:
         return handle_exception(e)
 
 # Returns the status of a specific dish in the order at a given table.
 @app.route("/orders/<int:table_number>/dishes/<string:dish_name>/status", methods=["GET"])
+@versioned(table_version)
 def get_dish_status(table_number, dish_name):
     try:
         dish_status = order_manager.get_dish_status(table_number, dish_name)
-        return jsonify({"table_number": table_number, "dish_name": dish_name, "status": dish_status}), 200
+        return json_response({"table_number": table_number, "dish_name": dish_name, "status": dish_status}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Finds and returns order details based on an identifier (e.g., table number, order ID).
 @app.route("/order/<string:identifier_type>/<string:identifier_value>", methods=["GET"])
+@versioned(manager_version)
 def find_order(identifier_type, identifier_value):
     try:
         order = order_manager.find_order(identifier_type, identifier_value)
-        return jsonify(order.to_dict()), 200
+        return json_response(order), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Returns the order at a table in one request, instead of one request per attribute (price, status,
+# customer name, dishes by status): its table number and the fields asked for.
+# Query parameters: fields- comma separated names of TABLE_FIELDS (id, customer_name, status, total_price,
+# opened_at, dishes, pending_dishes, served_dishes), all of them by default.
+@app.route("/orders/<int:table_number>", methods=["GET"])
+@versioned(table_version)
+def get_table(table_number):
+    try:
+        tables = order_manager.get_tables([table_number], request.args.get("fields"))
+        if not tables["orders"]:
+           raise LookupError("Order is not found")
+        return json_response(tables["orders"][0]), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Searches the orders (closed and archived ones included) by customer name: the ones whose name
+# starts with the given prefix, ignoring case, ordered by name then id.
+# Query parameters: name- the prefix (required), limit- the number of orders (100 by default, up to 1000).
+@app.route("/orders/search", methods=["GET"])
+@versioned(manager_version)
+def search_orders():
+    try:
+        if "name" not in request.args:
+           raise ValueError("name is required")
+        orders = order_manager.search_orders(request.args["name"], request.args.get("limit", DEFAULT_PAGE_SIZE))
+        return json_response({"name": request.args["name"], "orders": orders}), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Returns the orders at several tables in one request, like GET /orders/<table_number> for each of them,
+# in the order of the tables; the tables without an active order are listed in 'not_found'.
+# Query parameters: tables- comma separated table numbers (up to 1000), fields- as for one table.
+@app.route("/orders", methods=["GET"])
+@versioned(manager_version)
+def get_tables():
+    try:
+        if "tables" not in request.args:
+           raise ValueError("tables is required")
+        return json_response(order_manager.get_tables(request.args["tables"], request.args.get("fields"))), 200
     except Exception as e:
         return handle_exception(e)
 
@@ -95,7 +272,7 @@ def add_order():
     try:
         order = Order(customer_name, table_number)
         order_manager.add_order(order)
-        return jsonify({"message": "Order successfully added"}), 201
+        return json_response({"message": "Order successfully added"}), 201
     except Exception as e:
         return handle_exception(e)
 
@@ -104,7 +281,7 @@ def add_order():
 def close_order(table_number):
     try:
         total_price = order_manager.close_order(table_number)
-        return jsonify({"message": f"Order at table {table_number} closed successfully", "total_price": total_price}), 200
+        return json_response({"message": f"Order at table {table_number} closed successfully", "total_price": total_price}), 200
     except Exception as e:
         return handle_exception(e)
 
@@ -113,23 +290,24 @@ def close_order(table_number):
 def remove_order(identifier_type, identifier_value):
     try:
         order_manager.remove_order(identifier_type, identifier_value)
-        return jsonify({"message": "Order successfully removed"}), 200
+        return json_response({"message": "Order successfully removed"}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Adds or removes a dish from an order at a given table.
+# A dish is added by menu id ({"menu_id", "quantity"}) or as an ad-hoc dish ({"name", "quantity", "unit_price"}).
 @app.route("/orders/<int:table_number>/dishes/<string:action>", methods=["PUT"])
 def update_dish_in_order(table_number, action):
     data = request.get_json()
     name = data.get("name")
     if action not in ["add", "remove"]:
-        return jsonify({"error": "Invalid action. Use 'add' or 'remove'"}), 400
+        return json_response({"error": "Invalid action. Use 'add' or 'remove'"}), 400
 
     # Remove dish from order.
     if action == "remove":
         try:
             order_manager.remove_dish_from_order(table_number, name)
-            return jsonify({"message": "Dish successfully removed"}), 200
+            return json_response({"message": "Dish successfully removed"}), 200
         except Exception as e:
             return handle_exception(e)
 
@@ -137,9 +315,44 @@ def update_dish_in_order(table_number, action):
     quantity = data.get("quantity")
     unit_price = data.get("unit_price")
     try:
-        dish = Dish(name, quantity, unit_price)
+        if data.get("menu_id") is not None:
+           dish = Dish.from_menu_item(menu.get(data["menu_id"]), quantity)
+        else:
+           dish = Dish(name, quantity, unit_price)
         order_manager.add_dish_to_order(table_number, dish)
-        return jsonify({"message": "Dish successfully added"}), 200
+        return json_response({"message": "Dish successfully added"}), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Applies a list of dish operations to the order at a given table, all or nothing.
+# Body: {"operations": [{"action": "add", "name": ..., "quantity": ..., "unit_price": ...},
+#                       {"action": "remove" / "update_quantity" / "update_status", "name": ..., ...}]}
+@app.route("/orders/<int:table_number>/dishes/batch", methods=["POST"])
+def apply_table_batch(table_number):
+    data = request.get_json()
+    operations = data.get("operations")
+    try:
+        if not isinstance(operations, list):
+           raise TypeError("operations must be a list")
+        operations = [{**operation, "table_number": table_number} if isinstance(operation, dict) else operation
+                      for operation in operations]
+        results = order_manager.apply_batch(operations)
+        return json_response({"results": results}), 200
+    except BatchError as e:
+        return handle_batch_error(e)
+    except Exception as e:
+        return handle_exception(e)
+
+# Applies a list of dish operations across tables, all or nothing.
+# Body: {"operations": [...]}, like the table batch, with a "table_number" in every operation.
+@app.route("/batch", methods=["POST"])
+def apply_batch():
+    data = request.get_json()
+    try:
+        results = order_manager.apply_batch(data.get("operations"))
+        return json_response({"results": results}), 200
+    except BatchError as e:
+        return handle_batch_error(e)
     except Exception as e:
         return handle_exception(e)
 
@@ -148,7 +361,7 @@ def update_dish_in_order(table_number, action):
 def update_dish_quantity(table_number, dish_name, quantity):
     try:
         order_manager.update_dish_quantity(table_number, dish_name, quantity)
-        return jsonify({"message": f"Quantity of '{dish_name}' at table {table_number} updated to {quantity}"}), 200
+        return json_response({"message": f"Quantity of '{dish_name}' at table {table_number} updated to {quantity}"}), 200
     except Exception as e:
         return handle_exception(e)
 
@@ -157,62 +370,311 @@ def update_dish_quantity(table_number, dish_name, quantity):
 def update_dish_status(table_number, dish_name, status):
     try:
         order_manager.update_dish_status(table_number, dish_name, status)
-        return jsonify({"message": f"Dish '{dish_name}' status updated to '{status}'"}), 200
+        return json_response({"message": f"Dish '{dish_name}' status updated to '{status}'"}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Retrieves all table numbers with orders matching the given status.
 @app.route("/orders/tables_numbers_by_status/<string:status>", methods=["GET"])
+@versioned(manager_version)
 def get_table_numbers_by_order_status(status):
     try:
         tables = order_manager.get_table_numbers_by_order_status(status)
-        return jsonify({"status": status, "tables": tables}), 200
+        return json_response({"status": status, "tables": tables}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Retrieves all dishes in a given order at a table, filtered by their status.
 @app.route("/orders/<int:table_number>/dishes_by_status/<string:status>", methods=["GET"])
+@versioned(table_version)
 def get_table_dishes_by_status(table_number, status):
     try:
         dishes = order_manager.get_table_dishes_by_status(table_number, status)
-        return jsonify({f"{status.lower()} dishes": [dish.to_dict() for dish in dishes]}), 200
+        return json_response({f"{status.lower()} dishes": dishes}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Retrieves all dishes from all orders that match the given status.
 @app.route("/dishes_by_status/<string:status>", methods=["GET"])
+@versioned(manager_version)
 def get_all_dishes_by_status(status):
     try:
         dishes = order_manager.get_all_dishes_by_status(status)
-        return jsonify({"status": status, "dishes": [dish.to_dict() for dish in dishes]}), 200
+        return json_response({"status": status, "dishes": dishes}), 200
     except Exception as e:
         return handle_exception(e)
 
 # Calculates the total price of all orders with the given status.
 @app.route("/orders/total_price/<string:status>", methods=["GET"])
+@versioned(manager_version)
 def get_total_orders_price_by_status(status):
     try:
         total_price = order_manager.total_orders_price_by_status(status)
-        return jsonify({"status": status, "total_price": total_price}), 200
+        return json_response({"status": status, "total_price": total_price}), 200
     except Exception as e:
         return handle_exception(e)
 
+# Seconds between two keep-alive comments of an idle event stream.
+EVENTS_KEEPALIVE_SECONDS = 15
+
+# The server-sent events of dish events, after a 'reset' event if the client missed events (reset=True).
+def format_dish_events(events, reset):
+    chunk = "event: reset\ndata: {}\n\n" if reset else ""
+    for event_seq, event_type, data in events:
+        chunk += f"id: {dish_events.token(event_seq)}\nevent: {event_type}\ndata: {encode_json(data)}\n\n"
+    return chunk
+
+# Returns the sequence number after which to stream the dish events, and whether the client must
+# reload the dishes first: the client sends the token of the last event it got, if any.
+def dish_events_start(token):
+    seq = dish_events.parse_token(token) if token else dish_events.seq
+    return (dish_events.seq, True) if seq is None else (seq, False)
+
+# Yields the dish events after seq as server-sent events, waiting for new ones,
+# after a 'reset' event if the client missed events (reset=True).
+def stream_dish_events(seq, reset):
+    yield "retry: 3000\n\n"
+    while True:
+        if reset:
+           yield "event: reset\ndata: {}\n\n"
+        events, reset = dish_events.wait(seq, EVENTS_KEEPALIVE_SECONDS)
+        if not events:
+           yield ": keep-alive\n\n"
+           continue
+        yield format_dish_events(events, reset)
+        reset = False
+        seq = events[-1][0]
+
+# Streams the changes to the dishes (dish_added, dish_status, dish_quantity, dish_removed and
+# order_removed events) as server-sent events, for kitchen displays. Orders imported in bulk
+# come as one orders_imported event per chunk: the client reloads the dishes, like after a reset.
+# A client that reconnects sends the id of the last event it got (Last-Event-ID header, or the
+# last_event_id query parameter) and gets only the events after it. If they are no longer buffered
+# (or the id is from before a restart), a 'reset' event comes first: the client should reload the
+# dishes (GET /dishes_by_status/Pending) and apply the events that follow.
+# Without an id, the stream starts with the next event; a new client subscribes, then loads the dishes.
+@app.route("/events/dishes", methods=["GET"])
+def get_dish_events():
+    if dish_events is None:
+       return json_response({"error": "dish events are not available in the sharded deployment"}), 404
+    seq, reset = dish_events_start(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    response = Response(stream_dish_events(seq, reset), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response, 200
+
+# Returns the pending dishes that have waited longest, oldest first: what the kitchen should cook next.
+# Query parameters: limit- the number of dishes (10 by default).
+# Each dish comes with its order id and table number; its 'pending since' is when it became Pending.
+@app.route("/kitchen/next", methods=["GET"])
+@versioned(manager_version)
+def get_kitchen_next():
+    try:
+        dishes = order_manager.next_pending_dishes(request.args.get("limit", DEFAULT_KITCHEN_LIMIT))
+        return json_response({"dishes": dishes}), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Returns the menu items, ordered by id.
+@app.route("/menu", methods=["GET"])
+def get_menu():
+    return json_response(menu.to_dict()), 200
+
+# Returns the menu item with the id.
+@app.route("/menu/<int:menu_id>", methods=["GET"])
+def get_menu_item(menu_id):
+    try:
+        return json_response(menu.get(menu_id).to_dict()), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Returns the request and call metrics in the Prometheus text format.
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    if metrics is None:
+       return json_response({"error": "metrics are disabled"}), 404
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"), 200
+
 # Returns the number of created orders.
 @app.route("/orders/created_count", methods=["GET"])
+@versioned(manager_version)
 def get_created_orders_count():
-    return jsonify({"created_orders_count": order_manager.created_orders_num}), 200
+    return json_response({"created_orders_count": order_manager.created_orders_num}), 200
 
 # Returns the number of stored (inactive) orders.
 @app.route("/orders/stored_count", methods=["GET"])
+@versioned(manager_version)
 def get_stored_orders_count():
-    return jsonify({"stored_orders_count": order_manager.stored_orders_num}), 200
+    return json_response({"stored_orders_count": order_manager.stored_orders_num}), 200
 
 # Returns the number of currently active orders.
 @app.route("/orders/active_count", methods=["GET"])
+@versioned(manager_version)
 def get_active_orders_count():
-    return jsonify({"active_orders_count": order_manager.active_orders_num}), 200
+    return json_response({"active_orders_count": order_manager.active_orders_num}), 200
+
+# The query parameters that filter the orders of the summary, see OrderManager.iter_orders.
+SUMMARY_FILTERS = ("status", "min_table", "max_table", "min_id", "max_id")
+
+# Encodes a value as compact JSON, with the same key order and escaping as jsonify.
+def encode_json(value):
+    return response_encoder.encode(value)
+
+# Returns views of order dicts, so they are written like the orders (without their timestamps, see response_encoder).
+def order_views(orders):
+    return [OrderView(order) for order in orders]
+
+# Yields the summary as one JSON document, the counters first and then the orders one by one.
+def stream_summary_json(orders):
+    yield encode_json({"created_orders_num": order_manager.created_orders_num,
+                       "stored_orders_num": order_manager.stored_orders_num,
+                       "active_orders_num": order_manager.active_orders_num})[:-1] + ',"orders":['
+    for index, order in enumerate(orders):
+        yield ("," if index else "") + order.to_json(response_encoder.timestamps)
+    yield "]}\n"
+
+# Yields the orders of the summary as NDJSON, one order per line (with their timestamps for an export).
+def stream_summary_ndjson(orders, timestamps):
+    for order in orders:
+        yield order.to_json(timestamps) + "\n"
+
+# Returns the orders changed since a version, for terminals that keep a copy of the orders in sync
+# (see OrderManager.changes_since): the 'orders' added or changed and the ids of the orders 'removed'.
+# Query parameters:
+#   since- the 'version' of the last response applied, 0 (or none) for all the orders.
+#   epoch- the 'epoch' of that response: versions start over with every process, so a since
+#     from another process gets all the orders ('full' set), like a since that is too old.
+#   client- an id of the terminal; the changes every terminal already has are compacted away.
+@app.route("/orders/changes", methods=["GET"])
+def get_order_changes():
+    if change_log is None:
+       return json_response({"error": "order changes are not available in the sharded deployment"}), 404
+    try:
+        since = request.args.get("since", 0)
+        if request.args.get("epoch", ETAG_PREFIX) != ETAG_PREFIX:
+           since = 0
+        changes = order_manager.changes_since(since, request.args.get("client"))
+        return json_response({"epoch": ETAG_PREFIX, **changes, "orders": order_views(changes["orders"])}), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Exports the orders as NDJSON, one order per line, for POST /orders/import on another server
+# (see OrderTransfer). Takes the filters of the summary.
+@app.route("/orders/export", methods=["GET"])
+@versioned(manager_version)
+def export_orders():
+    try:
+        filters = {name: request.args[name] for name in SUMMARY_FILTERS if name in request.args}
+        return Response(stream_summary_ndjson(order_manager.iter_orders(**filters), True), mimetype="application/x-ndjson"), 200
+    except Exception as e:
+        return handle_exception(e)
+
+# Imports orders in bulk from an NDJSON body, one order per line as exported (see OrderManager.import_orders).
+# The body is read as it arrives, through a buffer (the request stream alone reads lines byte by byte);
+# the orders get new ids.
+@app.route("/orders/import", methods=["POST"])
+def import_orders():
+    try:
+        imported_orders_num = order_manager.import_orders(read_ndjson(io.BufferedReader(request.stream)))
+        return json_response({"message": f"{imported_orders_num} orders imported",
+                        "imported_orders_num": imported_orders_num}), 200
+    except Exception as e:
+        return handle_exception(e)
 
 # Returns a summary of all stored and active orders in the system.
+# Query parameters:
+#   status, min_table, max_table, min_id, max_id- filter the orders (ranges are inclusive).
+#   limit, cursor- return a page of up to limit orders after the cursor, with the next_cursor
+#     to pass for the next page (null on the last page).
+#   stream=json or stream=ndjson- stream the matching orders one by one instead,
+#     so the response doesn't build the whole summary in memory.
+# Without parameters, the whole summary is returned at once.
 @app.route("/orders/summary", methods=["GET"])
+@versioned(manager_version)
 def get_order_manager_summary():
-    return jsonify(order_manager.to_dict()), 200
\ No newline at end of file
+    try:
+        filters = {name: request.args[name] for name in SUMMARY_FILTERS if name in request.args}
+        stream = request.args.get("stream")
+        if stream is not None:
+           if stream not in {"json", "ndjson"}:
+              raise ValueError("stream must be 'json' or 'ndjson'")
+           orders = order_manager.iter_orders(after_id=request.args.get("cursor", 0), **filters)
+           if stream == "json":
+              return Response(stream_summary_json(orders), mimetype="application/json"), 200
+           return Response(stream_summary_ndjson(orders, response_encoder.timestamps), mimetype="application/x-ndjson"), 200
+        if filters or "limit" in request.args or "cursor" in request.args:
+           page = order_manager.summary_page(request.args.get("limit", DEFAULT_PAGE_SIZE),
+                                             request.args.get("cursor"), **filters)
+           return json_response({**page, "orders": order_views(page["orders"])}), 200
+        return json_response(order_manager.summary()), 200
+    except Exception as e:
+        return handle_exception(e)
+
+
+# The analytics snapshot of the orders: it is taken once, and then brought up to date with the orders
+# changed since (see OrderAnalytics.update). The reports read it under its lock, as it is updated in place.
+analytics = None
+analytics_lock = threading.Lock()
+
+# Returns the result of report(snapshot) over an analytics snapshot at least as new as the orders when called.
+def analytics_report(report):
+    global analytics
+    with analytics_lock:
+        if analytics is None:
+           analytics = OrderAnalytics.from_manager(order_manager)
+        else:
+           analytics.update(order_manager)
+        return report(analytics)
+
+# Decorates an analytics route: a 404 without NumPy, the errors handled as usual.
+def analytics_route(route):
+    @functools.wraps(route)
+    def wrapper(**kwargs):
+        if not ANALYTICS_AVAILABLE:
+           return json_response({"error": "analytics require NumPy, which is not installed"}), 404
+        try:
+            return json_response(analytics_report(lambda snapshot: route(snapshot, **kwargs))), 200
+        except Exception as e:
+            return handle_exception(e)
+    return wrapper
+
+# The analytics of the stored orders (archived ones included). Every route takes a status
+# query parameter ('Pending', 'Served', 'Done' or 'All', the default) to report on those orders only.
+
+# Returns the revenue and quantity sold of every dish, highest revenue first.
+@app.route("/analytics/revenue/dishes", methods=["GET"])
+@versioned(manager_version)
+@analytics_route
+def get_revenue_by_dish(snapshot):
+    return {"dishes": snapshot.revenue_by_dish(request.args.get("status", "All"))}
+
+# Returns the number of orders and the revenue of every table.
+@app.route("/analytics/revenue/tables", methods=["GET"])
+@versioned(manager_version)
+@analytics_route
+def get_revenue_by_table(snapshot):
+    return {"tables": snapshot.revenue_by_table(request.args.get("status", "All"))}
+
+# Returns the number of orders opened and their revenue in every hour (UTC).
+@app.route("/analytics/revenue/hours", methods=["GET"])
+@versioned(manager_version)
+@analytics_route
+def get_revenue_by_hour(snapshot):
+    return {"hours": snapshot.revenue_by_hour(request.args.get("status", "All"))}
+
+# Returns the average ticket: the average total price of the orders with dishes.
+@app.route("/analytics/average_ticket", methods=["GET"])
+@versioned(manager_version)
+@analytics_route
+def get_average_ticket(snapshot):
+    return snapshot.average_ticket(request.args.get("status", "All"))
+
+# Returns percentiles of the dish quantities, by default the 50th, 90th and 99th,
+# or those of the percentiles query parameter (comma separated, e.g. 25,50,75).
+@app.route("/analytics/quantity_percentiles", methods=["GET"])
+@versioned(manager_version)
+@analytics_route
+def get_quantity_percentiles(snapshot):
+    percentiles = request.args.get("percentiles")
+    percentiles = [float(value) for value in percentiles.split(",")] if percentiles else DEFAULT_PERCENTILES
+    return snapshot.quantity_percentiles(percentiles, request.args.get("status", "All"))
@@ -0,0 +1,283 @@
+## asgi.py
+## The asyncio (ASGI) entry point of the order service: the routes and JSON contracts of app.py,
+## on the same OrderManager, for many concurrent long-lived connections on one event loop.
+## Run it with an ASGI server, e.g.: uvicorn src.asgi:application --host 0.0.0.0 --port 5000
+## The configuration is the one of app.py (ORDERS_* environment variables), plus:
+##   ORDERS_ASGI_WORKERS- the threads the requests are handled on (see below), 8 by default.
+##
+## A connection costs no thread while it is idle: the dish event streams (/events/dishes) are served
+## on the loop, woken up by the events, and keep-alive connections only wait on the loop.
+## The requests are handled by the Flask routes of app.py, so the responses are the same byte for byte:
+##   - the cheap reads (a table's snapshot, prices, statuses, counts, customer searches, the menu, the kitchen queue) run on
+##     the loop, as they take no lock held across a change and read no file (with the orders in memory only,
+##     and no archive: archived orders may be read from its spill file);
+##   - the other requests (changes, which may wait for a table lock or the journal, and the large
+##     reads: summaries, exports, imports, analytics, dishes of all the orders) run on the worker threads,
+##     their bodies read from the loop as the route consumes them and their responses streamed back in chunks.
+
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.exceptions import HTTPException
+
+from . import app as wsgi
+
+# The endpoints (Flask view names) handled on the loop, for GET and HEAD requests.
+LOOP_ENDPOINTS = frozenset({
+    "get_order_price", "get_order_status", "get_customer_name", "get_dish_unit_price", "get_dish_status",
+    "find_order", "get_table", "search_orders", "get_table_dishes_by_status", "get_kitchen_next", "get_menu", "get_menu_item",
+    "get_created_orders_count", "get_stored_orders_count", "get_active_orders_count",
+})
+# The response chunks of a route are sent in chunks of about this many bytes.
+STREAM_CHUNK_SIZE = 1 << 16
+
+executor = ThreadPoolExecutor(int(os.environ.get("ORDERS_ASGI_WORKERS", 8)), thread_name_prefix="orders-asgi")
+url_adapter = wsgi.app.url_map.bind("localhost")
+
+
+# Wakes up the event streams of a loop when a dish event is published (from any thread).
+class EventNotifier:
+    def __init__(self, loop):
+        self.__loop = loop
+        self.__event = asyncio.Event()
+        self.__scheduled = False
+        self.__encoded = {}  # event sequence number -> the event as a server-sent event, for the latest events.
+        wsgi.dish_events.add_listener(self.__notify)
+
+    # Called by the publishing thread; the wake ups of the events published meanwhile are merged.
+    def __notify(self):
+        if not self.__scheduled:
+           self.__scheduled = True
+           self.__loop.call_soon_threadsafe(self.__wake)
+
+    def __wake(self):
+        self.__scheduled = False
+        self.__event.set()
+        self.__event = asyncio.Event()
+
+    # Returns the server-sent events of dish events, after a 'reset' event if missed: every event
+    # is encoded once for all the streams of the loop.
+    def format(self, events, missed):
+        if len(self.__encoded) > wsgi.dish_events.capacity:
+           self.__encoded.clear()
+        chunk = "event: reset\ndata: {}\n\n" if missed else ""
+        for event in events:
+            encoded = self.__encoded.get(event[0])
+            if encoded is None:
+               encoded = self.__encoded[event[0]] = wsgi.format_dish_events([event], False)
+            chunk += encoded
+        return chunk
+
+    # The event set by the next dish event; take it before checking for events, so none is missed.
+    @property
+    def next_event(self):
+        return self.__event
+
+
+notifiers = {}  # loop -> its EventNotifier.
+
+# Returns the event notifier of the running loop.
+def event_notifier():
+    loop = asyncio.get_running_loop()
+    notifier = notifiers.get(loop)
+    if notifier is None:
+       notifier = notifiers[loop] = EventNotifier(loop)
+    return notifier
+
+
+# The request body, read from the ASGI connection as a worker thread reads it.
+class ReceiveStream(io.RawIOBase):
+    def __init__(self, receive, loop):
+        self.__receive = receive
+        self.__loop = loop
+        self.__buffer = b""
+        self.__more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.__buffer and self.__more:
+            message = asyncio.run_coroutine_threadsafe(self.__receive(), self.__loop).result()
+            if message["type"] == "http.disconnect":
+               raise OSError("the client disconnected")
+            self.__buffer = message.get("body", b"")
+            self.__more = message.get("more_body", False)
+        size = min(len(buffer), len(self.__buffer))
+        buffer[:size] = self.__buffer[:size]
+        self.__buffer = self.__buffer[size:]
+        return size
+
+
+# Returns the whole request body.
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+           raise OSError("the client disconnected")
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+           return body
+
+
+# Returns the WSGI environ of an ASGI HTTP request, with body as its input.
+def build_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "wsgi.input_terminated": True,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+           name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = environ[name] + "," + value if name in environ else value
+    return environ
+
+
+# Returns whether the request is handled on the loop rather than on a worker thread.
+def runs_on_loop(scope):
+    if scope["method"] not in ("GET", "HEAD") or wsgi.shard_sockets or wsgi.store is not None or wsgi.archive is not None:
+       return False
+    try:
+        endpoint, _ = url_adapter.match(scope["path"], scope["method"])
+    except HTTPException:
+        return True  # An error response, built by Flask without touching the orders.
+    return endpoint in LOOP_ENDPOINTS
+
+
+# Starts the WSGI app on the request, returns (status line, headers, response iterable).
+def start_wsgi(environ):
+    started = []
+    def start_response(status, headers, exc_info=None):
+        started[:] = [status, headers]
+    result = wsgi.app(environ, start_response)
+    return started[0], started[1], result
+
+
+# Returns the next chunk of about STREAM_CHUNK_SIZE bytes of a response iterator, b"" at its end.
+def read_chunk(iterator):
+    chunk = b""
+    for data in iterator:
+        chunk += data
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+           break
+    return chunk
+
+
+# Handles a request with the Flask app, on the loop or on a worker thread.
+async def handle_wsgi(scope, receive, send, on_loop):
+    loop = asyncio.get_running_loop()
+    async def call(function, *args):
+        return function(*args) if on_loop else await loop.run_in_executor(executor, function, *args)
+
+    if on_loop:
+       body = io.BytesIO(await read_body(receive))
+    else:
+       body = io.BufferedReader(ReceiveStream(receive, loop))
+    status, headers, result = await call(start_wsgi, build_environ(scope, body))
+    try:
+        iterator = iter(result)
+        chunk = await call(read_chunk, iterator)
+        await send({"type": "http.response.start", "status": int(status.split(" ", 1)[0]),
+                    "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]})
+        while True:
+            next_chunk = await call(read_chunk, iterator) if chunk else b""
+            await send({"type": "http.response.body", "body": chunk, "more_body": bool(next_chunk)})
+            if not next_chunk:
+               break
+            chunk = next_chunk
+    finally:
+        if hasattr(result, "close"):
+           await call(result.close)
+
+
+# Waits until the client disconnects.
+async def wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+# Streams the dish events as server-sent events, like GET /events/dishes of app.py, on the loop:
+# an idle stream waits for the next event (or its keep-alive time) without a thread.
+async def stream_dish_events(scope, receive, send):
+    start = time.perf_counter()
+    token = dict(scope["headers"]).get(b"last-event-id", b"").decode("latin-1")
+    if not token:
+       token = parse_qs(scope["query_string"].decode("latin-1")).get("last_event_id", [""])[0]
+    seq, reset = wsgi.dish_events_start(token)
+    notifier = event_notifier()
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"text/event-stream; charset=utf-8"),
+                            (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]})
+    if wsgi.metrics is not None:
+       wsgi.metrics.observe_request("GET", "/events/dishes", 200, time.perf_counter() - start)
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        chunk = "retry: 3000\n\n"
+        while not disconnected.done():
+            if reset:
+               chunk += "event: reset\ndata: {}\n\n"
+               reset = False
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+            next_event = notifier.next_event
+            events, missed = wsgi.dish_events.since(seq)
+            if not events:
+               waiting = asyncio.ensure_future(next_event.wait())
+               await asyncio.wait((waiting, disconnected), timeout=wsgi.EVENTS_KEEPALIVE_SECONDS,
+                                  return_when=asyncio.FIRST_COMPLETED)
+               waiting.cancel()
+               events, missed = wsgi.dish_events.since(seq)
+            if not events:
+               chunk = ": keep-alive\n\n"
+               continue
+            chunk = notifier.format(events, missed)
+            seq = events[-1][0]
+    finally:
+        disconnected.cancel()
+
+
+# Runs the startup and shutdown of the server: the worker threads are stopped on shutdown.
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+           await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+           executor.shutdown(wait=True)
+           await send({"type": "lifespan.shutdown.complete"})
+           return
+
+
+# The ASGI application.
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+       await lifespan(receive, send)
+       return
+    if scope["type"] != "http":
+       raise ValueError(f"unsupported connection type '{scope['type']}'")
+    if scope["path"] == "/events/dishes" and scope["method"] == "GET" and wsgi.dish_events is not None:
+       await stream_dish_events(scope, receive, send)
+    else:
+       await handle_wsgi(scope, receive, send, runs_on_loop(scope))
@@ -0,0 +1,69 @@
+## conftest.py
+## The store backends the OrderManager tests run against: the orders in memory (recovered from a journal
+## on restart), in memory with the closed orders archived, and in an SQLite database (which keeps them by itself);
+## and a Flask test client of the app on a new in-memory manager.
+
+import pytest
+
+from src import app as app_module
+from src.ChangeLog import ChangeLog
+from src.EventBuffer import EventBuffer
+from src.OrderArchive import OrderArchive
+from src.OrderJournal import OrderJournal
+from src.OrderManager import OrderManager
+from src.SQLiteOrderStore import SQLiteOrderStore
+
+BACKENDS = ("memory", "archive", "sqlite")
+# The closed orders kept in the store by the "archive" backend, the older ones are archived.
+ARCHIVE_AFTER = 2
+
+
+# Opens OrderManagers on one backend in a directory, and restarts them as a new process would.
+class Backend:
+    def __init__(self, kind, directory, **manager_options):
+        self.kind = kind
+        self.directory = directory
+        self.manager_options = manager_options
+        self.__journal = self.__store = None
+
+    # Returns a manager recovering the orders left by the previous one, if any.
+    def open(self):
+        if self.kind in ("memory", "archive"):
+           self.__journal = OrderJournal(self.directory / "journal")
+           if self.kind == "archive":
+              return OrderManager(journal=self.__journal, archive=OrderArchive(str(self.directory / "archive.bin")),
+                                  archive_after=ARCHIVE_AFTER, **self.manager_options)
+           return OrderManager(journal=self.__journal, **self.manager_options)
+        self.__store = SQLiteOrderStore(str(self.directory / "orders.db"))
+        return OrderManager(store=self.__store, **self.manager_options)
+
+    # Closes the files of the current manager.
+    def close(self):
+        if self.__journal is not None:
+           self.__journal.close()
+        if self.__store is not None:
+           self.__store.close()
+        self.__journal = self.__store = None
+
+    # Closes the current manager and returns a new one recovered from its files.
+    def restart(self):
+        self.close()
+        return self.open()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path):
+    backend = Backend(request.param, tmp_path)
+    yield backend
+    backend.close()
+
+
+# A test client of the app, on a new manager with a change log and dish events, returned with the manager.
+@pytest.fixture
+def client():
+    app_module.change_log = ChangeLog()
+    app_module.dish_events = EventBuffer()
+    app_module.order_manager = OrderManager(change_log=app_module.change_log, events=app_module.dish_events,
+                                            menu=app_module.menu)
+    app_module.analytics = None
+    return app_module.app.test_client()
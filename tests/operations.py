@@ -0,0 +1,43 @@
+## operations.py
+## Random sequences of the public OrderManager operations, shared by the tests.
+
+import random
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import BatchError
+
+DISH_NAMES = ("Soup", "Steak", "Salad", "Tea")
+CUSTOMER_NAMES = ("Ann", "anna", "Bob", "Zoë")
+
+
+# Applies operations_num random operations to the manager (the rejected ones change nothing).
+def run_operations(manager, operations_num, seed=0, tables_num=12):
+    rnd = random.Random(seed)
+    for _ in range(operations_num):
+        table_number = rnd.randint(1, tables_num)
+        dish_name = rnd.choice(DISH_NAMES)
+        choice = rnd.random()
+        try:
+            if choice < 0.15:
+               manager.add_order(Order(rnd.choice(CUSTOMER_NAMES), table_number))
+            elif choice < 0.45:
+               manager.add_dish_to_order(table_number, Dish(dish_name, rnd.randint(1, 3), rnd.choice((2.5, 4.1, 12))))
+            elif choice < 0.6:
+               manager.update_dish_status(table_number, dish_name, rnd.choice(("Served", "Pending")))
+            elif choice < 0.67:
+               manager.update_dish_quantity(table_number, dish_name, rnd.randint(1, 5))
+            elif choice < 0.72:
+               manager.remove_dish_from_order(table_number, dish_name)
+            elif choice < 0.8:
+               manager.close_order(table_number)
+            elif choice < 0.84:
+               manager.remove_order("table_number", table_number)
+            elif choice < 0.88:
+               manager.change_customer_name(table_number, rnd.choice(CUSTOMER_NAMES))
+            else:
+               manager.apply_batch([
+                   {"table_number": table_number, "action": "add", "name": dish_name, "quantity": 1, "unit_price": 3.5},
+                   {"table_number": table_number, "action": "update_status", "name": dish_name, "status": "Served"}])
+        except (LookupError, ValueError, TypeError, BatchError):
+            pass
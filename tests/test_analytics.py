@@ -0,0 +1,81 @@
+## test_analytics.py
+## The analytics snapshot kept up to date with the change log, checked against the OrderManager totals
+## and against a snapshot taken again from all the orders, on every store backend.
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src import OrderAnalytics as analytics_module
+from src.ChangeLog import ChangeLog
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderAnalytics import OrderAnalytics
+from src.OrderManager import OrderManager
+from tests.conftest import Backend
+from tests.operations import run_operations
+
+STATUSES = ("Pending", "Served", "Done", "All")
+
+
+# Returns the value with its floats rounded: the sums of the updated snapshot add in another order.
+def rounded(value):
+    if isinstance(value, float):
+       return round(value, 6)
+    if isinstance(value, dict):
+       return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+       return [rounded(item) for item in value]
+    return value
+
+
+# Returns all the reports of a snapshot (the dishes by name: dishes of equal revenue come in the order first seen).
+def reports(snapshot):
+    return rounded({status: (sorted(snapshot.revenue_by_dish(status), key=lambda dish: dish["dish"]),
+                             snapshot.revenue_by_table(status), snapshot.revenue_by_hour(status),
+                             snapshot.average_ticket(status), snapshot.quantity_percentiles(status=status))
+                    for status in STATUSES})
+
+
+# With MIN_COMPACTION at 1, the columns are compacted on most updates.
+@pytest.mark.parametrize("min_compaction", [1024, 1])
+def test_updated_snapshot_matches_the_orders(backend, monkeypatch, min_compaction):
+    monkeypatch.setattr(analytics_module, "MIN_COMPACTION", min_compaction)
+    manager = Backend(backend.kind, backend.directory, change_log=ChangeLog()).open()
+    snapshot = OrderAnalytics.from_manager(manager)
+    for seed in range(8):
+        run_operations(manager, 60, seed=seed)
+        snapshot.update(manager)
+        assert snapshot.version == manager.version
+        assert snapshot.orders_num == len(list(manager.iter_orders()))
+        for status in STATUSES:
+            total = manager.total_orders_price_by_status(status)
+            assert snapshot.average_ticket(status)["revenue"] == pytest.approx(total)
+            assert sum(table["revenue"] for table in snapshot.revenue_by_table(status)) == pytest.approx(total)
+        assert reports(snapshot) == reports(OrderAnalytics.from_manager(manager))
+    backend.close()
+
+
+def test_snapshot_is_taken_again_behind_the_change_log():
+    manager = OrderManager(change_log=ChangeLog(max_entries=2))
+    snapshot = OrderAnalytics.from_manager(manager)
+    for table_number in range(1, 6):
+        manager.add_order(Order("Ann", table_number))
+        manager.add_dish_to_order(table_number, Dish("Soup", table_number, 2))
+    snapshot.update(manager)
+    assert reports(snapshot) == reports(OrderAnalytics.from_manager(manager))
+    assert snapshot.average_ticket()["revenue"] == manager.total_orders_price_by_status("All") == 30
+
+
+def test_reports_follow_the_changes(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 2, "unit_price": 4.5})
+    assert client.get("/analytics/average_ticket").get_json() == {"orders_num": 1, "revenue": 9, "average_ticket": 9}
+    client.post("/add_order", json={"customer_name": "Bob", "table_number": 2})
+    client.put("/orders/2/dishes/add", json={"name": "Steak", "quantity": 1, "unit_price": 21})
+    client.put("/orders/1/dishes/Soup/update_quantity/4")
+    assert client.get("/analytics/revenue/dishes").get_json()["dishes"] == [
+        {"dish": "Steak", "quantity": 1, "revenue": 21}, {"dish": "Soup", "quantity": 4, "revenue": 18}]
+    client.delete("/remove_order/table_number/2")
+    assert client.get("/analytics/revenue/tables").get_json()["tables"] == [
+        {"table_number": 1, "orders_num": 1, "revenue": 18}]
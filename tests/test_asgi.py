@@ -0,0 +1,49 @@
+## test_asgi.py
+## The ASGI entry point answers as the Flask app does, and keeps the requests that may block off the loop.
+
+import asyncio
+import json
+
+from src import app as app_module
+from src import asgi
+from src.OrderArchive import OrderArchive
+
+
+# Sends a request to the ASGI application, returns its (status, headers, body).
+def asgi_request(method, path, data=None):
+    body = json.dumps(data).encode() if data is not None else b""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "http_version": "1.1",
+             "headers": [(b"content-type", b"application/json")] if data is not None else []}
+    asyncio.run(asgi.application(scope, receive, send))
+    return (sent[0]["status"], dict(sent[0]["headers"]),
+            b"".join(message.get("body", b"") for message in sent[1:]))
+
+
+def test_responses_match_the_flask_app(client):
+    assert asgi_request("POST", "/add_order", {"customer_name": "Ann", "table_number": 1})[0] == 201
+    assert asgi_request("PUT", "/orders/1/dishes/add", {"name": "Soup", "quantity": 2, "unit_price": 4.5})[0] == 200
+    for path in ("/orders/1/price", "/orders/1", "/orders/summary", "/orders/7/price", "/no/such/route"):
+        status, headers, body = asgi_request("GET", path)
+        response = client.get(path)
+        assert status == response.status_code
+        assert body == response.data
+        assert headers.get(b"etag", b"").decode() == response.headers.get("ETag", "")
+
+
+def test_blocking_requests_run_off_the_loop(client, monkeypatch):
+    request = {"type": "http", "method": "GET", "path": "/orders/1/price"}
+    assert asgi.runs_on_loop(request)
+    assert not asgi.runs_on_loop({**request, "method": "PUT"})
+    assert not asgi.runs_on_loop({**request, "path": "/orders/summary"})
+    # Archived orders may be read from the spill file, so with an archive no request runs on the loop.
+    monkeypatch.setattr(app_module, "archive", OrderArchive())
+    assert not asgi.runs_on_loop(request)
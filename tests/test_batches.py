@@ -0,0 +1,58 @@
+## test_batches.py
+## Batches of dish operations over one or several tables: applied all together with a result per
+## operation, or not at all, through the manager (across restarts) and the batch routes.
+
+from src.Order import Order
+
+
+def test_batch_over_tables(backend):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.add_order(Order("Bob", 2))
+    results = manager.apply_batch([
+        {"table_number": 1, "action": "add", "name": "Soup", "quantity": 2, "unit_price": 4.5},
+        {"table_number": 2, "action": "add", "name": "Steak", "quantity": 1, "unit_price": 20},
+        {"table_number": 1, "action": "update_quantity", "name": "Soup", "quantity": 3},
+        {"table_number": 2, "action": "update_status", "name": "Steak", "status": "Served"}])
+    assert results == [{"index": index, "result": "ok"} for index in range(4)]
+    assert (manager.get_order_price(1), manager.get_order_status(1)) == (13.5, "Pending")
+    assert (manager.get_order_price(2), manager.get_order_status(2)) == (20, "Served")
+    manager = backend.restart()
+    assert (manager.get_order_price(1), manager.get_order_price(2)) == (13.5, 20)
+    # Removing the last dish of an order removes the order, as remove_dish_from_order does.
+    manager.apply_batch([{"table_number": 2, "action": "remove", "name": "Steak"}])
+    assert manager.stored_orders_num == 1
+
+
+def test_table_batch_route(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    response = client.post("/orders/1/dishes/batch", json={"operations": [
+        {"action": "add", "name": "Soup", "quantity": 2, "unit_price": 4.5},
+        {"action": "add", "name": "Tea", "quantity": 1, "unit_price": 2}]})
+    assert response.status_code == 200
+    assert response.get_json() == {"results": [{"index": 0, "result": "ok"}, {"index": 1, "result": "ok"}]}
+    response = client.post("/orders/1/dishes/batch", json={"operations": [
+        {"action": "update_status", "name": "Soup", "status": "Served"},
+        {"action": "remove", "name": "Cake"}]})
+    assert response.status_code == 404
+    assert response.get_json()["results"] == [{"index": 0, "result": "ok"},
+                                              {"index": 1, "result": "failed", "error": "Cake is not found in that order"}]
+    # The first operation was rolled back with the failed one.
+    assert client.get("/orders/1/dishes/Soup/status").get_json()["status"] == "Pending"
+    assert client.post("/orders/1/dishes/batch", json={"operations": {}}).status_code == 400
+
+
+def test_cross_table_batch_route(client):
+    for table_number in (1, 2):
+        client.post("/add_order", json={"customer_name": "Ann", "table_number": table_number})
+    response = client.post("/batch", json={"operations": [
+        {"table_number": 1, "action": "add", "name": "Soup", "quantity": 1, "unit_price": 4.5},
+        {"table_number": 2, "action": "add", "name": "Soup", "quantity": 2, "unit_price": 4.5}]})
+    assert response.status_code == 200
+    assert [client.get(f"/orders/{table_number}/price").get_json()["total_price"] for table_number in (1, 2)] == [4.5, 9]
+    response = client.post("/batch", json={"operations": [
+        {"table_number": 1, "action": "remove", "name": "Soup"},
+        {"action": "remove", "name": "Soup"}]})
+    assert response.status_code == 400
+    assert response.get_json()["results"][-1]["index"] == 1
+    assert client.get("/orders/1/price").get_json()["total_price"] == 4.5
@@ -0,0 +1,48 @@
+## test_concurrent_reads.py
+## Readers write an order as JSON or a dict while another thread adds and removes its dishes
+## (they read a copy of the dishes, see Order.dishes).
+
+import sys
+import threading
+
+from src.Dish import Dish
+from src.Order import Order
+
+
+def test_order_is_written_while_its_dishes_change():
+    order = Order("Ann", 1)
+    stop = threading.Event()
+    errors = []
+
+    def change_dishes():
+        index = 0
+        while not stop.is_set():
+            order.add_dish(Dish(f"Dish {index}", 1, 2.5))
+            if index >= 20:
+               order.remove_dish(f"Dish {index - 20}")
+            index += 1
+
+    def write_order():
+        try:
+            for _ in range(3000):
+                order.to_json()
+                order.to_json(timestamps=False)
+                order.to_dict()
+        except Exception as e:
+            errors.append(e)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        changer = threading.Thread(target=change_dishes)
+        changer.start()
+        readers = [threading.Thread(target=write_order) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        stop.set()
+        changer.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
@@ -0,0 +1,75 @@
+## test_dish_events.py
+## The changes to the dishes are streamed as server-sent events at GET /events/dishes, and a client that
+## reconnects with the id of the last event it got receives only the events after it, or a reset.
+
+from src import app as app_module
+from src.Dish import Dish
+from src.EventBuffer import EventBuffer
+from src.Order import Order
+from src.OrderManager import OrderManager
+
+
+# Opens the event stream and reads its first two chunks: the retry delay, then the events already published
+# (after a reset if they were missed).
+def read_events(client, **headers):
+    response = client.get("/events/dishes", headers=headers, buffered=False)
+    assert response.status_code == 200 and response.mimetype == "text/event-stream"
+    chunks = response.iter_encoded()
+    text = next(chunks).decode() + next(chunks).decode()
+    response.close()
+    return text
+
+
+# Returns the (id, event type, data) of the events of a stream.
+def parse_events(text):
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+           events.append((fields.get("id"), fields["event"], fields["data"]))
+    return events
+
+
+def test_dish_changes_are_streamed(client):
+    response = client.get("/events/dishes", buffered=False)
+    chunks = response.iter_encoded()
+    assert next(chunks) == b"retry: 3000\n\n"
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 1, "unit_price": 4.5})
+    client.put("/orders/1/dishes/Soup/update_status/Served")
+    client.put("/orders/1/dishes/Soup/update_quantity/2")
+    client.put("/orders/1/dishes/remove", json={"name": "Soup"})
+    events = parse_events(next(chunks).decode())
+    response.close()
+    assert [event_type for _, event_type, _ in events] == ["dish_added", "dish_status", "dish_quantity", "dish_removed"]
+    assert '"status":"Served"' in events[1][2]
+    assert '"table_number":1' in events[3][2]
+
+
+def test_reconnecting_client_gets_what_it_missed(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 1, "unit_price": 4.5})
+    response = client.get("/events/dishes", buffered=False)
+    chunks = response.iter_encoded()
+    next(chunks)
+    client.put("/orders/1/dishes/add", json={"name": "Tea", "quantity": 1, "unit_price": 2})
+    last_id = parse_events(next(chunks).decode())[-1][0]
+    response.close()
+    client.put("/orders/1/dishes/Tea/update_status/Served")
+    client.put("/orders/1/dishes/Soup/update_status/Served")
+    events = parse_events(read_events(client, **{"Last-Event-ID": last_id}))
+    assert [event_type for _, event_type, _ in events] == ["dish_status", "dish_status"]
+    assert '"name":"Tea"' in events[0][2] and '"name":"Soup"' in events[1][2]
+
+
+def test_client_too_far_behind_gets_a_reset(client):
+    app_module.dish_events = EventBuffer(capacity=2)
+    app_module.order_manager = OrderManager(events=app_module.dish_events)
+    app_module.order_manager.add_order(Order("Ann", 1))
+    app_module.order_manager.add_dish_to_order(1, Dish("Soup", 1, 4.5))
+    first_id = app_module.dish_events.token(app_module.dish_events.seq)
+    for dish_name in ("Tea", "Cake", "Pie"):
+        app_module.order_manager.add_dish_to_order(1, Dish(dish_name, 1, 2))
+    events = parse_events(read_events(client, **{"Last-Event-ID": first_id}))
+    assert [event_type for _, event_type, _ in events] == ["reset", "dish_added", "dish_added"]
+    assert parse_events(read_events(client, **{"Last-Event-ID": "not a token"}))[0][1] == "reset"
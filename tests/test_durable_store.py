@@ -0,0 +1,57 @@
+## test_durable_store.py
+## A journal and a durable store can't be combined (both would recover the orders on restart), nor an archive
+## and a durable store (the archived orders would be lost on restart): the manager refuses them at startup,
+## and the store alone survives restarts.
+
+import pytest
+
+from src.OrderArchive import OrderArchive
+from src.OrderJournal import OrderJournal
+from src.OrderManager import OrderManager
+from src.SQLiteOrderStore import SQLiteOrderStore
+from tests.operations import run_operations
+
+
+def test_journal_with_durable_store_is_rejected(tmp_path):
+    store = SQLiteOrderStore(str(tmp_path / "orders.db"))
+    with pytest.raises(ValueError):
+        OrderManager(journal=OrderJournal(tmp_path / "journal"), store=store)
+    store.close()
+
+
+def test_archive_with_durable_store_is_rejected(tmp_path):
+    store = SQLiteOrderStore(str(tmp_path / "orders.db"))
+    with pytest.raises(ValueError):
+        OrderManager(store=store, archive=OrderArchive(str(tmp_path / "archive.bin")), archive_after=2)
+    store.close()
+
+
+def test_journal_with_in_memory_database_is_allowed(tmp_path):
+    manager = OrderManager(journal=OrderJournal(tmp_path / "journal"), store=SQLiteOrderStore(":memory:"))
+    run_operations(manager, 50)
+
+
+def test_durable_store_survives_restart_without_journal(tmp_path):
+    path = str(tmp_path / "orders.db")
+    store = SQLiteOrderStore(path)
+    manager = OrderManager(store=store)
+    run_operations(manager, 300)
+    expected = manager.to_dict(timestamps=True)
+    store.close()
+    store = SQLiteOrderStore(path)
+    assert OrderManager(store=store).to_dict(timestamps=True) == expected
+    store.close()
+
+
+def test_durable_store_reports_read_the_store(tmp_path, monkeypatch):
+    store = SQLiteOrderStore(str(tmp_path / "orders.db"))
+    manager = OrderManager(store=store)
+    run_operations(manager, 300)
+    expected = [dish.to_dict() for order in manager.orders for dish in order.get_dishes_by_status("Pending")]
+    queries = []
+    dishes_by_status = store.dishes_by_status
+    monkeypatch.setattr(store, "dishes_by_status", lambda status: queries.append(status) or dishes_by_status(status))
+    assert [dish.to_dict() for dish in manager.get_all_dishes_by_status("Pending")] == expected
+    assert queries == ["Pending"]
+    assert manager.total_orders_price_by_status("All") == store.total_price_by_status("All")
+    store.close()
@@ -0,0 +1,51 @@
+## test_etags.py
+## The GET routes answer with a version ETag, and a request holding the current one gets a 304 without a body.
+
+from src import app as app_module
+
+
+# Adds an order with a dish at the table, through the app.
+def add_order(client, table_number):
+    assert client.post("/add_order", json={"customer_name": "Ann", "table_number": table_number}).status_code == 201
+    assert client.put(f"/orders/{table_number}/dishes/add",
+                      json={"name": "Soup", "quantity": 1, "unit_price": 6.5}).status_code == 200
+
+
+def test_current_etag_gets_304(client):
+    add_order(client, 1)
+    for url in ("/orders/1/price", "/orders/summary", "/orders/total_price/All"):
+        response = client.get(url)
+        assert response.status_code == 200 and response.headers["ETag"]
+        cached = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.data == b""
+        assert cached.headers["ETag"] == response.headers["ETag"]
+
+
+def test_etag_changes_after_a_write(client):
+    add_order(client, 1)
+    add_order(client, 2)
+    table_etag = client.get("/orders/1/price").headers["ETag"]
+    summary_etag = client.get("/orders/summary").headers["ETag"]
+    client.put("/orders/1/dishes/Soup/update_quantity/3")
+    response = client.get("/orders/1/price", headers={"If-None-Match": table_etag})
+    assert response.status_code == 200
+    assert response.get_json()["total_price"] == 19.5
+    assert response.headers["ETag"] != table_etag
+    assert client.get("/orders/summary", headers={"If-None-Match": summary_etag}).status_code == 200
+    # A change at another table leaves the table's ETag as it was.
+    table_etag = response.headers["ETag"]
+    client.put("/orders/2/dishes/Soup/update_quantity/2")
+    assert client.get("/orders/1/price", headers={"If-None-Match": table_etag}).status_code == 304
+
+
+def test_streamed_routes_carry_the_etag(client):
+    add_order(client, 1)
+    for url in ("/orders/summary?stream=json", "/orders/summary?stream=ndjson", "/orders/export"):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag.startswith(f'"{app_module.ETAG_PREFIX}-')
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    client.put("/orders/1/close")
+    assert client.get("/orders/export", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,58 @@
+## test_indexes.py
+## The orders found by id, by active table and by customer name through the manager's indexes
+## are the ones a scan of all the orders finds, through adds, removals, closes and renames.
+
+import pytest
+
+from src.Order import Order
+from tests.operations import run_operations, CUSTOMER_NAMES
+
+
+# Returns the id of the order find_order finds, None if it finds none.
+def found_id(manager, identifier_type, identifier_value):
+    try:
+        return manager.find_order(identifier_type, identifier_value).id
+    except LookupError:
+        return None
+
+
+# Checks every index against a scan of the stored orders (archived ones included).
+def check_indexes(manager, tables_num=12):
+    orders = manager.orders
+    for order in orders:
+        assert found_id(manager, "id", order.id) == order.id
+    for table_number in range(1, tables_num + 1):
+        active_ids = [order.id for order in orders if order.table_number == table_number and order.status != "Done"]
+        assert found_id(manager, "table_number", table_number) == min(active_ids, default=None)
+    for customer_name in CUSTOMER_NAMES:
+        customer_ids = [order.id for order in orders if order.customer_name == customer_name]
+        assert found_id(manager, "customer_name", customer_name) == min(customer_ids, default=None)
+
+
+def test_indexes_match_a_scan(backend):
+    manager = backend.open()
+    for seed in range(4):
+        run_operations(manager, 250, seed)
+        check_indexes(manager)
+    check_indexes(backend.restart())
+
+
+def test_indexes_follow_each_change(backend):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.add_order(Order("Bob", 2))
+    assert found_id(manager, "table_number", 1) == found_id(manager, "customer_name", "Ann") == 1
+    manager.change_customer_name(1, "Cy")
+    assert found_id(manager, "customer_name", "Ann") is None
+    assert found_id(manager, "customer_name", "Cy") == 1
+    manager.close_order(1)
+    # A closed order leaves its table free, and is still found by id and customer name.
+    assert found_id(manager, "table_number", 1) is None
+    assert found_id(manager, "id", 1) == found_id(manager, "customer_name", "Cy") == 1
+    manager.add_order(Order("Dee", 1))
+    assert found_id(manager, "table_number", 1) == 3
+    manager.remove_order("customer_name", "Bob")
+    assert found_id(manager, "id", 2) is None
+    assert found_id(manager, "table_number", 2) is None
+    with pytest.raises(LookupError):
+        manager.remove_order("id", 2)
@@ -0,0 +1,96 @@
+## test_journal.py
+## Recovery of an OrderManager from its journal: random operations across restarts,
+## a torn last record, a corrupted record, a snapshot plus the log after it, and the sync of an idle log.
+
+import os
+import time
+
+import pytest
+
+from src import OrderJournal as journal_module
+from src.OrderJournal import OrderJournal, LOG_PREFIX, SNAPSHOT_PREFIX, list_files, LOG_SUFFIX, SNAPSHOT_SUFFIX, verify
+from src.OrderManager import OrderManager
+from src.Order import Order
+from tests.operations import run_operations
+
+
+# Returns a manager recovered from the journal directory.
+def open_manager(directory, **journal_options):
+    return OrderManager(journal=OrderJournal(directory, **journal_options))
+
+
+def test_random_operations_survive_restarts(tmp_path):
+    journal = OrderJournal(tmp_path)
+    manager = OrderManager(journal=journal)
+    for seed in range(5):
+        run_operations(manager, 300, seed)
+        expected = manager.to_dict(timestamps=True)
+        totals = [manager.total_orders_price_by_status(status) for status in ("Pending", "Served", "Done", "All")]
+        journal.close()
+        journal = OrderJournal(tmp_path)
+        manager = OrderManager(journal=journal)
+        assert manager.to_dict(timestamps=True) == expected
+        assert [manager.total_orders_price_by_status(status) for status in ("Pending", "Served", "Done", "All")] == totals
+    journal.close()
+
+
+def test_torn_last_record_is_dropped(tmp_path):
+    manager = open_manager(tmp_path)
+    run_operations(manager, 200)
+    expected = manager.to_dict(timestamps=True)
+    _, log_name = list_files(tmp_path, LOG_PREFIX, LOG_SUFFIX)[-1]
+    with open(tmp_path / log_name, "a") as file:
+        file.write('0badc0de {"seq":999999,"op":"add_or')
+    assert verify(tmp_path)["torn_tail"]
+    manager = open_manager(tmp_path)
+    assert manager.to_dict(timestamps=True) == expected
+    # New records are appended after the last whole record.
+    manager.add_order(Order("Eve", 99))
+    expected = manager.to_dict(timestamps=True)
+    assert open_manager(tmp_path).to_dict(timestamps=True) == expected
+
+
+def test_corrupted_record_is_refused(tmp_path):
+    journal = OrderJournal(tmp_path)
+    manager = OrderManager(journal=journal)
+    run_operations(manager, 200)
+    journal.close()
+    report = verify(tmp_path)
+    assert report["last_seq"] == report["records_num"] == journal.seq
+    assert not report["torn_tail"]
+    _, log_name = list_files(tmp_path, LOG_PREFIX, LOG_SUFFIX)[-1]
+    lines = (tmp_path / log_name).read_bytes().splitlines(keepends=True)
+    lines[len(lines) // 2] = lines[len(lines) // 2].replace(b'"seq"', b'"SEQ"')
+    (tmp_path / log_name).write_bytes(b"".join(lines))
+    with pytest.raises(ValueError, match="corrupted record"):
+        verify(tmp_path)
+    # Nothing is loaded nor cut off: the journal is left as it was for a repair.
+    with pytest.raises(ValueError, match="corrupted record"):
+        open_manager(tmp_path)
+    assert (tmp_path / log_name).read_bytes() == b"".join(lines)
+
+
+def test_snapshot_and_its_tail(tmp_path):
+    manager = open_manager(tmp_path, snapshot_every=100)
+    run_operations(manager, 450)
+    expected = manager.to_dict(timestamps=True)
+    snapshots = list_files(tmp_path, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+    logs = list_files(tmp_path, LOG_PREFIX, LOG_SUFFIX)
+    assert len(snapshots) == 1
+    assert logs and logs[0][0] == snapshots[0][0] + 1
+    assert open_manager(tmp_path, snapshot_every=100).to_dict(timestamps=True) == expected
+
+
+def test_idle_log_is_synced(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(journal_module.os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+    manager = open_manager(tmp_path, sync_every=1000, sync_interval=0.05)
+    manager.add_order(Order("Ann", 1))
+    synced.clear()
+    manager.add_order(Order("Bob", 2))
+    manager.add_order(Order("Cy", 3))
+    deadline = time.monotonic() + 2
+    while not synced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert synced
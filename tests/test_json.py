@@ -0,0 +1,61 @@
+## test_json.py
+## The orders and dishes write themselves as JSON (to_json) exactly as json.dumps writes their dicts
+## (to_dict) with sorted keys, compact separators and ensure_ascii, as jsonify does.
+
+import json
+import math
+
+import pytest
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderView import OrderView
+
+# Odd values: a bool quantity and unit price, floats written with an exponent or not, non-ASCII and control characters.
+DISHES = [("Soupé", 2, 6.5), ("Tea", True, 1.1), ("李雷", 1, 1e-05), ("emoji 😀", 3, 1e17),
+          ("ctl \x7f\x01\n\"\\", 1, 0.00012), ("Cake", 7, 2.675), ("Flag", 2, True), ("Big", 10 ** 20, 3)]
+NAMES = ["Ann", "Zoë", "2eggs", "tab\there"]
+
+
+# Returns json.dumps of a dict the way jsonify writes it.
+def dumps(data):
+    return json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=True)
+
+
+# Returns orders with the DISHES spread over them, some served and one closed.
+def make_orders():
+    orders = []
+    for index, name in enumerate(NAMES):
+        order = Order(name, index + 1)
+        order.id = index + 1
+        for dish_name, quantity, unit_price in DISHES[index::len(NAMES)]:
+            order.add_dish(Dish(dish_name, quantity, unit_price))
+        orders.append(order)
+    orders[1].update_dish_status(orders[1].dishes[0].name, "Served")
+    orders[2].status = "Done"
+    return orders
+
+
+@pytest.mark.parametrize("timestamps", [True, False])
+def test_to_json_matches_json_dumps(timestamps):
+    for order in make_orders():
+        assert order.to_json(timestamps) == dumps(order.to_dict(timestamps))
+        view = OrderView(order.to_dict(timestamps=True))
+        assert view.to_json(timestamps) == dumps(view.to_dict(timestamps))
+        for dish, dish_view in zip(order.dishes, view.dishes):
+            assert dish.to_json(timestamps) == dumps(dish.to_dict(timestamps))
+            assert dish_view.to_json(timestamps) == dumps(dish_view.to_dict(timestamps))
+
+
+def test_bool_quantity_is_written_as_true():
+    dish = Dish("Tea", True, 1.1)
+    assert json.loads(dish.to_json())["quantity"] is True
+
+
+def test_to_json_follows_changes():
+    order = make_orders()[0]
+    order.to_json()
+    order.update_dish_quantity(order.dishes[0].name, 5)
+    order.customer_name = "Bea"
+    assert order.to_json() == dumps(order.to_dict())
+    assert math.isclose(json.loads(order.to_json())["total_price"], order.compute_total_price())
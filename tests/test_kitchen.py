@@ -0,0 +1,71 @@
+## test_kitchen.py
+## The kitchen queue: the dishes record when they became Pending, and the ones that waited longest
+## come first, through the manager (across restarts) and GET /kitchen/next. The timestamps are left out
+## of the dicts unless asked for.
+
+import itertools
+
+import pytest
+
+from src import Dish as dish_module
+from src.Dish import Dish
+from src.Order import Order
+
+
+# A clock that moves one second per reading, so every dish becomes Pending at its own time.
+@pytest.fixture
+def clock(monkeypatch):
+    now = itertools.count(1_700_000_000)
+    monkeypatch.setattr(dish_module.time, "time", lambda: float(next(now)))
+
+
+# Returns the (table number, dish name) of the next pending dishes.
+def next_dishes(manager, limit=10):
+    return [(entry["table_number"], entry["dish"]["name"]) for entry in manager.next_pending_dishes(limit)]
+
+
+def test_oldest_pending_dishes_come_first(backend, clock):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.add_order(Order("Bob", 2))
+    manager.add_dish_to_order(1, Dish("Soup", 1, 4.5))
+    manager.add_dish_to_order(2, Dish("Steak", 1, 20))
+    manager.add_dish_to_order(1, Dish("Tea", 1, 2))
+    assert next_dishes(manager, 2) == [(1, "Soup"), (2, "Steak")]
+    manager.update_dish_status(1, "Soup", "Served")
+    assert next_dishes(manager) == [(2, "Steak"), (1, "Tea")]
+    # More of a served dish sends it back to the kitchen, as the newest one.
+    manager.update_dish_quantity(1, "Soup", 2)
+    assert next_dishes(manager) == [(2, "Steak"), (1, "Tea"), (1, "Soup")]
+    manager.remove_dish_from_order(2, "Steak")
+    assert next_dishes(manager) == [(1, "Tea"), (1, "Soup")]
+    pending_since = [entry["dish"]["pending since"] for entry in manager.next_pending_dishes(10)]
+    assert pending_since == sorted(pending_since)
+    manager = backend.restart()
+    assert next_dishes(manager) == [(1, "Tea"), (1, "Soup")]
+    assert [entry["dish"]["pending since"] for entry in manager.next_pending_dishes(10)] == pending_since
+    manager.close_order(1)
+    assert next_dishes(manager) == []
+
+
+def test_timestamps_are_left_out_unless_asked():
+    order = Order("Ann", 1)
+    order.add_dish(Dish("Soup", 1, 4.5))
+    assert "opened_at" not in order.to_dict() and "pending since" not in order.to_dict()["dishes"][0]
+    assert "opened_at" not in order.to_json()
+    data = order.to_dict(timestamps=True)
+    assert data["opened_at"] == order.opened_at
+    assert data["dishes"][0]["pending since"] == order.dishes[0].pending_since
+    assert Order.from_dict(data).to_dict(timestamps=True) == data
+
+
+def test_kitchen_next_route(client, clock):
+    for table_number, dish_name in ((1, "Soup"), (2, "Steak"), (3, "Tea")):
+        client.post("/add_order", json={"customer_name": "Ann", "table_number": table_number})
+        client.put(f"/orders/{table_number}/dishes/add", json={"name": dish_name, "quantity": 1, "unit_price": 3})
+    response = client.get("/kitchen/next?limit=2")
+    assert response.status_code == 200
+    dishes = response.get_json()["dishes"]
+    assert [(entry["table_number"], entry["dish"]["name"]) for entry in dishes] == [(1, "Soup"), (2, "Steak")]
+    assert dishes[0]["dish"]["pending since"] < dishes[1]["dish"]["pending since"]
+    assert client.get("/kitchen/next?limit=0").status_code == 400
@@ -0,0 +1,44 @@
+## test_memory_store.py
+## Paging through the MemoryOrderStore orders: by bisection in the sorted ids, across removals
+## (and the compaction of the removed ids) and orders stored with an older id.
+
+from src.MemoryOrderStore import MemoryOrderStore
+from src.Order import Order
+
+
+# Returns a stored order with the id.
+def make_order(order_id):
+    order = Order(f"Customer {order_id}", order_id % 7 + 1)
+    order.id = order_id
+    return order
+
+
+def test_pages_skip_removed_orders():
+    store = MemoryOrderStore()
+    orders = {order_id: make_order(order_id) for order_id in range(1, 301)}
+    store.add_many(orders.values())
+    for order_id in range(1, 301, 3):
+        store.remove(orders.pop(order_id))
+    assert [order.id for order in store.orders()] == sorted(orders)
+    assert [order.id for order in store.orders(150)] == [order_id for order_id in sorted(orders) if order_id > 150]
+
+
+def test_page_being_read_survives_changes():
+    store = MemoryOrderStore()
+    orders = {order_id: make_order(order_id) for order_id in range(1, 201)}
+    store.add_many(orders.values())
+    page = store.orders(100)
+    assert next(page).id == 101
+    for order_id in range(1, 200):
+        store.remove(orders.pop(order_id))   # compacts the ids
+    store.add(make_order(201))
+    assert [order.id for order in page] == [200]
+    assert [order.id for order in store.orders()] == [200, 201]
+
+
+def test_older_ids_are_paged_in_order():
+    store = MemoryOrderStore()
+    for order_id in (5, 9, 2, 7):
+        store.add(make_order(order_id))
+    assert [order.id for order in store.orders()] == [2, 5, 7, 9]
+    assert [order.id for order in store.orders(5)] == [7, 9]
@@ -0,0 +1,73 @@
+## test_menu.py
+## The menu registry: dishes ordered by menu id (or by the name and price of an item) reference the
+## shared item, ad-hoc dishes are still accepted, through the manager and the app.
+
+import pytest
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Menu import Menu
+from src.Order import Order
+from src.OrderManager import BatchError
+from tests.conftest import Backend
+
+
+# Returns a menu of two items.
+def make_menu():
+    menu = Menu()
+    menu.add("Soup", 4.5)
+    menu.add("Steak", 20, 7)
+    return menu
+
+
+def test_dishes_reference_the_menu_items(backend):
+    menu = make_menu()
+    backend = Backend(backend.kind, backend.directory, menu=menu)
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.apply_batch([{"table_number": 1, "action": "add", "menu_id": 7, "quantity": 2}])
+    manager.add_dish_to_order(1, Dish("Soup", 1, 4.5))
+    manager.add_dish_to_order(1, Dish("Tea", 1, 2))
+    order = manager.find_order("table_number", 1)
+    dishes = {dish.name: dish for dish in order.dishes}
+    # The SQLite store builds the dishes anew from their rows on every read, the other stores keep them.
+    if backend.kind != "sqlite":
+       assert dishes["Steak"].menu_item is menu.get(7)
+       assert dishes["Soup"].menu_item is menu.get(1)
+    assert dishes["Tea"].menu_item is None
+    assert manager.get_order_price(1) == 46.5
+    with pytest.raises(BatchError) as error:
+        manager.apply_batch([{"table_number": 1, "action": "add", "menu_id": 99, "quantity": 1}])
+    assert isinstance(error.value.error, LookupError)
+    manager = backend.restart()
+    assert manager.get_order_price(1) == 46.5
+    assert manager.get_dish_unit_price(1, "Steak") == 20
+    backend.close()
+
+
+def test_menu_rejects_repeats():
+    menu = make_menu()
+    with pytest.raises(ValueError):
+        menu.add("Soup", 5)
+    with pytest.raises(ValueError):
+        menu.add("Cake", 5, 7)
+    assert menu.add("Cake", 5).id == 8
+    # A dish named after an item with another price stays ad-hoc.
+    dish = Dish("Soup", 1, 5)
+    assert not dish.link_menu_item(menu.find_by_name("Soup"))
+    assert dish.menu_item is None
+
+
+def test_menu_routes(client, monkeypatch):
+    monkeypatch.setattr(app_module, "menu", make_menu())
+    app_module.order_manager.menu = app_module.menu
+    assert client.get("/menu").get_json() == {"items": [{"id": 1, "name": "Soup", "unit price": 4.5},
+                                                        {"id": 7, "name": "Steak", "unit price": 20}]}
+    assert client.get("/menu/7").get_json()["name"] == "Steak"
+    assert client.get("/menu/8").status_code == 404
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    assert client.put("/orders/1/dishes/add", json={"menu_id": 1, "quantity": 2}).status_code == 200
+    assert client.put("/orders/1/dishes/add", json={"menu_id": 8, "quantity": 1}).status_code == 404
+    assert client.put("/orders/1/dishes/add", json={"name": "Tea", "quantity": 1, "unit_price": 2}).status_code == 200
+    assert client.get("/orders/1/price").get_json()["total_price"] == 11
+    assert client.get("/orders/1/dishes/Soup/unit_price").get_json()["unit_price"] == 4.5
@@ -0,0 +1,70 @@
+## test_metrics.py
+## The requests are counted by route and status code and timed per route, the instrumented manager
+## calls are timed, and all of it is exposed at GET /metrics in the Prometheus text format.
+
+import pytest
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Metrics import Metrics
+from src.Order import Order
+from src.OrderManager import OrderManager
+
+PRICE_ROUTE = 'route="/orders/<int:table_number>/price"'
+
+
+# Returns the samples of a Prometheus text page: series (name and labels) -> value.
+def samples(text):
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+           series, value = line.rsplit(" ", 1)
+           values[series] = float(value)
+    return values
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(app_module, "metrics", metrics)
+    return metrics
+
+
+def test_requests_are_counted_and_timed(client, metrics):
+    client.get("/orders/1/price")
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    client.get("/orders/1/price")
+    client.get("/orders/1/price")
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.content_type.startswith("text/plain")
+    values = samples(response.get_data(as_text=True))
+    assert values[f'http_requests_total{{method="GET",{PRICE_ROUTE},status="200"}}'] == 2
+    assert values[f'http_requests_total{{method="GET",{PRICE_ROUTE},status="404"}}'] == 1
+    assert values['http_requests_total{method="POST",route="/add_order",status="201"}'] == 1
+    assert values[f'http_request_duration_seconds_count{{method="GET",{PRICE_ROUTE}}}'] == 3
+    buckets = [value for series, value in values.items()
+               if series.startswith(f'http_request_duration_seconds_bucket{{method="GET",{PRICE_ROUTE}')]
+    assert buckets == sorted(buckets) and buckets[-1] == 3
+
+
+def test_manager_calls_are_timed():
+    metrics = Metrics()
+    manager = OrderManager()
+    metrics.instrument(manager, ("find_order", "add_dish_to_order", "to_dict"))
+    manager.add_order(Order("Ann", 1))
+    for dish_name in ("Soup", "Tea"):
+        manager.add_dish_to_order(1, Dish(dish_name, 1, 2))
+    manager.find_order("id", 1)
+    manager.to_dict()
+    values = samples(metrics.render())
+    assert values['order_manager_call_duration_seconds_count{method="add_dish_to_order"}'] == 2
+    assert values['order_manager_call_duration_seconds_count{method="to_dict"}'] == 1
+    # The calls the manager makes to itself are timed too.
+    assert values['order_manager_call_duration_seconds_count{method="find_order"}'] >= 3
+    assert manager.get_order_price(1) == 4
+
+
+def test_metrics_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(app_module, "metrics", None)
+    assert client.get("/orders/1/price").status_code == 404
+    assert client.get("/metrics").status_code == 404
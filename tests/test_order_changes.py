@@ -0,0 +1,64 @@
+## test_order_changes.py
+## The orders changed since a version, for terminals that keep a copy in sync: the changed orders and
+## the removed ids since the version, or all the orders when the changes since it are no longer known,
+## through the manager and GET /orders/changes.
+
+from src.ChangeLog import ChangeLog
+from src.Dish import Dish
+from src.Order import Order
+from tests.conftest import Backend
+
+
+def test_changes_since_a_version(backend):
+    manager = Backend(backend.kind, backend.directory, change_log=ChangeLog()).open()
+    for table_number in (1, 2, 3):
+        manager.add_order(Order("Ann", table_number))
+    version = manager.version
+    manager.add_dish_to_order(2, Dish("Soup", 1, 4.5))
+    manager.remove_order("table_number", 3)
+    manager.add_order(Order("Bob", 4))
+    changes = manager.changes_since(version)
+    assert changes["version"] == manager.version and not changes["full"]
+    assert [order["id"] for order in changes["orders"]] == [2, 4]
+    assert changes["orders"][0]["dishes"][0]["name"] == "Soup"
+    assert changes["removed"] == [3]
+    assert manager.changes_since(manager.version) == {"version": manager.version, "full": False,
+                                                      "orders": [], "removed": []}
+    # A new client gets all the orders.
+    changes = manager.changes_since(0)
+    assert changes["full"] and [order["id"] for order in changes["orders"]] == [1, 2, 4]
+    backend.close()
+
+
+def test_changes_acknowledged_by_every_client_are_compacted(backend):
+    manager = Backend(backend.kind, backend.directory, change_log=ChangeLog()).open()
+    manager.add_order(Order("Ann", 1))
+    first = manager.version
+    manager.add_order(Order("Bob", 2))
+    second = manager.version
+    manager.changes_since(first, client="pos-1")
+    manager.changes_since(second, client="pos-2")
+    assert manager.change_log.floor == first
+    manager.changes_since(second, client="pos-1")
+    assert manager.change_log.floor == second
+    assert len(manager.change_log) == 0
+    # A client behind the floor resyncs fully.
+    assert manager.changes_since(first)["full"]
+    backend.close()
+
+
+def test_changes_route(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    first = client.get("/orders/changes").get_json()
+    assert first["full"] and [order["id"] for order in first["orders"]] == [1]
+    assert "opened_at" not in first["orders"][0]
+    client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 1, "unit_price": 4.5})
+    client.post("/add_order", json={"customer_name": "Bob", "table_number": 2})
+    client.delete("/remove_order/table_number/2")
+    changes = client.get(f"/orders/changes?since={first['version']}&epoch={first['epoch']}").get_json()
+    assert not changes["full"]
+    assert [order["total_price"] for order in changes["orders"]] == [4.5]
+    assert changes["removed"] == [2]
+    # A version of another process counts for nothing.
+    assert client.get(f"/orders/changes?since={first['version']}&epoch=other").get_json()["full"]
+    assert client.get("/orders/changes?since=-1").status_code == 400
@@ -0,0 +1,76 @@
+## test_order_dishes.py
+## The dishes of an order are looked up by name and its pending dishes counted as they change:
+## random changes are checked against a plain list of the dishes, and the order status follows the count.
+
+import random
+
+import pytest
+
+from src.Dish import Dish
+from src.Order import Order
+
+DISH_NAMES = ("Soup", "Steak", "Salad", "Tea", "Cake")
+
+
+# Checks the order against the expected (name, status) of its dishes, in the order they were added.
+def check_order(order, expected):
+    assert [(dish.name, dish.status) for dish in order.dishes] == expected
+    assert order.dishes_num == len(expected)
+    assert order.pending_dishes_num == sum(status == "Pending" for _, status in expected)
+    if expected:
+       assert order.status == ("Pending" if order.pending_dishes_num else "Served")
+    for dish_name in DISH_NAMES:
+        exists = dish_name in dict(expected)
+        assert order.is_dish_exists_in_order(dish_name) == exists
+        if exists:
+           assert order.find_dish_by_name(dish_name).name == dish_name
+        else:
+           with pytest.raises(LookupError):
+               order.find_dish_by_name(dish_name)
+
+
+def test_random_dish_changes():
+    rnd = random.Random(3)
+    order = Order("Ann", 1)
+    expected = []
+    for _ in range(500):
+        dish_name = rnd.choice(DISH_NAMES)
+        names = [name for name, _ in expected]
+        choice = rnd.random()
+        if dish_name not in names:
+           order.add_dish(Dish(dish_name, rnd.randint(1, 3), 2.5))
+           expected.append((dish_name, "Pending"))
+        elif choice < 0.2:
+           order.remove_dish(dish_name)
+           del expected[names.index(dish_name)]
+        elif choice < 0.7:
+           status = rnd.choice(("Pending", "Served"))
+           order.update_dish_status(dish_name, status)
+           expected[names.index(dish_name)] = (dish_name, status)
+        else:
+           dish = order.find_dish_by_name(dish_name)
+           quantity = rnd.randint(1, 5)
+           status = "Pending" if quantity > dish.quantity else dish.status
+           order.update_dish_quantity(dish_name, quantity)
+           expected[names.index(dish_name)] = (dish_name, status)
+        check_order(order, expected)
+    with pytest.raises(ValueError):
+        order.add_dish(Dish(expected[0][0], 1, 1))
+
+
+def test_order_status_follows_the_dishes(backend):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    for dish_name in DISH_NAMES:
+        manager.add_dish_to_order(1, Dish(dish_name, 1, 2))
+    for dish_name in DISH_NAMES[:-1]:
+        manager.update_dish_status(1, dish_name, "Served")
+        assert manager.get_order_status(1) == "Pending"
+    manager.remove_dish_from_order(1, DISH_NAMES[-1])
+    assert manager.get_order_status(1) == "Served"
+    manager = backend.restart()
+    order = manager.find_order("table_number", 1)
+    assert (order.status, order.pending_dishes_num, order.dishes_num) == ("Served", 0, len(DISH_NAMES) - 1)
+    manager.update_dish_quantity(1, "Soup", 3)
+    assert manager.get_order_status(1) == "Pending"
+    assert manager.get_dish_status(1, "Soup") == "Pending"
@@ -0,0 +1,114 @@
+## test_order_manager.py
+## The public OrderManager operations, on every store backend (see conftest.py), including restarts.
+
+import pytest
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import BatchError
+from tests.conftest import BACKENDS, Backend
+from tests.operations import run_operations
+
+STATUSES = ("Pending", "Served", "Done", "All")
+
+
+def test_order_lifecycle(backend):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.add_order(Order("Bob", 2))
+    manager.add_dish_to_order(1, Dish("Soup", 2, 4.5))
+    manager.add_dish_to_order(1, Dish("Steak", 1, 20))
+    manager.update_dish_status(1, "Soup", "Served")
+    assert manager.get_order_price(1) == 29
+    assert manager.get_order_status(1) == "Pending"
+    assert manager.get_dish_status(1, "Soup") == "Served"
+    assert manager.get_dish_unit_price(1, "Steak") == 20
+    assert [dish.name for dish in manager.get_table_dishes_by_status(1, "Pending")] == ["Steak"]
+    manager.update_dish_status(1, "Steak", "Served")
+    assert manager.get_order_status(1) == "Served"
+    manager.change_customer_name(2, "Cy")
+    assert manager.get_customer_name(2) == "Cy"
+    assert manager.find_order("customer_name", "Cy").table_number == 2
+    assert manager.close_order(1) == 29
+    with pytest.raises(LookupError):
+        manager.find_order("table_number", 1)
+    assert manager.find_order("id", 1).status == "Done"
+    assert (manager.created_orders_num, manager.stored_orders_num, manager.active_orders_num) == (2, 2, 1)
+    assert manager.total_orders_price_by_status("Done") == 29
+    assert manager.get_table_numbers_by_order_status("Done") == [1]
+    manager.remove_order("table_number", 2)
+    assert (manager.created_orders_num, manager.stored_orders_num, manager.active_orders_num) == (2, 1, 0)
+
+    manager = backend.restart()
+    assert (manager.created_orders_num, manager.stored_orders_num, manager.active_orders_num) == (2, 1, 0)
+    assert manager.find_order("id", 1).get_total_price() == 29
+    manager.add_order(Order("Dee", 1))
+    assert manager.find_order("table_number", 1).id == 3
+
+
+def test_rejected_batch_changes_nothing(backend):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.add_dish_to_order(1, Dish("Soup", 1, 4.5))
+    before = manager.to_dict(timestamps=True)
+    with pytest.raises(BatchError):
+        manager.apply_batch([{"table_number": 1, "action": "add", "name": "Tea", "quantity": 1, "unit_price": 2},
+                             {"table_number": 1, "action": "remove", "name": "Cake"}])
+    assert manager.to_dict(timestamps=True) == before
+    assert backend.restart().to_dict(timestamps=True) == before
+
+
+def test_reads(backend):
+    manager = backend.open()
+    run_operations(manager, 400)
+    orders = manager.orders
+    page = manager.summary_page(5)
+    assert [order["id"] for order in page["orders"]] == [order.id for order in orders[:5]]
+    assert [order.id for order in manager.iter_orders(status="Done")] == [order.id for order in orders
+                                                                           if order.status == "Done"]
+    # Archived orders are left out.
+    live_ids = {order.id for order in manager.snapshot().live_orders}
+    pending = [dish.to_dict() for order in orders if order.id in live_ids for dish in order.get_dishes_by_status("Pending")]
+    assert [dish.to_dict() for dish in manager.get_all_dishes_by_status("Pending")] == pending
+    for status in STATUSES:
+        expected = sum(order.get_total_price() for order in orders if status in ("All", order.status))
+        assert manager.total_orders_price_by_status(status) == pytest.approx(expected)
+    manager.verify_totals()
+
+
+def test_random_operations_survive_restarts(backend):
+    manager = backend.open()
+    for seed in range(3):
+        run_operations(manager, 300, seed)
+        expected = manager.to_dict(timestamps=True)
+        totals = [manager.total_orders_price_by_status(status) for status in STATUSES]
+        manager = backend.restart()
+        assert manager.to_dict(timestamps=True) == expected
+        assert [manager.total_orders_price_by_status(status) for status in STATUSES] == pytest.approx(totals)
+        manager.verify_totals()
+
+
+def test_backends_agree(tmp_path):
+    states = []
+    for kind in BACKENDS:
+        backend = Backend(kind, tmp_path / kind)
+        (tmp_path / kind).mkdir()
+        manager = backend.open()
+        run_operations(manager, 600, seed=7)
+        states.append(manager.to_dict())  # Without the opening and pending times, which depend on when it ran.
+        backend.close()
+    assert states[0] == states[1]
+
+
+def test_snapshots_follow_changes(backend):
+    manager = backend.open()
+    run_operations(manager, 200)
+    for seed in range(1, 6):
+        before = manager.snapshot()
+        before_orders = [order.to_dict() for order in before.orders()]
+        run_operations(manager, 40, seed=seed)
+        snapshot = manager.snapshot()
+        assert [order.to_dict() for order in before.orders()] == before_orders
+        assert [order.to_dict() for order in snapshot.orders()] == [order.to_dict() for order in manager.orders]
+        for status in STATUSES:
+            assert snapshot.total_price_by_status(status) == pytest.approx(manager.total_orders_price_by_status(status))
@@ -0,0 +1,47 @@
+## test_response_timestamps.py
+## The responses write the orders and dishes with the fields they had before the timestamps were recorded,
+## unless the encoder is made with timestamps (ORDERS_RESPONSE_TIMESTAMPS=1).
+
+import json
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.ResponseEncoder import ResponseEncoder, orjson
+
+ORDER_FIELDS = {"id", "customer_name", "table_number", "dishes", "status", "total_price"}
+DISH_FIELDS = {"name", "unit price", "quantity", "status", "total price"}
+
+
+# Returns a manager with one order of two dishes.
+def make_manager():
+    manager = OrderManager()
+    manager.add_order(Order("Ann", 1))
+    manager.add_dish_to_order(1, Dish("Soup", 2, 6.5))
+    manager.add_dish_to_order(1, Dish("Tea", 1, 1.1))
+    return manager
+
+
+def test_orders_are_written_without_timestamps():
+    manager = make_manager()
+    encoders = [ResponseEncoder("json")] + ([ResponseEncoder("orjson")] if orjson is not None else [])
+    for encoder in encoders:
+        for response, indent in ((manager.summary(), None), (manager.summary(), 2),
+                                 ({"order": manager.find_order("table_number", 1)}, None)):
+            orders = json.loads(encoder.encode(response, indent))
+            order = orders["orders"][0] if "orders" in orders else orders["order"]
+            assert set(order) == ORDER_FIELDS
+            assert all(set(dish) == DISH_FIELDS for dish in order["dishes"])
+
+
+def test_timestamps_are_written_when_asked():
+    manager = make_manager()
+    order = json.loads(ResponseEncoder(timestamps=True).encode(manager.find_order("table_number", 1)))
+    assert order == manager.find_order("table_number", 1).to_dict(timestamps=True)
+    assert set(order) == ORDER_FIELDS | {"opened_at"}
+
+
+def test_kitchen_queue_keeps_pending_since():
+    dishes = json.loads(ResponseEncoder().encode({"dishes": make_manager().next_pending_dishes(5)}))["dishes"]
+    assert [dish["dish"]["name"] for dish in dishes] == ["Soup", "Tea"]
+    assert all("pending since" in dish["dish"] for dish in dishes)
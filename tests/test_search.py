@@ -0,0 +1,57 @@
+## test_search.py
+## Searching the orders by customer name: the ones whose name starts with a prefix, ignoring case,
+## closed and archived orders included, ordered by name then id, following renames and removals,
+## through the manager and GET /orders/search.
+
+import pytest
+
+from src.Order import Order
+from tests.conftest import ARCHIVE_AFTER
+
+
+# Returns the ids of the orders found by a search.
+def found(manager, name, limit=100):
+    return [order.id for order in manager.search_orders(name, limit)]
+
+
+def test_search_orders(backend):
+    manager = backend.open()
+    for table_number, name in enumerate(("anna", "Bob", "Ann", "ANDY", "Annie", "bo"), 1):
+        manager.add_order(Order(name, table_number))
+    # Closes more orders than the archive backend keeps, so some are searched in the archive.
+    for table_number in range(1, ARCHIVE_AFTER + 3):
+        manager.close_order(table_number)
+    assert found(manager, "an") == [4, 3, 1, 5]
+    assert found(manager, "ANN") == [3, 1, 5]
+    assert found(manager, "an", 2) == [4, 3]
+    assert found(manager, "b") == [6, 2]
+    assert found(manager, "z") == []
+    manager.change_customer_name(5, "Zed")
+    manager.remove_order("table_number", 6)
+    assert found(manager, "ann") == [3, 1]
+    assert found(manager, "z") == [5]
+    assert found(manager, "b") == [2]
+    manager = backend.restart()
+    assert found(manager, "an") == [4, 3, 1]
+    assert found(manager, "z") == [5]
+
+
+@pytest.mark.parametrize("name, limit, error", [(None, 10, ValueError), (5, 10, TypeError), (" ", 10, ValueError),
+                                                ("a", 0, ValueError), ("a", 1001, ValueError)])
+def test_invalid_search(backend, name, limit, error):
+    with pytest.raises(error):
+        backend.open().search_orders(name, limit)
+
+
+def test_search_route(client):
+    for table_number, name in enumerate(("Ann", "bob", "annie"), 1):
+        client.post("/add_order", json={"customer_name": name, "table_number": table_number})
+    client.put("/orders/1/close")
+    response = client.get("/orders/search?name=AN&limit=5")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["name"] == "AN" and [order["customer_name"] for order in body["orders"]] == ["Ann", "annie"]
+    assert body["orders"][0]["status"] == "Done"
+    assert [order["id"] for order in client.get("/orders/search?name=an&limit=1").get_json()["orders"]] == [1]
+    assert client.get("/orders/search").status_code == 400
+    assert client.get("/orders/search?name=a&limit=0").status_code == 400
@@ -0,0 +1,69 @@
+## test_shards.py
+## The shard servers unpickle the requests of the workers, so they only serve workers that know
+## their authkey, over sockets in a directory private to the current user.
+
+import os
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+
+import pytest
+
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.ShardServer import ShardServer, secure_socket_dir, socket_paths
+from src.ShardedOrderManager import ShardedOrderManager
+
+AUTHKEY = b"shard secret"
+
+
+# Starts a shard server in a thread, returns the socket path.
+def start_server(socket_dir):
+    secure_socket_dir(socket_dir)
+    address = socket_paths(socket_dir, 1)[0]
+    manager = OrderManager()
+    manager.add_order(Order("Ann", 1))
+    threading.Thread(target=ShardServer(manager, address, AUTHKEY).serve_forever, daemon=True).start()
+    while not os.path.exists(address):
+        time.sleep(0.01)
+    return address
+
+
+def test_existing_socket_dir_is_made_private(tmp_path):
+    socket_dir = tmp_path / "sockets"
+    socket_dir.mkdir(mode=0o755)
+    os.chmod(socket_dir, 0o755)
+    secure_socket_dir(str(socket_dir))
+    assert stat.S_IMODE(os.stat(socket_dir).st_mode) == 0o700
+
+
+def test_socket_dir_must_be_a_directory(tmp_path):
+    (tmp_path / "target").mkdir()
+    (tmp_path / "link").symlink_to(tmp_path / "target")
+    with pytest.raises(ValueError):
+        secure_socket_dir(str(tmp_path / "link"))
+
+
+def test_authkey_is_required(tmp_path):
+    with pytest.raises(ValueError):
+        ShardServer(OrderManager(), str(tmp_path / "shard-0.sock"), None)
+    with pytest.raises(ValueError):
+        ShardedOrderManager([str(tmp_path / "shard-0.sock")], None)
+
+
+def test_only_workers_with_the_authkey_are_served(tmp_path):
+    address = start_server(str(tmp_path / "sockets"))
+    assert ShardedOrderManager([address], AUTHKEY).get_customer_name(1) == "Ann"
+    with pytest.raises(AuthenticationError):
+        ShardedOrderManager([address], b"wrong secret").get_customer_name(1)
+
+
+def test_versions_change_when_a_shard_restarts(tmp_path):
+    before = ShardedOrderManager([start_server(str(tmp_path / "before"))], AUTHKEY)
+    # The restarted shard made as many changes as the old one, so only its epoch tells them apart.
+    after = ShardedOrderManager([start_server(str(tmp_path / "after"))], AUTHKEY)
+    assert before.version != after.version
+    assert before.table_version(1) != after.table_version(1)
+    assert before.version == before.version
+    assert before.table_version(1) == before.table_version(1)
@@ -0,0 +1,46 @@
+## test_slots.py
+## Dish and Order keep their attributes in slots (no per-instance __dict__), with the same validating
+## setters and the same dict output, through the manager and the app.
+
+import pytest
+
+from src.Dish import Dish
+from src.Order import Order
+
+ORDER_FIELDS = {"id", "customer_name", "table_number", "dishes", "status", "total_price", "opened_at"}
+DISH_FIELDS = {"name", "unit price", "quantity", "status", "total price", "pending since"}
+
+
+def test_orders_and_dishes_have_no_dict(backend):
+    manager = backend.open()
+    manager.add_order(Order("Ann", 1))
+    manager.add_dish_to_order(1, Dish("Soup", 2, 4.5))
+    order = manager.find_order("table_number", 1)
+    for value in (order, order.dishes[0], Order("Bob", 2), Dish("Tea", 1, 2)):
+        assert not hasattr(value, "__dict__")
+        with pytest.raises(AttributeError):
+            value.note = "no room for it"
+    data = order.to_dict(timestamps=True)
+    assert set(data) == ORDER_FIELDS and set(data["dishes"][0]) == DISH_FIELDS
+    assert Order.from_dict(data).to_dict(timestamps=True) == data
+
+
+def test_setters_still_validate():
+    dish = Dish("Soup", 2, 4.5)
+    for attribute, value, error in (("quantity", 0, ValueError), ("quantity", "2", TypeError),
+                                    ("unit_price", -1, ValueError), ("status", "Cold", ValueError)):
+        with pytest.raises(error):
+            setattr(dish, attribute, value)
+    assert (dish.quantity, dish.unit_price, dish.status) == (2, 4.5, "Pending")
+    order = Order("Ann", 1)
+    for attribute, value, error in (("table_number", 0, ValueError), ("customer_name", 7, TypeError)):
+        with pytest.raises(error):
+            setattr(order, attribute, value)
+
+
+def test_app_rejects_invalid_dishes(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    assert client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": "2", "unit_price": 4.5}).status_code == 400
+    assert client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 2, "unit_price": -4.5}).status_code == 400
+    assert client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 2, "unit_price": 4.5}).status_code == 200
+    assert client.get("/orders/1/price").get_json()["total_price"] == 9
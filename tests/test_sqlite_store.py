@@ -0,0 +1,50 @@
+## test_sqlite_store.py
+## The SQLite store reads the orders page by page, returning its connection to the pool between pages,
+## and a request that finds no free connection in time fails (503) instead of waiting forever.
+
+import pytest
+
+from src import app as app_module
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import OrderManager
+from src.SQLiteOrderStore import SQLiteOrderStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteOrderStore(str(tmp_path / "orders.db"), pool_size=1, pool_timeout=0.2, page_size=3)
+    yield store
+    store.close()
+
+
+# Returns a manager on the store with orders_num orders, each with a dish.
+def fill(store, orders_num):
+    manager = OrderManager(store=store)
+    for table_number in range(1, orders_num + 1):
+        manager.add_order(Order(f"Customer {table_number}", table_number))
+        manager.add_dish_to_order(table_number, Dish("Soup", table_number, 2.5))
+    return manager
+
+
+def test_orders_are_read_page_by_page(store):
+    fill(store, 10)
+    orders = store.orders()
+    first = next(orders)
+    # The only connection is free while the reader is between orders.
+    assert store.get_by_id(5).dishes[0].quantity == 5
+    rest = list(orders)
+    assert [order.id for order in [first] + rest] == list(range(1, 11))
+    assert [order.dishes[0].quantity for order in rest] == list(range(2, 11))
+    assert [order.id for order in store.orders(after_id=7)] == [8, 9, 10]
+
+
+def test_busy_pool_answers_503(store):
+    app_module.order_manager = fill(store, 2)
+    client = app_module.app.test_client()
+    with store._SQLiteOrderStore__connection():
+        with pytest.raises(TimeoutError):
+            store.get_by_id(1)
+        response = client.get("/orders/1/price")
+    assert response.status_code == 503
+    assert client.get("/orders/1/price").status_code == 200
@@ -0,0 +1,55 @@
+## test_tables.py
+## The snapshots of the orders at tables for POS screens: the fields asked for of each active order,
+## in the order of the tables, and the tables without one in 'not_found', through the manager
+## and GET /orders/<table_number>, GET /orders?tables=.
+
+import pytest
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderManager import TABLE_FIELDS, OrderManager
+
+
+def test_get_tables(backend):
+    manager = backend.open()
+    for table_number, name in ((1, "Ann"), (2, "Bob"), (3, "Cy")):
+        manager.add_order(Order(name, table_number))
+    manager.add_dish_to_order(1, Dish("Soup", 2, 4.5))
+    manager.add_dish_to_order(1, Dish("Tea", 1, 2))
+    manager.update_dish_status(1, "Tea", "Served")
+    manager.close_order(3)
+    tables = manager.get_tables("3, 1,4,1", "customer_name,total_price,pending_dishes,served_dishes")
+    assert tables["not_found"] == [3, 4]
+    assert len(tables["orders"]) == 1
+    snapshot = tables["orders"][0]
+    assert list(snapshot) == ["table_number", "customer_name", "total_price", "pending_dishes", "served_dishes"]
+    assert snapshot["table_number"] == 1 and snapshot["customer_name"] == "Ann" and snapshot["total_price"] == 11
+    assert [dish["name"] for dish in snapshot["pending_dishes"]] == ["Soup"]
+    assert [dish["name"] for dish in snapshot["served_dishes"]] == ["Tea"]
+    snapshot = manager.get_tables([2])["orders"][0]
+    assert list(snapshot) == ["table_number", *TABLE_FIELDS]
+    assert snapshot["id"] == 2 and snapshot["status"] == "Served" and snapshot["dishes"] == []
+
+
+@pytest.mark.parametrize("tables, fields, error", [("1,x", None, ValueError), ("", None, ValueError),
+                                                   ([0], None, ValueError), ([True], None, TypeError),
+                                                   (list(range(1, 1002)), None, ValueError),
+                                                   ([1], "id,price", ValueError), ([1], 5, TypeError)])
+def test_invalid_tables_and_fields(tables, fields, error):
+    with pytest.raises(error):
+        OrderManager().get_tables(tables, fields)
+
+
+def test_table_routes(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    client.post("/add_order", json={"customer_name": "Bob", "table_number": 2})
+    client.put("/orders/2/dishes/add", json={"name": "Soup", "quantity": 2, "unit_price": 4.5})
+    assert client.get("/orders/2?fields=customer_name,total_price").get_json() == {
+        "table_number": 2, "customer_name": "Bob", "total_price": 9}
+    assert client.get("/orders/5").status_code == 404
+    assert client.get("/orders/1?fields=price").status_code == 400
+    response = client.get("/orders?tables=2,5,1&fields=customer_name")
+    assert response.get_json() == {"orders": [{"table_number": 2, "customer_name": "Bob"},
+                                              {"table_number": 1, "customer_name": "Ann"}], "not_found": [5]}
+    assert client.get("/orders").status_code == 400
+    assert client.get("/orders?tables=1,-1").status_code == 400
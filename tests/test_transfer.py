@@ -0,0 +1,75 @@
+## test_transfer.py
+## Moving orders between servers as NDJSON: the orders exported one per line, imported in bulk with new ids
+## (keeping their status, opening time and dishes), and an invalid record refused with its number,
+## through the manager and GET /orders/export, POST /orders/import.
+
+import json
+
+import pytest
+
+from src.Dish import Dish
+from src.Order import Order
+from src.OrderTransfer import read_ndjson
+from tests.conftest import Backend
+from tests.operations import run_operations
+
+
+# Returns the orders of a manager as exported, without their ids.
+def exported(manager):
+    return [{key: value for key, value in order.to_dict(timestamps=True).items() if key != "id"}
+            for order in manager.iter_orders()]
+
+
+def test_import_orders(backend, tmp_path):
+    source = backend.open()
+    run_operations(source, 300)
+    records = [order.to_dict(timestamps=True) for order in source.iter_orders()]
+    target_backend = Backend(backend.kind, tmp_path / "target")
+    (tmp_path / "target").mkdir()
+    target = target_backend.open()
+    target.add_order(Order("Zoe", 99))
+    assert target.import_orders(records) == len(records)
+    assert target.stored_orders_num == len(records) + 1
+    assert target.active_orders_num == source.active_orders_num + 1
+    assert target.total_orders_price_by_status("All") == pytest.approx(source.total_orders_price_by_status("All") +
+                                                                       target.get_order_price(99))
+    target.remove_order("table_number", 99)
+    assert exported(target) == exported(source)
+    target = target_backend.restart()
+    assert exported(target) == exported(source)
+    target_backend.close()
+
+
+def test_invalid_record_is_refused(backend):
+    manager = backend.open()
+    records = [{"customer_name": "Ann", "table_number": table_number, "status": "Pending", "dishes": []}
+               for table_number in range(1, 4)]
+    records[1]["table_number"] = -2
+    with pytest.raises(ValueError, match="record 2"):
+        manager.import_orders(records)
+    assert manager.stored_orders_num == 0
+
+
+def test_read_ndjson():
+    lines = [b'{"a": 1}\n', b"\n", '{"b": 2}\n']
+    assert list(read_ndjson(lines)) == [{"a": 1}, {"b": 2}]
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_ndjson(['{"a": 1}\n', "{\n"]))
+
+
+def test_export_and_import_routes(client):
+    client.post("/add_order", json={"customer_name": "Ann", "table_number": 1})
+    client.post("/add_order", json={"customer_name": "Bob", "table_number": 2})
+    client.put("/orders/1/dishes/add", json={"name": "Soup", "quantity": 2, "unit_price": 4.5})
+    response = client.get("/orders/export")
+    assert response.mimetype == "application/x-ndjson"
+    body = response.get_data()
+    records = [json.loads(line) for line in body.splitlines()]
+    assert [record["customer_name"] for record in records] == ["Ann", "Bob"]
+    assert "opened_at" in records[0] and "pending since" in records[0]["dishes"][0]
+    client.delete("/remove_order/table_number/1")
+    client.delete("/remove_order/table_number/2")
+    response = client.post("/orders/import", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200 and response.get_json()["imported_orders_num"] == 2
+    assert client.get("/orders/1/price").get_json()["total_price"] == 9
+    assert client.post("/orders/import", data=b'{"customer_name": "Cy"\n').status_code == 400